@@ -91,7 +91,10 @@ setup(
             'wifi-scan = wifi_survey_heatmap.scancli:main',
             'wifi-survey = wifi_survey_heatmap.ui:main',
             'wifi-heatmap = wifi_survey_heatmap.heatmap:main',
-            'wifi-heatmap-thresholds = wifi_survey_heatmap.thresholds:main'
+            'wifi-heatmap-batch = wifi_survey_heatmap.batch:main',
+            'wifi-heatmap-thresholds = wifi_survey_heatmap.thresholds:main',
+            'wifi-survey-convert = wifi_survey_heatmap.convert:main',
+            'wifi-heatmap-stats = wifi_survey_heatmap.stats:main'
         ]
     },
     zip_safe=False
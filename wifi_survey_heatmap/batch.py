@@ -0,0 +1,251 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import sys
+import argparse
+import logging
+import json
+import time
+from collections import defaultdict
+
+from wifi_survey_heatmap.heatmap import (
+    HeatMapGenerator, add_generator_arguments, generator_kwargs,
+    run_render_tasks, set_log_debug, set_log_info
+)
+
+logger = logging.getLogger()
+
+#: manifest job keys, and the HeatMapGenerator arguments they override
+JOB_KEYS = {
+    'picture': 'image_path',
+    'thresholds': 'thresholds',
+    'ap_names': 'aps',
+    'ignore': 'ignore_ssids',
+}
+
+
+class BatchJob(object):
+
+    def __init__(self, title, **kwargs):
+        self.title = title
+        self.kwargs = kwargs
+        self.generator = None
+        self.error = None
+        self.tasks = 0
+        self.done = 0
+        self.written = 0
+        self.prepare_time = 0.0
+        self.render_time = 0.0
+        self.finished = None
+
+
+class BatchHeatMapGenerator(object):
+    """
+    Generate heatmaps for many surveys. All surveys are loaded and
+    interpolated first, then all of their plots are rendered on one shared
+    pool of worker processes. Floorplan images are only loaded once for all
+    surveys that use the same image.
+    """
+
+    def __init__(self, jobs, processes=1, threads=False):
+        """
+        :param jobs: jobs to run
+        :type jobs: list of :py:class:`BatchJob`
+        :param processes: number of render worker processes
+        :type processes: int
+        :param threads: whether to render with threads instead of processes
+        :type threads: bool
+        """
+        self._jobs = jobs
+        self._processes = processes
+        self._threads = threads
+
+    def run(self):
+        start = time.time()
+        images = {}
+        generators = {}
+        tasks = []
+        for idx, job in enumerate(self._jobs):
+            logger.info('Preparing %s', job.title)
+            t = time.time()
+            try:
+                kwargs = dict(job.kwargs)
+                image_path = kwargs.pop('image_path', None)
+                job.generator = HeatMapGenerator(
+                    image_path, job.title, image_cache=images, **kwargs
+                )
+                job_tasks = job.generator.prepare()
+            except (Exception, SystemExit) as ex:
+                logger.error('Cannot prepare %s: %s', job.title, ex)
+                logger.debug('Exception preparing %s', job.title, exc_info=True)
+                job.error = str(ex) or ex.__class__.__name__
+                continue
+            finally:
+                job.prepare_time = time.time() - t
+            job.tasks = len(job_tasks)
+            job.finished = time.time()
+            generators[idx] = job.generator
+            tasks.extend((idx, task) for task in job_tasks)
+        logger.info(
+            'Prepared %d surveys with %d distinct floorplans in %.1fs',
+            len(generators), len(images), time.time() - start
+        )
+
+        def progress(n, result, elapsed):
+            job = self._jobs[tasks[n][0]]
+            job.done += 1
+            job.render_time += elapsed
+            job.finished = time.time()
+            if result is not None:
+                job.written += 1
+            logger.info(
+                '%s: %d/%d plots done', job.title, job.done, job.tasks
+            )
+
+        results = run_render_tasks(
+            generators, tasks, self._processes, progress=progress,
+            threads=self._threads
+        )
+        by_job = defaultdict(lambda: ([], []))
+        for (idx, task), res in zip(tasks, results):
+            by_job[idx][0].append(task)
+            by_job[idx][1].append(res)
+        for idx, (job_tasks, job_results) in by_job.items():
+            self._jobs[idx].generator.finish(job_tasks, job_results)
+        self._summary(start)
+
+    def _summary(self, start):
+        print('%-40s %8s %10s %10s %10s  %s' % (
+            'Survey', 'Plots', 'Prepare', 'Render', 'Finished', 'Status'
+        ))
+        for job in self._jobs:
+            finished = '-'
+            if job.finished is not None:
+                finished = '%.1fs' % (job.finished - start)
+            print('%-40s %8s %9.1fs %9.1fs %10s  %s' % (
+                job.title, '%d/%d' % (job.written, job.tasks),
+                job.prepare_time, job.render_time, finished,
+                'ERROR: %s' % job.error if job.error else 'OK'
+            ))
+        print('Total wall time: %.1fs' % (time.time() - start))
+
+
+def load_manifest(fpath):
+    """
+    Load the jobs from a manifest JSON file. The manifest is a list of jobs
+    (or an object with a ``jobs`` list); each job is either a survey title
+    or an object with a ``title`` and optionally ``picture``, ``thresholds``,
+    ``ap_names`` and ``ignore`` keys overriding the command line options for
+    that survey.
+
+    :return: list of (title, overrides) tuples
+    :rtype: list
+    """
+    with open(fpath, 'r') as fh:
+        data = json.loads(fh.read())
+    if isinstance(data, dict):
+        data = data['jobs']
+    res = []
+    for job in data:
+        if not isinstance(job, dict):
+            job = {'title': job}
+        unknown = set(job.keys()) - set(JOB_KEYS.keys()) - {'title'}
+        if unknown:
+            raise ValueError('Unknown keys in manifest job %s: %s' % (
+                job.get('title'), ', '.join(sorted(unknown))
+            ))
+        res.append((
+            job['title'],
+            {JOB_KEYS[k]: v for k, v in job.items() if k != 'title'}
+        ))
+    return res
+
+
+def parse_args(argv):
+    """
+    parse arguments/options
+
+    this uses the new argparse module instead of optparse
+    see: <https://docs.python.org/2/library/argparse.html>
+    """
+    p = argparse.ArgumentParser(
+        description='wifi survey heatmap generator for many surveys'
+    )
+    p.add_argument('-v', '--verbose', dest='verbose', action='count', default=0,
+                   help='verbose output. specify twice for debug-level output.')
+    add_generator_arguments(p)
+    p.add_argument('-p', '--picture', dest='IMAGE', type=str, action='store',
+                   default=None, help='Path to background image')
+    p.add_argument('-m', '--manifest', dest='manifest', type=str,
+                   action='store', default=None,
+                   help='JSON job manifest listing the surveys to generate '
+                        'heatmaps for')
+    p.add_argument(
+        'TITLE', type=str, nargs='*',
+        help='Title for survey (and data filename)'
+    )
+    args = p.parse_args(argv)
+    if not args.TITLE and args.manifest is None:
+        p.error('at least one TITLE or a --manifest is required')
+    return args
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    # set logging level
+    if args.verbose > 1:
+        set_log_debug()
+    elif args.verbose == 1:
+        set_log_info()
+
+    kwargs = generator_kwargs(args)
+    # jobs are rendered on the shared pool, not by each generator
+    processes = kwargs.pop('jobs')
+    threads = kwargs.pop('threads')
+    kwargs['image_path'] = args.IMAGE
+    jobs = [(t, {}) for t in args.TITLE]
+    if args.manifest is not None:
+        jobs.extend(load_manifest(args.manifest))
+    BatchHeatMapGenerator([
+        BatchJob(title, **dict(kwargs, **overrides))
+        for title, overrides in jobs
+    ], processes=processes, threads=threads).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from wifi_survey_heatmap.version import VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def digest(*parts):
+    """
+    Return a hex digest of the given parts. Parts may be numpy arrays or any
+    JSON-serializable values.
+
+    :rtype: str
+    """
+    h = hashlib.sha256(VERSION.encode())
+    for part in parts:
+        if isinstance(part, np.ndarray) and part.dtype != object:
+            h.update(('%s%s' % (part.dtype.str, part.shape)).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            if isinstance(part, np.ndarray):
+                part = part.tolist()
+            h.update(
+                json.dumps(part, sort_keys=True, default=str).encode()
+            )
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def atomic_write(path, write, mode='w'):
+    """
+    Atomically write ``path`` by calling ``write`` with the file object of a
+    uniquely named temporary file in the same directory, so that concurrent
+    writers never clobber each other's partial files.
+
+    :param path: path of the file to write
+    :type path: str
+    :param write: callable writing the contents to a file object
+    :type write: callable
+    :param mode: file mode, ``w`` or ``wb``
+    :type mode: str
+    """
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.',
+        prefix=os.path.basename(path) + '.', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(fd, mode) as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class RenderCache(object):
+    """
+    Content-addressed cache of ``wifi-heatmap`` outputs.
+
+    Each output file is recorded in a manifest together with a key hashed
+    from all of the inputs it was rendered from; outputs whose key is
+    unchanged are not rendered again. Interpolated grids are kept in the
+    cache directory under their own keys, so they can be reused when only
+    rendering options change; each manifest entry lists the grids its output
+    was rendered from, and grids no entry refers to are removed when the
+    manifest is saved.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._grid_dir = os.path.join(path, 'grids')
+        self._manifest_path = os.path.join(path, 'manifest.json')
+        self._file_digests = {}
+        self._recorded = {}
+        self._opened = time.time()
+        if not os.path.exists(self._grid_dir):
+            os.makedirs(self._grid_dir)
+        self._manifest = self._load_manifest()
+        logger.debug(
+            'Loaded render cache %s with %d entries', path,
+            len(self._manifest)
+        )
+
+    def _load_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path, 'r') as fh:
+            manifest = json.loads(fh.read())
+        # entries of older versions are just keys; render those again
+        return {k: v for k, v in manifest.items() if isinstance(v, dict)}
+
+    def file_digest(self, fpath):
+        """
+        Return the digest of the contents of ``fpath``, memoized per file.
+
+        :rtype: str
+        """
+        if fpath not in self._file_digests:
+            h = hashlib.sha256()
+            with open(fpath, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                    h.update(chunk)
+            self._file_digests[fpath] = h.hexdigest()
+        return self._file_digests[fpath]
+
+    def is_fresh(self, fname, key):
+        """
+        Return whether ``fname`` exists and was rendered from inputs with
+        the given key.
+
+        :rtype: bool
+        """
+        entry = self._manifest.get(fname)
+        return (
+            entry is not None and entry['key'] == key and
+            os.path.exists(fname)
+        )
+
+    def record(self, fname, key, grids=()):
+        """
+        Record that ``fname`` was rendered from inputs with ``key``, and from
+        the cached grids with the given keys. The manifest is only written
+        by :py:meth:`save`.
+        """
+        entry = {'key': key, 'grids': sorted(set(grids))}
+        self._manifest[fname] = entry
+        self._recorded[fname] = entry
+
+    def save(self):
+        """
+        Write the entries recorded since the cache was opened to the
+        manifest, merged into the manifest currently on disk (which other
+        generators sharing the cache directory may have updated), and remove
+        the grids that no entry refers to. Grids saved or loaded since the
+        cache was opened are kept, as their outputs may not be recorded yet.
+        """
+        manifest = self._load_manifest()
+        manifest.update(self._recorded)
+        self._manifest = manifest
+        self._recorded = {}
+        atomic_write(
+            self._manifest_path,
+            lambda fh: fh.write(json.dumps(manifest, indent=2, sort_keys=True))
+        )
+        used = set()
+        for entry in manifest.values():
+            used.update(entry['grids'])
+        for name in os.listdir(self._grid_dir):
+            path = os.path.join(self._grid_dir, name)
+            # temporary files older than this cache are left over from
+            # interrupted writes
+            key, ext = os.path.splitext(name)
+            if ext not in ('.npy', '.tmp') or key in used:
+                continue
+            if os.path.getmtime(path) >= self._opened:
+                continue
+            logger.debug('Removing unused cached grid %s', key)
+            os.remove(path)
+
+    def _grid_path(self, key):
+        return os.path.join(self._grid_dir, '%s.npy' % key)
+
+    def load_grid(self, key):
+        """
+        Return the cached grid with the given key (memory-mapped), or None.
+
+        :rtype: numpy.ndarray
+        """
+        path = self._grid_path(key)
+        if not os.path.exists(path):
+            return None
+        logger.debug('Reusing cached grid %s', key)
+        self._touch(path)
+        return np.load(path, mmap_mode='r')
+
+    def save_grid(self, key, grid):
+        """Store an interpolated grid under the given key."""
+        path = self._grid_path(key)
+        atomic_write(
+            path, lambda fh: np.save(fh, np.asarray(grid, dtype=np.float32)),
+            mode='wb'
+        )
+        self._touch(path)
+
+    @staticmethod
+    def _touch(path):
+        """
+        Mark a grid as in use, so that :py:meth:`save` does not remove it;
+        with an explicit time, as file system timestamps may lag behind.
+        """
+        now = time.time()
+        os.utime(path, (now, now))
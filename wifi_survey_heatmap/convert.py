@@ -0,0 +1,112 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+from wifi_survey_heatmap.cli import set_log_debug, set_log_info
+from wifi_survey_heatmap.survey import convert_survey
+
+FORMAT = "[%(asctime)s %(levelname)s] %(message)s"
+logging.basicConfig(level=logging.WARNING, format=FORMAT)
+logger = logging.getLogger()
+
+
+def parse_args(argv):
+    """
+    parse arguments/options
+
+    this uses the new argparse module instead of optparse
+    see: <https://docs.python.org/2/library/argparse.html>
+    """
+    p = argparse.ArgumentParser(
+        description='Convert wifi survey data between the JSON and columnar '
+                    '(.npz) formats'
+    )
+    p.add_argument('-v', '--verbose', dest='verbose', action='count', default=0,
+                   help='verbose output. specify twice for debug-level output.')
+    p.add_argument(
+        'INPUT', type=str, help='Survey data file to read (JSON or .npz)'
+    )
+    p.add_argument(
+        'OUTPUT', type=str, nargs='?', default=None,
+        help='Survey data file to write; written as .npz if it has that '
+             'extension, otherwise as JSON. Defaults to INPUT with the '
+             'extension swapped between .json and .npz'
+    )
+    args = p.parse_args(argv)
+    return args
+
+
+def output_path(fpath):
+    """
+    Return the default output path for converting the survey at ``fpath``.
+
+    :param fpath: path to the survey data file to convert
+    :type fpath: str
+    :rtype: str
+    """
+    base, ext = os.path.splitext(fpath)
+    if ext.lower() == '.npz':
+        return base + '.json'
+    return base + '.npz'
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    # set logging level
+    if args.verbose > 1:
+        set_log_debug()
+    elif args.verbose == 1:
+        set_log_info()
+
+    dst = args.OUTPUT
+    if dst is None:
+        dst = output_path(args.INPUT)
+    try:
+        count = convert_survey(args.INPUT, dst)
+    except ValueError as ex:
+        logger.error(str(ex))
+        raise SystemExit(1)
+    logger.info('Wrote %d survey points to: %s', count, dst)
+
+
+if __name__ == '__main__':
+    main()
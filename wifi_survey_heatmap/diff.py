@@ -0,0 +1,276 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.pyplot as pp
+import numpy as np
+from PIL import Image
+
+from wifi_survey_heatmap.heatmap import (
+    RASTER_ALPHA, RASTER_SAVE_OPTIONS, HeatMapGenerator, blend, colorize,
+    plot_canvas, run_render_tasks
+)
+from wifi_survey_heatmap.stats import (
+    DEFAULT_PERCENTILES, cell_weights, grid_stats
+)
+
+logger = logging.getLogger(__name__)
+
+#: diverging colormap of the difference maps: decreases are red, increases
+#: blue and unchanged areas white
+DIFF_CMAP = 'RdBu'
+
+
+def delta_stats(delta, weights, percentiles=DEFAULT_PERCENTILES):
+    """
+    Return area-weighted statistics of a difference grid: those of
+    :py:func:`~wifi_survey_heatmap.stats.grid_stats`, plus the share of the
+    area where the metric ``increased`` and ``decreased``.
+
+    :param delta: grid of signed differences
+    :type delta: numpy.ndarray
+    :param weights: area weight of each grid cell; see
+      :py:func:`~wifi_survey_heatmap.stats.cell_weights`
+    :type weights: numpy.ndarray
+    :param percentiles: percentiles to compute
+    :type percentiles: list
+    :rtype: dict
+    """
+    res = grid_stats(delta, weights, percentiles=percentiles)
+    if res is None:
+        return None
+    keep = (weights > 0) & ~np.isnan(delta)
+    total = weights[keep].sum()
+    res['increased'] = float(weights[keep & (delta > 0)].sum() / total)
+    res['decreased'] = float(weights[keep & (delta < 0)].sum() / total)
+    return res
+
+
+class DiffGenerator(object):
+    """
+    Generate difference maps between two surveys of the same floorplan,
+    e.g. before and after moving an AP. Both surveys are interpolated onto
+    the identical grid, sharing the floorplan and mask, concurrently in two
+    threads (the interpolation spends most of its time in NumPy and SciPy
+    code that releases the GIL). For every numeric metric, the signed
+    difference ``after - before`` is rendered with a diverging colormap
+    centered on zero, and summarized with area-weighted statistics.
+    """
+
+    def __init__(self, image_path, before, after, **kwargs):
+        """
+        :param image_path: floorplan image path; defaults to the one stored
+          in the ``before`` survey, which is used for both
+        :type image_path: str
+        :param before: title of the survey to compare against
+        :type before: str
+        :param after: title of the survey to compare
+        :type after: str
+        :param kwargs: :py:class:`~.HeatMapGenerator` keyword arguments for
+          both surveys; only the interpolation, mask, rendering and job
+          options apply
+        """
+        images = {}
+        self._before = HeatMapGenerator(
+            image_path, before, image_cache=images, **kwargs
+        )
+        self._after = HeatMapGenerator(
+            self._before._image_path, after, image_cache=images, **kwargs
+        )
+        self._title = '%s_%s' % (self._before._title, self._after._title)
+        self._raster = kwargs.get('raster')
+        self._jobs = kwargs.get('jobs', 1)
+        self._threads = kwargs.get('threads', False)
+        self._cmap = pp.get_cmap(DIFF_CMAP)
+        self._x = None
+        self._y = None
+        self._deltas = {}
+        self._grids = {}
+
+    def generate(self):
+        tasks = self.prepare()
+        run_render_tasks({0: self}, [(0, t) for t in tasks], self._jobs,
+                         threads=self._threads)
+
+    def prepare(self):
+        """
+        Interpolate both surveys and compute the difference grids.
+
+        :return: list of render tasks; see
+          :py:func:`~.run_render_tasks`
+        :rtype: list
+        """
+        a0, x, y = self._before._prepare_grid()
+        a1, _, _ = self._after._prepare_grid(grid=(
+            x, y, self._before._grid_mask, self._before._mask_key
+        ))
+        self._x, self._y = x, y
+        keys = [
+            k for k in HeatMapGenerator.graphs.keys()
+            if self._numeric(a0, k) and self._numeric(a1, k)
+        ]
+        logger.info('Interpolating %d metrics of both surveys', len(keys))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [
+                pool.submit(gen._interpolate, a, x, y, keys=set(keys))
+                for gen, a in ((self._before, a0), (self._after, a1))
+            ]
+            grids = [f.result() for f in futures]
+        for key in keys:
+            z0 = self._before._surface(
+                a0, key, grids[0].get(key), len(x), len(y)
+            )[0]
+            z1 = self._after._surface(
+                a1, key, grids[1].get(key), len(x), len(y)
+            )[0]
+            self._deltas[key] = np.subtract(z1, z0, dtype=np.float32)
+            self._grids[key] = (z0, z1)
+        tasks = [('_render_delta', (k,), None) for k in keys]
+        tasks.append(('_write_deltas', (), None))
+        self._before._layout.build()
+        return tasks
+
+    def _numeric(self, a, key):
+        """whether a metric is complete and numeric, so it can be compared"""
+        if key not in a or len(a[key]) != len(a['x']):
+            logger.info('Not comparing %s due to insufficient data', key)
+            return False
+        if key == 'bssid' or a[key].dtype == object or (
+            key in HeatMapGenerator.categorical and
+            key not in self._before._metric_interpolation
+        ):
+            return False
+        return True
+
+    def _fname(self, key):
+        """output file name of the difference map of the given metric"""
+        ext = 'png' if self._raster is None else self._raster
+        return 'diff_%s_%s.%s' % (key, self._title, ext)
+
+    def _render_delta(self, key):
+        """
+        Plot the difference map of one metric, with a symmetric value range
+        so that no change is white.
+
+        :return: output file name
+        :rtype: str
+        """
+        gen = self._after
+        delta = self._deltas[key]
+        limit = float(np.nanmax(np.abs(delta), initial=0.0)) or 1.0
+        fname = self._fname(key)
+        if self._raster is not None:
+            overlay = Image.fromarray(
+                colorize(delta, self._cmap, -limit, limit)
+            )
+            base = gen._floorplan_rgb()
+            overlay = overlay.resize(
+                (base.shape[1], base.shape[0]), Image.BILINEAR
+            )
+            logger.info('Writing raster to: %s', fname)
+            Image.fromarray(
+                blend(base, np.asarray(overlay), RASTER_ALPHA)
+            ).save(fname, **RASTER_SAVE_OPTIONS[self._raster])
+            return fname
+        canvas = plot_canvas(gen._layout, gen._image_width, gen._image_height)
+        canvas.ax.set_title('Change in %s: %s - %s' % (
+            gen.graphs[key], self._after._title, self._before._title
+        ), fontsize=10)
+        image = canvas.ax.imshow(
+            delta, extent=(0, gen._image_width, gen._image_height, 0),
+            alpha=0.5, zorder=100, cmap=self._cmap, vmin=-limit, vmax=limit
+        )
+        canvas.figure.colorbar(image, cax=canvas.cax)
+        logger.info('Writing plot to: %s', fname)
+        canvas.save(fname)
+        return fname
+
+    def _write_deltas(self):
+        """
+        Write the difference grids, with the grid coordinates, to
+        ``diff_BEFORE_AFTER.npz``, and their statistics to
+        ``diff_BEFORE_AFTER.json``; see :py:meth:`stats`.
+
+        :return: output file name of the statistics
+        :rtype: str
+        """
+        fname = 'diff_%s.npz' % self._title
+        logger.info('Writing difference grids to: %s', fname)
+        with open(fname, 'wb') as fh:
+            np.savez(fh, x=self._x, y=self._y, **self._deltas)
+        fname = 'diff_%s.json' % self._title
+        logger.info('Writing difference statistics to: %s', fname)
+        with open(fname, 'w') as fh:
+            json.dump(self.stats(), fh, indent=4, sort_keys=True)
+        return fname
+
+    def stats(self):
+        """
+        Return the area-weighted statistics of the difference of every
+        compared metric (see :py:func:`delta_stats`), with the mean of the
+        metric in the ``before`` and ``after`` surveys.
+
+        :rtype: dict
+        """
+        weights = cell_weights(len(self._y), len(self._x))
+        mask = self._before._grid_mask
+        if mask is not None:
+            weights[~mask] = 0
+        res = {
+            'before': self._before._title,
+            'after': self._after._title,
+            'metrics': {},
+        }
+        for key, delta in sorted(self._deltas.items()):
+            st = delta_stats(delta, weights)
+            if st is None:
+                continue
+            for name, z in zip(('before', 'after'), self._grids[key]):
+                keep = (weights > 0) & ~np.isnan(z)
+                st['%s_mean' % name] = float(
+                    np.dot(z[keep], weights[keep]) / weights[keep].sum()
+                )
+            logger.info(
+                '%s: mean change %+.4g (%.4g to %.4g); %.1f%% of the area '
+                'increased, %.1f%% decreased', key, st['mean'], st['min'],
+                st['max'], st['increased'] * 100, st['decreased'] * 100
+            )
+            res['metrics'][key] = st
+        return res
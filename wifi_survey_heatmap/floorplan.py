@@ -0,0 +1,311 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+from wifi_survey_heatmap.cache import atomic_write
+
+logger = logging.getLogger(__name__)
+
+#: the smallest pyramid level is the first with a side below this size
+MIN_LEVEL_SIZE = 256
+
+#: version of the on-disk pyramid layout
+PYRAMID_VERSION = 1
+
+#: maximum difference of each RGB channel from the background color of
+#: pixels that are background when deriving a mask from a floorplan
+MASK_TOLERANCE = 16
+
+
+def open_image(path):
+    """
+    Open an image with Pillow, without decoding it. Floorplans may be far
+    larger than Pillow's decompression bomb limit, so it is not applied.
+
+    :rtype: PIL.Image.Image
+    """
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        return Image.open(path)
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def _convert(img):
+    """Convert an image to RGB, or RGBA if it has transparency."""
+    if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+        return img.convert('RGBA')
+    return img.convert('RGB')
+
+
+def load_mask(path, x, y):
+    """
+    Load a floorplan mask image, of the same size as the floorplan, and
+    sample it at the points of the regular grid spanned by ``x`` and ``y``
+    (in floorplan pixels). Pixels that are black or transparent are outside
+    of the mask, all others inside.
+
+    :param path: path to the mask image
+    :type path: str
+    :param x: 1-D array of grid X coordinates
+    :param y: 1-D array of grid Y coordinates
+    :return: boolean array of shape ``(len(y), len(x))``, True inside
+    :rtype: numpy.ndarray
+    """
+    img = open_image(path)
+    inside = np.asarray(img.convert('L')) > 0
+    if _convert(img).mode == 'RGBA':
+        inside &= np.asarray(img.convert('RGBA').getchannel('A')) > 0
+    rows, cols = inside.shape
+    ix = np.clip(np.round(np.asarray(x)).astype(np.intp), 0, cols - 1)
+    iy = np.clip(np.round(np.asarray(y)).astype(np.intp), 0, rows - 1)
+    return inside[np.ix_(iy, ix)]
+
+
+def parse_color(value):
+    """
+    Parse a ``RRGGBB`` or ``#RRGGBB`` hex color, or ``transparent``.
+
+    :return: (red, green, blue, alpha) tuple; ``transparent`` has an alpha
+      of 0
+    :rtype: tuple
+    :raises ValueError: if the color is invalid
+    """
+    if value.lower() == 'transparent':
+        return (0, 0, 0, 0)
+    value = value.lstrip('#')
+    if len(value) != 6:
+        raise ValueError('Invalid color: %s' % value)
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4)) + (255,)
+
+
+def derive_mask(pyramid, x, y, color, tolerance=MASK_TOLERANCE):
+    """
+    Derive a mask of the area of a floorplan from its colors, and sample it
+    at the points of the regular grid spanned by ``x`` and ``y`` (in
+    floorplan pixels). The area outside the building is the background
+    (transparent pixels, and pixels of the given color) that is connected
+    to the edges of the image; background enclosed by walls, like the
+    inside of rooms on a white floorplan, is inside the mask.
+
+    The mask is derived from the smallest pyramid level that is at least as
+    wide as the grid.
+
+    :param pyramid: floorplan image pyramid
+    :type pyramid: FloorplanPyramid
+    :param x: 1-D array of grid X coordinates
+    :param y: 1-D array of grid Y coordinates
+    :param color: (red, green, blue, alpha) background color; if its alpha
+      is 0, only transparent pixels are background
+    :type color: tuple
+    :param tolerance: maximum difference of each channel from ``color``
+    :type tolerance: int
+    :return: boolean array of shape ``(len(y), len(x))``, True inside
+    :rtype: numpy.ndarray
+    """
+    level = pyramid.level_for(len(x))
+    img = np.asarray(pyramid.level(level))
+    background = np.zeros(img.shape[:2], dtype=bool)
+    if img.shape[2] == 4:
+        background |= img[:, :, 3] < 128
+    if color[3]:
+        diff = np.abs(
+            img[:, :, :3].astype(np.int16) -
+            np.array(color[:3], dtype=np.int16)
+        )
+        background |= diff.max(axis=2) <= tolerance
+    labels, _ = ndimage.label(background)
+    edges = np.unique(np.concatenate((
+        labels[0], labels[-1], labels[:, 0], labels[:, -1]
+    )))
+    inside = ~np.isin(labels, edges[edges > 0])
+    rows, cols = inside.shape
+    scale = 2.0 ** -level
+    ix = np.clip(
+        np.round(np.asarray(x) * scale).astype(np.intp), 0, cols - 1
+    )
+    iy = np.clip(
+        np.round(np.asarray(y) * scale).astype(np.intp), 0, rows - 1
+    )
+    return inside[np.ix_(iy, ix)]
+
+
+class FloorplanPyramid(object):
+    """
+    A floorplan image as a multi-resolution pyramid of uint8 arrays, where
+    each level halves the size of the previous one, down to a side below
+    :py:data:`MIN_LEVEL_SIZE`. Level 0 is the full-resolution image.
+
+    The image is decoded once, straight to uint8, and the levels are cached
+    as ``.npy`` files in a ``.pyramid`` directory next to the image (if it is
+    writable), from which later runs memory-map only the levels they need.
+    The cache is rebuilt when the image file changes.
+    """
+
+    def __init__(self, path, cache_dir=None):
+        """
+        :param path: path to the floorplan image
+        :type path: str
+        :param cache_dir: directory to cache the pyramid in; defaults to
+          ``PATH.pyramid``
+        :type cache_dir: str
+        """
+        self.path = path
+        self.cache_dir = cache_dir
+        if self.cache_dir is None:
+            self.cache_dir = path + '.pyramid'
+        self.width, self.height = open_image(path).size
+        self.num_levels = 1 + max(0, int(math.floor(math.log2(
+            max(self.width, self.height) / float(MIN_LEVEL_SIZE)
+        ))))
+        self._levels = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self._is_cached():
+            # worker processes memory-map the levels they need themselves
+            state['_levels'] = {}
+        return state
+
+    def build(self):
+        """
+        Make sure the levels are available before rendering in parallel:
+        unless they are cached and up to date, decode the image and build
+        (and cache) them now, so that render workers only memory-map the
+        cached levels instead of each decoding the image again.
+        """
+        if not self._levels and not self._is_cached():
+            self._build()
+
+    def level_size(self, level):
+        """
+        Return the (width, height) of a pyramid level.
+
+        :rtype: tuple
+        """
+        scale = 2 ** level
+        return (
+            int(math.ceil(self.width / float(scale))),
+            int(math.ceil(self.height / float(scale)))
+        )
+
+    def level_for(self, width):
+        """
+        Return the smallest pyramid level that is at least ``width`` pixels
+        wide, i.e. the level to draw the floorplan from when it is displayed
+        ``width`` pixels wide.
+
+        :rtype: int
+        """
+        level = 0
+        while (
+            level + 1 < self.num_levels and
+            self.level_size(level + 1)[0] >= width
+        ):
+            level += 1
+        return level
+
+    def level(self, level):
+        """
+        Return a pyramid level as a uint8 array of shape (height, width, 3)
+        or (height, width, 4).
+
+        :rtype: numpy.ndarray
+        """
+        if level not in self._levels:
+            if self._is_cached():
+                logger.debug('Loading floorplan level %d of %s', level,
+                             self.path)
+                self._levels[level] = np.load(
+                    self._level_path(level), mmap_mode='r'
+                )
+            else:
+                self._build()
+        return self._levels[level]
+
+    def _level_path(self, level):
+        return os.path.join(self.cache_dir, 'level%d.npy' % level)
+
+    def _source(self):
+        st = os.stat(self.path)
+        return {
+            'version': PYRAMID_VERSION,
+            'size': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'levels': self.num_levels,
+        }
+
+    def _is_cached(self):
+        try:
+            with open(os.path.join(self.cache_dir, 'manifest.json')) as fh:
+                return json.load(fh) == self._source()
+        except (IOError, OSError, ValueError):
+            return False
+
+    def _build(self):
+        """Decode the image and build (and if possible cache) all levels."""
+        logger.info('Building floorplan pyramid for %s', self.path)
+        img = _convert(open_image(self.path))
+        levels = {}
+        for level in range(self.num_levels):
+            if level:
+                img = img.reduce(2)
+            levels[level] = np.asarray(img)
+        self._levels = levels
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for level, arr in levels.items():
+                atomic_write(
+                    self._level_path(level), lambda fh: np.save(fh, arr), 'wb'
+                )
+            atomic_write(
+                os.path.join(self.cache_dir, 'manifest.json'),
+                lambda fh: json.dump(self._source(), fh), 'w'
+            )
+        except (IOError, OSError) as ex:
+            logger.warning(
+                'Cannot cache floorplan pyramid in %s: %s', self.cache_dir, ex
+            )
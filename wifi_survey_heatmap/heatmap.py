@@ -35,25 +35,52 @@ Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
 ##################################################################################
 """
 
+import os
 import sys
 import argparse
 import logging
 import json
 import numpy
+import time
+import threading
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+)
 
 from collections import defaultdict
 import numpy as np
 import matplotlib.cm as cm
 import matplotlib.pyplot as pp
 from mpl_toolkits.axes_grid1 import make_axes_locatable
-from scipy.interpolate import Rbf
-from pylab import imread, imshow
 from matplotlib.offsetbox import AnchoredText
 from matplotlib.patheffects import withStroke
 from matplotlib.font_manager import FontManager
 from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib
+import matplotlib.colorbar
 import itertools
+from PIL import Image
+
+from wifi_survey_heatmap.cli import set_log_debug, set_log_info
+from wifi_survey_heatmap.cache import RenderCache, digest
+from wifi_survey_heatmap.floorplan import (
+    FloorplanPyramid, derive_mask, load_mask, parse_color
+)
+from wifi_survey_heatmap.tiles import (
+    TILE_MANIFEST, TileWriter, max_zoom, pad_tile, tile_boxes, zoom_size
+)
+from wifi_survey_heatmap.survey import (
+    AGGREGATES, CATEGORICAL, METRICS, bin_survey, load_survey, survey_path
+)
+from wifi_survey_heatmap.interpolation import (
+    DEFAULT_MEMORY_BUDGET, IncrementalRbfInterpolator,
+    add_interpolation_arguments, allocate_grids, evaluate_grid,
+    get_interpolator, grid_axes, image_corners, interpolation_group,
+    interpolation_kwargs, nearest_labels, pin_corners, site_spacing,
+    tune_rbf
+)
 
 
 FORMAT = "[%(asctime)s %(levelname)s] %(message)s"
@@ -129,6 +156,274 @@ WIFI_CHANNELS = {
 }
 
 
+def channel_overlap(channels):
+    """
+    Return the matrix that spreads the quality measured on each channel over
+    the full bandwidth of the channel: element ``[i, j]`` is 1 if the center
+    frequency of the ``i``-th channel is within the bandwidth of the ``j``-th
+    channel, else 0.
+
+    :param channels: dict of center frequency (MHz) to (channel, bandwidth
+      MHz) tuples, like :py:data:`WIFI_CHANNELS`
+    :type channels: dict
+    :rtype: numpy.ndarray
+    """
+    freqs = np.array(list(channels.keys()))
+    overlap = np.zeros((len(freqs), len(freqs)))
+    for j, (freq, (_, width)) in enumerate(channels.items()):
+        low = int(freq - (width / 2.0))
+        high = int(freq + (width / 2.0) + 1.0)
+        overlap[:, j] = (
+            (freqs >= low) & (freqs < high) & (freqs == np.floor(freqs))
+        )
+        overlap[j, j] = 1
+    return overlap
+
+
+_CHANNEL_OVERLAP = channel_overlap(WIFI_CHANNELS)
+_CHANNEL_ORDER = np.argsort(list(WIFI_CHANNELS.keys()))
+_CHANNEL_FREQS_SORTED = np.array(list(WIFI_CHANNELS.keys()))[_CHANNEL_ORDER]
+
+#: opacity of the heatmap blended onto the floorplan, as in the plots
+RASTER_ALPHA = 0.5
+
+#: Pillow save options of each raster format; encoding dominates the cost of
+#: raster output, so PNGs are compressed with the fastest level
+RASTER_SAVE_OPTIONS = {
+    'png': {'compress_level': 1},
+    'webp': {'quality': 90},
+}
+
+
+def colorize(z, cmap, vmin, vmax, lut_size=256):
+    """
+    Color a grid with a colormap through a lookup table, without matplotlib
+    image machinery. NaN cells are fully transparent.
+
+    :param z: grid of values
+    :type z: numpy.ndarray
+    :param cmap: colormap
+    :type cmap: matplotlib.colors.Colormap
+    :param vmin: value mapped to the lowest color
+    :type vmin: float
+    :param vmax: value mapped to the highest color
+    :type vmax: float
+    :param lut_size: number of entries in the lookup table
+    :type lut_size: int
+    :return: RGBA uint8 array of shape ``z.shape + (4,)``
+    :rtype: numpy.ndarray
+    """
+    lut = cmap(np.linspace(0, 1, lut_size), bytes=True)
+    z = np.asarray(z, dtype=np.float32)
+    scale = 0.0
+    if vmax != vmin:
+        scale = (lut_size - 1) / float(vmax - vmin)
+    idx = np.nan_to_num((z - vmin) * scale)
+    np.clip(idx, 0, lut_size - 1, out=idx)
+    rgba = lut[idx.astype(np.intp)]
+    rgba[np.isnan(z), 3] = 0
+    return rgba
+
+
+def floorplan_rgb(layout):
+    """
+    Convert a floorplan image as loaded by matplotlib (grayscale, RGB or
+    RGBA; float in [0, 1] or uint8) to an RGB uint8 array, compositing any
+    transparency onto white.
+
+    :rtype: numpy.ndarray
+    """
+    img = np.asarray(layout)
+    if img.dtype != np.uint8:
+        img = np.round(np.clip(img, 0, 1) * 255).astype(np.uint8)
+    if img.ndim == 2:
+        img = np.repeat(img[:, :, None], 3, axis=2)
+    if img.shape[2] == 4:
+        alpha = img[:, :, 3:].astype(np.uint16)
+        img = (
+            (img[:, :, :3] * alpha + 255 * (255 - alpha) + 127) // 255
+        ).astype(np.uint8)
+    return np.ascontiguousarray(img[:, :, :3])
+
+
+def blend(base, overlay, alpha):
+    """
+    Alpha-blend an RGBA overlay onto an RGB image of the same size, with the
+    overlay's own alpha scaled by ``alpha``.
+
+    :param base: RGB uint8 image
+    :type base: numpy.ndarray
+    :param overlay: RGBA uint8 image
+    :type overlay: numpy.ndarray
+    :param alpha: opacity of the overlay
+    :type alpha: float
+    :return: RGB uint8 image
+    :rtype: numpy.ndarray
+    """
+    weight = overlay[:, :, 3:].astype(np.uint16) * int(round(alpha * 256))
+    weight >>= 8
+    out = base.astype(np.uint16) * (255 - weight)
+    out += overlay[:, :, :3] * weight
+    out += 127
+    out //= 255
+    return out.astype(np.uint8)
+
+
+#: signal (dBm) assumed for a BSSID at survey points where it was not seen
+ATLAS_FLOOR = -100.0
+
+
+def accumulate_best_server(best, second, server, overlap, signals, start,
+                           threshold):
+    """
+    Fold the signal maps of a chunk of BSSIDs into the running best-server
+    state, in place. All state arrays have the shape of one signal map.
+
+    :param best: best signal so far
+    :type best: numpy.ndarray
+    :param second: second best signal so far
+    :type second: numpy.ndarray
+    :param server: index of the BSSID with the best signal so far
+    :type server: numpy.ndarray
+    :param overlap: number of BSSIDs so far with a signal of at least
+      ``threshold``
+    :type overlap: numpy.ndarray
+    :param signals: signal maps of the chunk of BSSIDs, stacked along the
+      first axis
+    :type signals: numpy.ndarray
+    :param start: index of the first BSSID of the chunk
+    :type start: int
+    :param threshold: coverage threshold signal
+    :type threshold: float
+    """
+    for i, signal in enumerate(signals):
+        server[signal > best] = start + i
+        np.maximum(second, np.minimum(signal, best), out=second)
+        np.maximum(best, signal, out=best)
+        overlap += signal >= threshold
+
+
+#: resolution of the plots, in dots per inch
+PLOT_DPI = 300
+
+
+class PlotCanvas(object):
+    """
+    An Agg figure for the heatmap plots of one floorplan. The figure, its
+    axes and the floorplan layer are rendered once and kept as a background;
+    each plot restores the background and only draws its own overlay,
+    contours, points, legend, title and colorbar on top. The floorplan is
+    drawn from the smallest pyramid level that still covers the pixels of
+    the axes at the plot resolution.
+
+    A canvas must only be used by one thread at a time; see
+    :py:func:`plot_canvas`.
+    """
+
+    def __init__(self, floorplan, width, height):
+        """
+        :param floorplan: floorplan image pyramid, or full-resolution image
+        :type floorplan: wifi_survey_heatmap.floorplan.FloorplanPyramid or
+          numpy.ndarray
+        :param width: floorplan width, as used for the plot extents
+        :type width: int
+        :param height: floorplan height, as used for the plot extents
+        :type height: int
+        """
+        self.floorplan = floorplan
+        self.figure = Figure(figsize=(width / 100, height / 250), dpi=PLOT_DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.subplots()
+        self.ax.axis('off')
+        # fix the limits to those of the floorplan and heatmap extents
+        if isinstance(floorplan, np.ndarray):
+            rows, cols = floorplan.shape[:2]
+        else:
+            cols, rows = floorplan.width, floorplan.height
+        self.ax.set_xlim(-0.5, max(cols - 0.5, width))
+        self.ax.set_ylim(max(rows - 0.5, height), -0.5)
+        self.ax.set_autoscale_on(False)
+        self.ax.set_aspect('equal')
+        # reserve the space of the colorbar, as fig.colorbar(image) would
+        self.cax, _ = matplotlib.colorbar.make_axes(self.ax)
+        self.cax.set_visible(False)
+        if isinstance(floorplan, np.ndarray):
+            layout = floorplan
+        else:
+            self.ax.apply_aspect()
+            pixels = self.ax.get_position().width * self.figure.bbox.width
+            level = floorplan.level_for(pixels * cols / (cols + 0.5))
+            logger.debug('Drawing floorplan from pyramid level %d', level)
+            layout = floorplan.level(level)
+        # Draw floorplan itself to the lowest layer with full opacity
+        self.ax.imshow(
+            layout, interpolation='bicubic', zorder=1, alpha=1,
+            extent=(-0.5, cols - 0.5, rows - 0.5, -0.5)
+        )
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._base = set(self.ax.get_children())
+
+    def save(self, fname):
+        """
+        Draw everything added to the axes since the last save onto the
+        background, write the figure to ``fname`` as PNG and reset the
+        canvas to the background.
+
+        :param fname: output file name
+        :type fname: str
+        """
+        self.canvas.restore_region(self._background)
+        new = [a for a in self.ax.get_children() if a not in self._base]
+        try:
+            for artist in sorted(new, key=lambda a: a.get_zorder()):
+                self.ax.draw_artist(artist)
+            self.ax.draw_artist(self.ax.title)
+            self.cax.set_visible(True)
+            self.figure.draw_artist(self.cax)
+            Image.fromarray(np.asarray(self.canvas.buffer_rgba())).save(
+                fname, dpi=(PLOT_DPI, PLOT_DPI)
+            )
+        finally:
+            self.clear()
+
+    def clear(self):
+        """Remove everything added to the axes since the background."""
+        for artist in self.ax.get_children():
+            if artist in self._base:
+                continue
+            try:
+                artist.remove()
+            except ValueError:
+                # already removed with its parent, e.g. contour labels
+                pass
+        self.ax.set_title('')
+        self.cax.clear()
+        self.cax.set_visible(False)
+
+
+#: per-thread :py:class:`PlotCanvas` of the most recently plotted floorplan
+_canvases = threading.local()
+
+
+def plot_canvas(floorplan, width, height):
+    """
+    Return a :py:class:`PlotCanvas` for the given floorplan, owned by the
+    calling thread. The canvas of the most recently used floorplan is reused.
+
+    :rtype: PlotCanvas
+    """
+    canvas = getattr(_canvases, 'canvas', None)
+    if canvas is None or canvas.floorplan is not floorplan:
+        logger.debug('Rendering floorplan background')
+        canvas = PlotCanvas(floorplan, width, height)
+        _canvases.canvas = canvas
+    else:
+        # in case the previous plot failed half-way
+        canvas.clear()
+    return canvas
+
+
 class HeatMapGenerator(object):
 
     graphs = {
@@ -143,11 +438,25 @@ class HeatMapGenerator(object):
         'frequency': 'Wi-Fi frequency [GHz]',
         'channel': 'Wi-Fi channel',
         'channel_bitrate': 'Maximum channel bandwidth [MBit/s]',
+        'bssid': 'Serving access point (BSSID)',
     }
 
+    #: metrics with categorical values; these are rendered by assigning
+    #: each location the value of its nearest survey point instead of being
+    #: interpolated
+    categorical = CATEGORICAL + ('bssid',)
+
     def __init__(
         self, image_path, title, showpoints, cname, contours, ignore_ssids=[], aps=None,
-        thresholds=None
+        thresholds=None, interpolation='rbf', neighbors=32,
+        memory_budget=None, memmap_dir=None, metric_interpolation=None,
+        idw_power=2.0, incremental=False, cache_dir=None, jobs=1,
+        image_cache=None, channel_maps=False, channel_map_pngs=False,
+        atlas=False, atlas_threshold=-67.0, raster=None, threads=False,
+        export_grids=False, tiles=None, mask=None, mask_color=None,
+        bin_size=None, bin_aggregate='mean', adaptive=None,
+        rbf_kernel='linear', rbf_epsilon=None, rbf_smooth=0.0, tune=False,
+        rbf_params=None
     ):
         self._ap_names = {}
         if aps is not None:
@@ -159,52 +468,84 @@ class HeatMapGenerator(object):
         self._image_width = 0
         self._image_height = 0
         self._corners = [(0, 0), (0, 0), (0, 0), (0, 0)]
+        self._num_points = 0
+        self._categories = {}
         self._title = title
         self._showpoints = showpoints
+        self._cname = cname
         self._cmap = self.get_cmap(cname)
         self._contours = contours
-        if not self._title.endswith('.json'):
-            self._title += '.json'
+        self._title = survey_path(self._title)
         self._ignore_ssids = ignore_ssids
+        self._interpolation = interpolation
+        self._metric_interpolation = metric_interpolation or {}
+        self._interp_opts = {
+            'neighbors': neighbors, 'power': idw_power, 'adaptive': adaptive,
+            'kernel': rbf_kernel, 'epsilon': rbf_epsilon, 'smooth': rbf_smooth
+        }
+        self._tune = tune
+        self._rbf_params = {}
+        if rbf_params is not None:
+            logger.info('Loading RBF parameters from: %s', rbf_params)
+            with open(rbf_params, 'r') as fh:
+                self._rbf_params = {
+                    k: v['params']
+                    for k, v in json.loads(fh.read())['metrics'].items()
+                }
+        self._memory_budget = memory_budget
+        self._memmap_dir = memmap_dir
+        self._incremental = incremental
+        self._jobs = jobs
+        self._threads = threads
+        self._image_cache = image_cache
+        self._channel_maps = channel_maps or channel_map_pngs
+        self._channel_map_pngs = channel_map_pngs
+        self._atlas = atlas
+        self._raster = raster
+        self._export_grids = export_grids
+        self._tiles = tiles
+        self._mask = mask
+        self._mask_color = mask_color
+        self._grid_mask = None
+        self._mask_key = None
+        self._layout_rgb = None
+        self._atlas_threshold = atlas_threshold
+        self._atlas_points = {}
+        self._atlas_grids = {}
+        self._a = None
+        self._grids = {}
+        self._grid_shape = (0, 0)
+        self._channel_map_channels = []
+        self._channel_util = None
+        self._channel_grids = None
+        self._grid_keys = {}
+        self._cache = None
+        if cache_dir is not None:
+            self._cache = RenderCache(cache_dir)
         logger.debug(
             'Initialized HeatMapGenerator; title=%s',
             self._title
         )
 
-
-        # Remove duplicated entried
-
-        # Read the JSON data from the file
-        with open(self._title, 'r') as file:
-            data = json.load(file)
-
-        # Extract x and y values from survey points and identify duplicates
-        unique_points = set()
-        new_survey_points = []
-
-        for point in data["survey_points"]:
-            coords = (point["x"], point["y"])
-            if coords not in unique_points:
-                unique_points.add(coords)
-                new_survey_points.append(point)
-
-        # Update the survey points in the data to exclude duplicates
-        data["survey_points"] = new_survey_points
-
-        with open(self._title, 'r') as fh:
-            self._data = json.loads(fh.read())
-        if 'survey_points' not in self._data:
-            logger.error('No survey points found in {}'.format(self._title))
+        try:
+            self._survey = load_survey(
+                self._title, metrics=[
+                    k for k in self.graphs.keys() if k in METRICS
+                ], scan=True
+            )
+        except ValueError as ex:
+            logger.error(str(ex))
             exit()
-        logger.info('Loaded %d survey points',
-                    len(self._data['survey_points']))
+        logger.info('Loaded %d survey points', len(self._survey))
+        if bin_size:
+            self._survey = bin_survey(self._survey, bin_size, bin_aggregate)
 
         # Try to load image from JSON if not overwritten
         if image_path is None:
-            if 'img_path' not in self._data:
+            if self._survey.img_path is None:
                 logger.error('No image path found in {}'.format(self._title))
                 exit(1)
-            self._image_path = self._data['img_path']
+            self._image_path = self._survey.img_path
         else:
             self._image_path = image_path
 
@@ -233,85 +574,1030 @@ class HeatMapGenerator(object):
             return pp.get_cmap(cname)
 
     def load_data(self):
-        a = defaultdict(list)
-        for row in self._data['survey_points']:
-            a['x'].append(row['x'])
-            a['y'].append(row['y'])
-            if 'channel' in row['result']:
-                a['channel'].append(row['result']['channel'])
-            if 'tcp' in row['result']:
-                a['tcp_upload_Mbps'].append(
-                    row['result']['tcp']['received_Mbps']
+        """
+        Return the survey data as a dict of NumPy arrays: ``x`` and ``y``,
+        each metric (only if at least one point has it; values for the points
+        that have it, NaN for null values), ``bssid`` and the ``ap`` label of
+        each point.
+
+        :rtype: dict
+        """
+        s = self._survey
+        a = {'x': s.x, 'y': s.y}
+        for key, col in s.columns.items():
+            if s.present[key].any():
+                a[key] = col[s.present[key]]
+        has_bssid = np.array([b is not None for b in s.bssid], dtype=bool)
+        if has_bssid.any():
+            a['bssid'] = s.bssid[has_bssid]
+        if 'frequency' in s.columns:
+            a['ap'] = np.array([
+                '{0} ({1:.1f} GHz)'.format(
+                    self._ap_names.get(str(b).upper(), b), freq
                 )
-            if 'tcp-reverse' in row['result']:
-                a['tcp_download_Mbps'].append(
-                    row['result']['tcp-reverse']['received_Mbps']
+                for b, freq in zip(
+                    s.bssid[s.present['frequency']],
+                    s.columns['frequency'][s.present['frequency']]
                 )
-            if 'udp' in row['result']:
-                a['udp_download_Mbps'].append(row['result']['udp']['Mbps'])
-                a['jitter_download'].append(row['result']['udp']['jitter_ms'])
-            if 'udp-reverse' in row['result']:
-                a['udp_upload_Mbps'].append(
-                    row['result']['udp-reverse']['Mbps'])
-                a['jitter_upload'].append(
-                    row['result']['udp-reverse']['jitter_ms'])
-            if 'tx_power' in row['result']:
-                a['tx_power'].append(row['result']['tx_power'])
-            if 'frequency' in row['result']:
-                a['frequency'].append(row['result']['frequency']*1e-3)
-            if 'bitrate' in row['result']:
-                a['channel_bitrate'].append(row['result']['bitrate'])
-            if 'mac' in row['result']:
-                a['bssid'].append(row['result']['mac'])
-            a['signal_quality'].append(row['result']['signal_mbm']+130)
-            ap = self._ap_names.get(
-                row['result']['mac'].upper(),
-                row['result']['mac']
-            )
-            if 'frequency' in row['result']:
-                a['ap'].append(ap + ' ({0:.1f} GHz)'.format(1e-3*int(row['result']['frequency'])))
+            ], dtype=object)
         return a
 
     def _load_image(self):
-        self._layout = imread(self._image_path)
-        self._image_width = len(self._layout[0])
-        self._image_height = len(self._layout) - 1
-        self._corners = [
-            (0, 0), (0, self._image_height),
-            (self._image_width, 0), (self._image_width, self._image_height)
-        ]
+        """
+        Load the floorplan as a :py:class:`FloorplanPyramid`; the image
+        itself is only decoded by :py:meth:`prepare` if anything needs to be
+        rendered.
+        """
+        if self._image_cache is not None and \
+                self._image_path in self._image_cache:
+            logger.debug('Using already loaded image: %s', self._image_path)
+            self._layout = self._image_cache[self._image_path]
+        else:
+            self._layout = FloorplanPyramid(self._image_path)
+            if self._image_cache is not None:
+                self._image_cache[self._image_path] = self._layout
+        self._image_width = self._layout.width
+        self._image_height = self._layout.height - 1
+        self._corners = image_corners(
+            self._image_width, self._image_height
+        )
         logger.debug(
             'Loaded image with width=%d height=%d',
             self._image_width, self._image_height
         )
 
     def generate(self):
+        tasks = self.prepare()
+        self.finish(
+            tasks, run_render_tasks({0: self}, [(0, t) for t in tasks],
+                                    self._jobs, threads=self._threads)
+        )
+
+    def prepare(self):
+        """
+        Load the survey data and floorplan and interpolate all metrics that
+        need to be rendered.
+
+        :return: list of render tasks, each a tuple of (method name,
+          arguments, render cache key); see :py:func:`run_render_tasks`
+        :rtype: list
+        """
+        a, x, y = self._prepare_grid()
+        tasks = self._channel_graphs()
+        pending = {}
+        exports = {}
+        for k in self.graphs.keys():
+            fname = self._plot_fname(k)
+            if self._export_grids:
+                exports[k] = self._export_key(a, k)
+                if self._cache is not None and self._cache.is_fresh(
+                    self._grid_fname(k), exports[k]
+                ):
+                    logger.info('Skipping unchanged grid: %s',
+                                self._grid_fname(k))
+                    del exports[k]
+            if self._cache is None:
+                pending[k] = None
+                continue
+            pending[k] = self._render_key(a, k)
+            if self._cache.is_fresh(fname, pending[k]):
+                logger.info('Skipping unchanged plot: %s', fname)
+                del pending[k]
+        tile_tasks = []
+        if self._tiles is not None:
+            tile_tasks = self._tile_tasks(a)
+        self._a = a
+        self._grids = self._interpolate(
+            a, x, y, keys=set(pending) | set(exports) | set(
+                args[0] for _, args, _ in tile_tasks
+            )
+        )
+        tasks.extend(
+            ('_render_metric', (k,), render_key)
+            for k, render_key in pending.items()
+        )
+        tasks.extend(
+            ('_export_grid', (k,), export_key)
+            for k, export_key in exports.items()
+        )
+        tasks.extend(tile_tasks)
+        if self._channel_maps:
+            tasks.extend(self._channel_map_tasks(a, x, y))
+        if self._atlas:
+            tasks.extend(self._atlas_tasks(a, x, y))
+        if tasks:
+            # build the floorplan pyramid once, before the render workers
+            # need it
+            self._layout.build()
+        return tasks
+
+    def _prepare_grid(self, grid=None):
+        """
+        Load the floorplan and the survey data, set up the interpolation
+        grid and its mask, and prepare the data for interpolation: null
+        values are zeroed, the image corners are pinned to the minimum of
+        each metric unless a mask is used, and the RBF options are tuned if
+        requested.
+
+        :param grid: optional (x, y, mask, mask key) grid of another
+          generator of the same floorplan to share instead of setting up a
+          new one
+        :type grid: tuple
+        :return: tuple of the data (see :py:meth:`load_data`) and the grid
+          X and Y coordinates
+        :rtype: tuple
+        """
         self._load_image()
         a = self.load_data()
-        for x, y in self._corners:
-            a['x'].append(x)
-            a['y'].append(y)
-            for k in a.keys():
-                if k in ['x', 'y', 'ap']:
+        self._num_points = len(a['x'])
+        if grid is None:
+            x, y = grid_axes(self._image_width, self._image_height)
+            self._grid_mask = self._load_grid_mask(x, y)
+        else:
+            x, y, self._grid_mask, self._mask_key = grid
+        self._grid_shape = (len(x), len(y))
+        for k in a.keys():
+            if k not in ['x', 'y', 'ap'] and a[k].dtype != object:
+                a[k] = np.where(np.isnan(a[k]), 0, a[k])
+        if self._grid_mask is None:
+            a = pin_corners(a, self._image_width, self._image_height)
+        if self._tune:
+            self._tune_rbf(a)
+        return a, x, y
+
+    def finish(self, tasks, results):
+        """
+        Record the outputs of the render tasks returned by :py:meth:`prepare`
+        in the render cache, if any, together with the cached grids they were
+        rendered from, and save its manifest.
+
+        :param tasks: render tasks
+        :type tasks: list
+        :param results: output file name of each task, or None if it did not
+          write a file
+        :type results: list
+        """
+        if self._cache is None:
+            return
+        for (name, args, render_key), fname in zip(tasks, results):
+            if fname is not None:
+                self._cache.record(
+                    fname, render_key, grids=self._task_grids(name, args)
+                )
+        self._cache.save()
+
+    def _task_grids(self, name, args):
+        """
+        Return the keys of the cached grids a render task uses.
+
+        :rtype: list
+        """
+        if name in ('_render_metric', '_export_grid', '_render_tiles'):
+            key = self._grid_keys.get(args[0])
+        elif name in ('_write_channel_maps', '_render_channel_map'):
+            key = self._grid_keys.get('channel-maps')
+        else:
+            key = None
+        return [] if key is None else [key]
+
+    def _render_metric(self, key):
+        """
+        Plot one metric from the interpolated grids computed by
+        :py:meth:`prepare`.
+
+        :return: output file name, or None if nothing was written
+        :rtype: str
+        """
+        try:
+            return self._plot(
+                self._a, key, '%s - %s' % (self._title, self.graphs[key]),
+                self._grids.get(key), *self._grid_shape
+            )
+        except (ValueError, np.linalg.LinAlgError) as ex:
+            logger.warning('Cannot create %s plot: %s', key, ex)
+            return None
+
+    def _render_key(self, a, key):
+        """
+        Return the render cache key of the plot of the given metric, hashed
+        from everything that the plot is rendered from.
+
+        :rtype: str
+        """
+        return digest(
+            'plot', key, self._title, self.graphs[key],
+            a['x'], a['y'], a.get(key), a.get('bssid'),
+            self.thresholds.get(key), self._cname, self._contours,
+            self._showpoints, self._ap_names,
+            self._metric_interpolation.get(key, self._interpolation),
+            self._interp_opts, self._rbf_params.get(key),
+            self._cache.file_digest(self._image_path), self._raster,
+            self._mask_key
+        )
+
+    def _load_grid_mask(self, x, y):
+        """
+        Return the floorplan mask sampled at the grid spanned by ``x`` and
+        ``y``, from the mask image or derived from the floorplan colors, or
+        None if no mask is used. Only the cells inside the mask are
+        interpolated and rendered, and the image corners are not pinned.
+
+        :rtype: numpy.ndarray
+        """
+        if self._mask is not None:
+            logger.info('Loading mask from: %s', self._mask)
+            mask = load_mask(self._mask, x, y)
+        elif self._mask_color is not None:
+            logger.info('Deriving mask from floorplan colors')
+            mask = derive_mask(self._layout, x, y, self._mask_color)
+        else:
+            return None
+        logger.debug('Mask covers %d of %d grid cells', mask.sum(), mask.size)
+        self._mask_key = digest(mask)
+        return mask
+
+    def _apply_mask(self, z):
+        """
+        Return a float32 copy of a grid with the cells outside of the mask
+        (if any) set to NaN, which renders them transparent.
+
+        :rtype: numpy.ndarray
+        """
+        z = np.array(z, dtype=np.float32)
+        if self._grid_mask is not None:
+            z[~self._grid_mask] = np.nan
+        return z
+
+    def _export_key(self, a, key):
+        """
+        Return the render cache key of the exported grid of the given metric;
+        see :py:meth:`_render_key`.
+
+        :rtype: str
+        """
+        if self._cache is None:
+            return None
+        return digest(
+            'grid-export', key, self._title, a['x'], a['y'], a.get(key),
+            self.thresholds.get(key), self._ap_names,
+            self._metric_interpolation.get(key, self._interpolation),
+            self._interp_opts, self._rbf_params.get(key), self._image_path,
+            self._image_width, self._image_height, self._mask_key
+        )
+
+    def _mask_metadata(self):
+        """description of the mask of exported grids, or None"""
+        if self._mask is not None:
+            return {'image': self._mask}
+        if self._mask_color is not None:
+            return {'background': self._mask_color}
+        return None
+
+    def _grid_fname(self, key):
+        """output file name of the exported grid of the given metric"""
+        return 'grid_%s_%s.npy' % (key, self._title)
+
+    def _export_grid(self, key):
+        """
+        Write the interpolated grid of a metric, as plotted, to a float32
+        ``.npy`` file that can be memory-mapped with
+        ``numpy.load(fname, mmap_mode='r')``, and its metadata to a ``.json``
+        file of the same name: the metric, the grid coordinates and extent
+        in floorplan pixels, the thresholds, the value range of the plot,
+        the category labels of categorical metrics and the interpolation
+        method and parameters.
+
+        :return: output file name, or None if nothing was written
+        :rtype: str
+        """
+        a = self._a
+        if key not in a or len(a[key]) != len(a['x']):
+            logger.info('Not exporting %s due to insufficient data', key)
+            return None
+        num_x, num_y = self._grid_shape
+        z = self._grids.get(key)
+        if z is None:
+            # uniform data; nothing was interpolated
+            z = self._apply_mask(np.full((num_y, num_x), min(a[key])))
+        vmin, vmax = self._value_range(a, key)
+        if key in self._categories or (
+            key in self.categorical and key not in self._metric_interpolation
+        ):
+            method = 'nearest'
+        else:
+            method = self._metric_interpolation.get(key, self._interpolation)
+        fname = self._grid_fname(key)
+        logger.info('Writing grid to: %s', fname)
+        with open(fname, 'wb') as fh:
+            np.save(fh, np.asarray(z, dtype=np.float32))
+        meta = {
+            'metric': key,
+            'description': self.graphs[key],
+            'survey': self._title,
+            'image': self._image_path,
+            'image_size': [self._image_width, self._image_height + 1],
+            'shape': [num_y, num_x],
+            'dtype': 'float32',
+            'x': {'start': 0, 'stop': self._image_width, 'num': num_x},
+            'y': {'start': 0, 'stop': self._image_height, 'num': num_y},
+            'extent': [0, self._image_width, self._image_height, 0],
+            'thresholds': self.thresholds.get(key, {}),
+            'range': [float(vmin), float(vmax)],
+            'categories': self._categories.get(key),
+            'interpolation': {
+                'method': method,
+                'incremental': self._incremental and method == 'rbf',
+                'neighbors': self._interp_opts['neighbors'],
+                'power': self._interp_opts['power'],
+                'adaptive': self._interp_opts['adaptive'],
+                'rbf': self._rbf_options(key) if method == 'rbf' else None,
+            },
+            'points': self._num_points,
+            'mask': self._mask_metadata(),
+        }
+        with open(os.path.splitext(fname)[0] + '.json', 'w') as fh:
+            json.dump(meta, fh, indent=4, sort_keys=True)
+        return fname
+
+    def _tile_dir(self, layer, zoom):
+        """directory of one zoom level of a tile layer"""
+        return os.path.join(self._tiles, self._title, layer, str(zoom))
+
+    def _tile_tasks(self, a):
+        """
+        Return the render tasks writing every zoom level of the floorplan
+        tile layer and of the tile layer of every metric, skipping those
+        whose inputs did not change if a render cache is used; see
+        :py:meth:`prepare` and :py:meth:`_render_tiles`.
+
+        :rtype: list
+        """
+        tasks = []
+        layers = ['floorplan'] + [
+            k for k in self.graphs.keys()
+            if k in a and len(a[k]) == len(a['x'])
+        ]
+        full_zoom = max_zoom(self._image_width, self._image_height + 1)
+        for zoom in range(full_zoom + 1):
+            for layer in layers:
+                render_key = None
+                if self._cache is not None:
+                    if layer == 'floorplan':
+                        inputs = self._cache.file_digest(self._image_path)
+                    else:
+                        inputs = self._render_key(a, layer)
+                    render_key = digest('tiles', layer, zoom, inputs)
+                    manifest = os.path.join(
+                        self._tile_dir(layer, zoom), TILE_MANIFEST
+                    )
+                    if self._cache.is_fresh(manifest, render_key):
+                        logger.info('Skipping unchanged tiles: %s',
+                                    self._tile_dir(layer, zoom))
+                        continue
+                tasks.append(('_render_tiles', (layer, zoom), render_key))
+        return tasks
+
+    def _render_tiles(self, layer, zoom):
+        """
+        Write one zoom level of a tile layer: the floorplan, or the colored
+        interpolated grid of a metric (opaque within the floorplan, to be
+        overlaid onto the floorplan layer). Only non-empty tiles that
+        changed since the last run are written; see :py:class:`TileWriter`.
+
+        :param layer: ``floorplan`` or metric name
+        :type layer: str
+        :param zoom: zoom level
+        :type zoom: int
+        :return: path of the tile manifest of the zoom level
+        :rtype: str
+        """
+        width, height = self._image_width, self._image_height + 1
+        full_zoom = max_zoom(width, height)
+        size = zoom_size(width, height, zoom, full_zoom)
+        if layer == 'floorplan':
+            writer = TileWriter(
+                self._tile_dir(layer, zoom), blank=(255, 255, 255, 255)
+            )
+            # the pyramid stops at MIN_LEVEL_SIZE; reduce the smallest
+            # level further for the lowest zoom levels
+            level = full_zoom - zoom
+            last = self._layout.num_levels - 1
+            img = self._layout.level(min(level, last))
+            if level > last:
+                img = np.asarray(
+                    Image.fromarray(img).reduce(2 ** (level - last))
+                )
+            for tx, ty, box in tile_boxes(*size):
+                writer.write(tx, ty, pad_tile(
+                    img[box[1]:box[3], box[0]:box[2]]
+                ))
+            return writer.close()
+        num_x, num_y = self._grid_shape
+        z, vmin, vmax = self._surface(
+            self._a, layer, self._grids.get(layer), num_x, num_y
+        )
+        categorical = (
+            layer in self.categorical or
+            self._categories.get(layer) is not None
+        )
+        grid = Image.fromarray(np.asarray(z, dtype=np.float32), mode='F')
+        sx = grid.width / float(size[0])
+        sy = grid.height / float(size[1])
+        writer = TileWriter(self._tile_dir(layer, zoom))
+        for tx, ty, box in tile_boxes(*size):
+            values = grid.resize(
+                (box[2] - box[0], box[3] - box[1]),
+                Image.NEAREST if categorical else Image.BILINEAR,
+                box=(box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy)
+            )
+            writer.write(tx, ty, pad_tile(
+                colorize(np.asarray(values), self._cmap, vmin, vmax)
+            ))
+        return writer.close()
+
+    def _interpolate(self, a, x, y, keys=None):
+        """
+        Interpolate every plottable metric (or only the metrics in ``keys``,
+        if given) onto the grid spanned by ``x`` and ``y`` at once.
+
+        All metrics are measured at the same survey points, so a single
+        interpolator per interpolation method is fitted to all metrics using
+        that method (one factorization and one multiple right-hand side
+        solve) and evaluated in one pass over the grid. The grid is evaluated
+        in memory-bounded tiles into a float32 array, optionally
+        memory-mapped. Metrics with holes in their data or
+        a single uniform value are left out; :py:meth:`_plot` handles those
+        without interpolation. When a render cache is used, grids found in
+        the cache are reused instead of being interpolated again.
+
+        Categorical metrics (see :py:attr:`categorical`) are not interpolated
+        unless an interpolation method was explicitly given for them; see
+        :py:meth:`_categorical_grids`.
+
+        :return: dict of metric name to interpolated grid of shape
+          ``(len(y), len(x))``
+        :rtype: dict
+        """
+        methods = defaultdict(list)
+        categorical = []
+        grids = {}
+        for key in self.graphs.keys():
+            if keys is not None and key not in keys:
+                continue
+            if key not in a or len(a[key]) != len(a['x']):
+                continue
+            if (
+                key in self.categorical and
+                key not in self._metric_interpolation
+            ) or key == 'bssid':
+                categorical.append(key)
+                continue
+            try:
+                col = np.asarray(a[key], dtype=float)
+            except (TypeError, ValueError):
+                logger.warning('Cannot interpolate non-numeric %s data', key)
+                continue
+            if col.min() == col.max():
+                continue
+            method, params = interpolation_group(
+                key, self._interpolation, self._metric_interpolation,
+                self._rbf_params
+            )
+            grid_key = None
+            if self._cache is not None:
+                grid_key = digest(
+                    'grid', method, self._interp_opts, params, a['x'],
+                    a['y'], col, x, y, self._mask_key
+                )
+                self._grid_keys[key] = grid_key
+                grids[key] = self._cache.load_grid(grid_key)
+                if grids[key] is not None:
                     continue
-                a['ap'].append(None)
-                a[k] = [0 if x is None else x for x in a[k]]
-                a[k].append(min(a[k]))
-        self._channel_graphs()
-        num_x = int(self._image_width / 4)
-        num_y = int(num_x / (self._image_width / self._image_height))
-        x = np.linspace(0, self._image_width, num_x)
-        y = np.linspace(0, self._image_height, num_y)
-        gx, gy = np.meshgrid(x, y)
-        gx, gy = gx.flatten(), gy.flatten()
-        for k, ptitle in self.graphs.items():
+            methods[method, params].append((key, col, grid_key))
+        grids.update(self._categorical_grids(a, categorical, x, y))
+        num = sum(len(items) for items in methods.values())
+        if not num:
+            return grids
+        out = allocate_grids(num, len(y), len(x), self._memmap_dir)
+        start = 0
+        for (method, params), items in methods.items():
+            names = [item[0] for item in items]
+            logger.debug(
+                'Interpolating %d metrics with %s %s: %s', len(names),
+                method, params or '', names
+            )
+            interp = self._fit_interpolator(
+                method, a, np.column_stack([item[1] for item in items]),
+                params=dict(params) if params else None
+            )
+            end = start + len(items)
+            evaluate_grid(
+                interp, x, y, out=out[start:end],
+                memory_budget=self._memory_budget, mask=self._grid_mask,
+                tolerance=self._interp_opts['adaptive']
+            )
+            for i, (key, _, grid_key) in enumerate(items):
+                grids[key] = out[start + i]
+                if grid_key is not None:
+                    self._cache.save_grid(grid_key, grids[key])
+            start = end
+        return grids
+
+    def _fit_interpolator(self, method, a, values, params=None):
+        """
+        Fit an interpolator of the given method to ``values`` (one column per
+        metric) at the survey points (and image corners) in ``a``.
+
+        :param params: options overriding the interpolation options, such as
+          the tuned RBF kernel options of the metrics; the incremental model
+          is only used without them
+        :type params: dict
+        :rtype: wifi_survey_heatmap.interpolation.Interpolator
+        """
+        opts = dict(self._interp_opts, **(params or {}))
+        if method == 'rbf' and self._incremental and params is None:
+            interp = IncrementalRbfInterpolator(
+                a['x'], a['y'], path=self._model_path, **{
+                    k: opts[k] for k in IncrementalRbfInterpolator.options
+                }
+            )
+        else:
+            interp = get_interpolator(method, a['x'], a['y'], **opts)
+        interp.fit(values)
+        if isinstance(interp, IncrementalRbfInterpolator):
+            interp.save()
+        return interp
+
+    def _rbf_options(self, key):
+        """
+        Return the RBF kernel options the given metric is interpolated with,
+        with the default ``epsilon`` resolved.
+
+        :rtype: dict
+        """
+        if key in self._rbf_params:
+            return self._rbf_params[key]
+        epsilon = self._interp_opts['epsilon']
+        if epsilon is None:
+            epsilon = site_spacing(np.column_stack((self._a['x'],
+                                                    self._a['y'])))
+        return {
+            'kernel': self._interp_opts['kernel'], 'epsilon': epsilon,
+            'smooth': self._interp_opts['smooth']
+        }
+
+    def _tune_rbf(self, a):
+        """
+        Choose the RBF kernel options of every metric interpolated with the
+        ``rbf`` method by leave-one-out cross-validation over the survey
+        points (see :py:func:`~wifi_survey_heatmap.interpolation.tune_rbf`),
+        and write the chosen options and the RMSE of every candidate to
+        ``tuning_TITLE.json``. That file can be passed back with
+        ``--rbf-params`` to render with the same options without tuning.
+        """
+        keys = []
+        for key in self.graphs.keys():
+            if key not in a or len(a[key]) != len(a['x']) or (
+                key in self.categorical and
+                key not in self._metric_interpolation
+            ) or key == 'bssid':
+                continue
+            if self._metric_interpolation.get(
+                key, self._interpolation
+            ) != 'rbf' or a[key].dtype == object:
+                continue
+            if a[key].min() != a[key].max():
+                keys.append(key)
+        if not keys:
+            logger.warning('No metrics to tune RBF interpolation for')
+            return
+        logger.info('Tuning RBF interpolation of %d metrics', len(keys))
+        best, results = tune_rbf(
+            a['x'], a['y'], np.column_stack([a[k] for k in keys]),
+            num=self._num_points
+        )
+        report = {'survey': self._title, 'points': self._num_points,
+                  'metrics': {}}
+        for i, key in enumerate(keys):
+            rmse = [
+                float(r[i]) if np.isfinite(r[i]) else None
+                for _, r in results
+            ]
+            chosen = min(r for r in rmse if r is not None)
+            logger.info(
+                'Tuned %s: %s kernel, epsilon %.4g, smooth %.4g; '
+                'leave-one-out RMSE %.4g', key, best[i]['kernel'],
+                best[i]['epsilon'], best[i]['smooth'], chosen
+            )
+            self._rbf_params[key] = best[i]
+            report['metrics'][key] = {
+                'params': best[i],
+                'rmse': chosen,
+                'candidates': [
+                    dict(p, rmse=r) for (p, _), r in zip(results, rmse)
+                ],
+            }
+        fname = 'tuning_%s.json' % self._title
+        logger.info('Writing tuning results to: %s', fname)
+        with open(fname, 'w') as fh:
+            json.dump(report, fh, indent=4, sort_keys=True)
+
+    @property
+    def _model_path(self):
+        """path of the incremental interpolation model for this survey"""
+        return os.path.splitext(self._title)[0] + '.rbf.npz'
+
+    def _categorical_grids(self, a, keys, x, y):
+        """
+        Render categorical metrics by labelling every grid cell with the
+        value of its nearest survey point. The Voronoi label raster of the
+        survey points is computed once and shared by all categorical metrics,
+        so each of them only costs one lookup per cell. The synthetic corner
+        points are left out, as they do not carry a measured category.
+
+        Non-numeric categories (such as the BSSID) are rendered as indices
+        into a sorted list of their labels, which is stored in
+        ``self._categories`` for :py:meth:`_plot`.
+
+        :return: dict of metric name to grid of shape ``(len(y), len(x))``
+        :rtype: dict
+        """
+        if not keys:
+            return {}
+        n = self._num_points
+        labels = nearest_labels(
+            a['x'][:n], a['y'][:n], x, y, memory_budget=self._memory_budget,
+            mask=self._grid_mask
+        )
+        grids = {}
+        for key in keys:
+            values = a[key][:n]
             try:
-                self._plot(
-                    a, k, '%s - %s' % (self._title, ptitle), gx, gy, num_x, num_y
+                values = np.asarray(values, dtype=float)
+            except (TypeError, ValueError):
+                names, values = np.unique(
+                    np.asarray(values, dtype=str), return_inverse=True
                 )
-            except:
-                logger.warning('Cannot create {} plot: '
-                               'insufficient data'.format(k))
+                self._categories[key] = [
+                    self._ap_names.get(name.upper(), name) for name in names
+                ]
+            logger.debug('Labelling categorical metric %s', key)
+            grids[key] = values.astype(np.float32)[labels]
+            if self._grid_mask is not None:
+                grids[key][labels < 0] = np.nan
+        return grids
+
+    def _scan_channels(self):
+        """
+        Return the survey point index, the index into :py:data:`WIFI_CHANNELS`
+        and the quality of every scan result, leaving out ignored SSIDs.
+
+        :raises KeyError: if not every survey point has scan results, or a
+          scan result has an unknown frequency
+        :return: tuple of three arrays
+        :rtype: tuple
+        """
+        if not self._survey.scan_complete:
+            raise KeyError('scan_results')
+        scan = self._survey.scan
+        keep = ~np.isin(scan['ssid'], list(self._ignore_ssids))
+        # center frequency (MHz) and quality of every scan result
+        freq = np.trunc(np.trunc(scan['frequency'][keep]) / 1e6)
+        qual = np.trunc(scan['signal_mbm'][keep]) + 100
+        pos = np.minimum(
+            np.searchsorted(_CHANNEL_FREQS_SORTED, freq),
+            len(_CHANNEL_FREQS_SORTED) - 1
+        )
+        unknown = _CHANNEL_FREQS_SORTED[pos] != freq
+        if unknown.any():
+            raise KeyError(freq[unknown][0])
+        return scan['point'][keep], _CHANNEL_ORDER[pos], qual
+
+    def _channel_utilization(self):
+        """
+        Return the channel utilization at every survey point: the mean
+        quality of the APs seen on each channel at that point, spread over
+        the full bandwidth of each channel like :py:meth:`_channel_to_signal`.
+        Only channels with a non-zero utilization anywhere are returned.
+
+        :raises KeyError: see :py:meth:`_scan_channels`
+        :return: list of channel numbers, and array of the utilization of
+          each of them at each survey point, of shape (points, channels)
+        :rtype: tuple
+        """
+        point, idx, qual = self._scan_channels()
+        shape = (len(self._survey), len(WIFI_CHANNELS))
+        flat = point * shape[1] + idx
+        size = shape[0] * shape[1]
+        counts = np.bincount(flat, minlength=size)
+        sums = np.bincount(flat, weights=qual, minlength=size)
+        mean = np.divide(
+            sums, counts, out=np.zeros(size), where=counts > 0
+        ).reshape(shape)
+        util = mean.dot(_CHANNEL_OVERLAP.T)
+        seen = util.any(axis=0)
+        channels = [
+            WIFI_CHANNELS[x][0]
+            for x, used in zip(WIFI_CHANNELS.keys(), seen) if used
+        ]
+        return channels, util[:, seen]
+
+    def _channel_map_tasks(self, a, x, y):
+        """
+        Interpolate the channel utilization of every channel onto the grid
+        spanned by ``x`` and ``y`` in one batched evaluation, and return the
+        render tasks writing the stacked maps to ``channelmaps_TITLE.npz``
+        and, if requested, one ``channelN_utilization_TITLE.png`` plot per
+        channel; see :py:meth:`prepare`.
+
+        :rtype: list
+        """
+        try:
+            channels, util = self._channel_utilization()
+        except KeyError:
+            logger.warning(
+                'Cannot create channel maps: incomplete scan results'
+            )
+            return []
+        if not channels:
+            logger.warning('Cannot create channel maps: no scan results')
+            return []
+        if self._grid_mask is None:
+            # pin the image corners to the minimum of each channel, like
+            # metrics
+            util = np.vstack([util, np.tile(util.min(axis=0), (4, 1))])
+        self._channel_map_channels = channels
+        self._channel_util = util
+        fname = 'channelmaps_%s.npz' % self._title
+        outputs = [('_write_channel_maps', (fname, x, y), fname)]
+        if self._channel_map_pngs:
+            for i, ch in enumerate(channels):
+                fname = self._plot_fname(self._channel_map_key(ch))
+                outputs.append(('_render_channel_map', (i, fname), fname))
+        grid_key = None
+        tasks = []
+        if self._cache is not None:
+            grid_key = digest(
+                'channel-grids', self._interpolation, self._interp_opts,
+                a['x'], a['y'], util, x, y, self._mask_key
+            )
+            self._grid_keys['channel-maps'] = grid_key
+        for name, args, fname in outputs:
+            render_key = None
+            if self._cache is not None:
+                render_key = digest(
+                    'channel-map', fname, grid_key, channels,
+                    self._title, self._cname, self._contours,
+                    self._showpoints, a.get('bssid'),
+                    self._cache.file_digest(self._image_path)
+                )
+                if self._cache.is_fresh(fname, render_key):
+                    logger.info('Skipping unchanged output: %s', fname)
+                    continue
+            tasks.append((name, args, render_key))
+        if not tasks:
+            return tasks
+        if grid_key is not None:
+            self._channel_grids = self._cache.load_grid(grid_key)
+        if self._channel_grids is None:
+            logger.debug('Interpolating utilization of %d channels',
+                         len(channels))
+            interp = self._fit_interpolator(self._interpolation, a, util)
+            self._channel_grids = evaluate_grid(
+                interp, x, y,
+                out=allocate_grids(
+                    len(channels), len(y), len(x), self._memmap_dir
+                ),
+                memory_budget=self._memory_budget, mask=self._grid_mask,
+                tolerance=self._interp_opts['adaptive']
+            )
+            if grid_key is not None:
+                self._cache.save_grid(grid_key, self._channel_grids)
+        return tasks
+
+    @staticmethod
+    def _channel_map_key(channel):
+        return 'channel%d_utilization' % channel
+
+    def _write_channel_maps(self, fname, x, y):
+        """
+        Write the interpolated channel utilization maps, stacked into an
+        array of shape (channels, len(y), len(x)), to ``fname`` along with
+        the channel numbers and the grid coordinates.
+
+        :return: output file name
+        :rtype: str
+        """
+        logger.info('Writing channel maps to: %s', fname)
+        with open(fname, 'wb') as fh:
+            np.savez(
+                fh, utilization=self._channel_grids,
+                channels=np.array(self._channel_map_channels), x=x, y=y
+            )
+        return fname
+
+    def _render_channel_map(self, idx, fname):
+        """
+        Plot the interpolated utilization map of one channel.
+
+        :return: output file name, or None if nothing was written
+        :rtype: str
+        """
+        channel = self._channel_map_channels[idx]
+        key = self._channel_map_key(channel)
+        a = {
+            'x': self._a['x'],
+            'y': self._a['y'],
+            key: self._channel_util[:, idx],
+        }
+        if 'bssid' in self._a:
+            a['bssid'] = self._a['bssid']
+        try:
+            return self._plot(
+                a, key, '%s - Channel %d utilization' % (self._title, channel),
+                self._channel_grids[idx], *self._grid_shape
+            )
+        except (ValueError, np.linalg.LinAlgError) as ex:
+            logger.warning('Cannot create %s plot: %s', key, ex)
+            return None
+
+    #: best-server atlas rasters plotted by :py:meth:`_atlas_tasks`
+    atlas_graphs = {
+        'atlas_best_server': 'Best server (BSSID)',
+        'atlas_overlap': 'Number of BSSIDs above coverage threshold',
+        'atlas_margin': 'Best server margin over second best [dB]',
+    }
+
+    def _atlas_tasks(self, a, x, y):
+        """
+        Interpolate the signal of every BSSID seen in the scan results onto
+        the grid spanned by ``x`` and ``y`` and reduce the maps to a
+        best-server atlas, and return the render tasks writing it to
+        ``atlas_TITLE.npz`` and plotting its rasters; see :py:meth:`prepare`.
+
+        The BSSIDs are interpolated in chunks sized to the memory budget and
+        folded into running best, second best, best-server and overlap count
+        grids, so only one chunk of per-BSSID grids is alive at a time.
+
+        :rtype: list
+        """
+        if not self._survey.scan_complete:
+            logger.warning('Cannot create atlas: incomplete scan results')
+            return []
+        scan = self._survey.scan
+        bssids = np.asarray(scan['bssid']).astype(str)
+        keep = ~np.isin(scan['ssid'], list(self._ignore_ssids)) & ~np.isin(
+            bssids, ['', 'None']
+        ) & ~np.isnan(scan['signal_mbm'])
+        if not keep.any():
+            logger.warning('Cannot create atlas: no scan results')
+            return []
+        names, inverse = np.unique(bssids[keep], return_inverse=True)
+        point = scan['point'][keep]
+        signal = scan['signal_mbm'][keep]
+        fname = 'atlas_%s.npz' % self._title
+        outputs = [('_write_atlas', (fname, names, x, y), fname)]
+        outputs.extend(
+            ('_render_atlas', (key, names), self._plot_fname(key))
+            for key in self.atlas_graphs.keys()
+        )
+        tasks = []
+        for name, args, out in outputs:
+            render_key = None
+            if self._cache is not None:
+                render_key = digest(
+                    'atlas', out, self._interpolation, self._interp_opts,
+                    a['x'], a['y'], x, y, names, inverse, point, signal,
+                    self._atlas_threshold, self._title, self._cname,
+                    self._contours, self._showpoints, self._ap_names,
+                    a.get('bssid'), self._cache.file_digest(self._image_path),
+                    self._mask_key
+                )
+                if self._cache.is_fresh(out, render_key):
+                    logger.info('Skipping unchanged output: %s', out)
+                    continue
+            tasks.append((name, args, render_key))
+        if not tasks:
+            return tasks
+        # running best-server state of the grid and of the survey points
+        n = self._num_points
+        shape = (len(y), len(x))
+        grids = {
+            'best': np.full(shape, -np.inf, dtype=np.float32),
+            'second': np.full(shape, -np.inf, dtype=np.float32),
+            'server': np.zeros(shape, dtype=np.int32),
+            'overlap': np.zeros(shape, dtype=np.int32),
+        }
+        points = {
+            'best': np.full(n, -np.inf),
+            'second': np.full(n, -np.inf),
+            'server': np.zeros(n, dtype=np.int32),
+            'overlap': np.zeros(n, dtype=np.int32),
+        }
+        budget = self._memory_budget or DEFAULT_MEMORY_BUDGET
+        chunk = max(1, int(budget / 2 / (4 * shape[0] * shape[1])))
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(names) + 1))
+        interp = None
+        out = None
+        for start in range(0, len(names), chunk):
+            end = min(start + chunk, len(names))
+            logger.debug('Interpolating signal of BSSIDs %d-%d of %d',
+                         start + 1, end, len(names))
+            rows = order[bounds[start]:bounds[end]]
+            # strongest signal of each BSSID of the chunk at each point;
+            # the image corners (if any) are pinned to the floor, like
+            # metrics
+            values = np.full((len(a['x']), end - start), ATLAS_FLOOR)
+            np.maximum.at(
+                values, (point[rows], inverse[rows] - start), signal[rows]
+            )
+            accumulate_best_server(
+                points['best'], points['second'], points['server'],
+                points['overlap'], values[:n].T, start,
+                self._atlas_threshold
+            )
+            if interp is None:
+                interp = self._fit_interpolator(self._interpolation, a, values)
+            else:
+                interp.fit(values)
+            if out is None or len(out) != end - start:
+                out = allocate_grids(
+                    end - start, shape[0], shape[1], self._memmap_dir
+                )
+            evaluate_grid(
+                interp, x, y, out=out, memory_budget=self._memory_budget,
+                mask=self._grid_mask, tolerance=self._interp_opts['adaptive']
+            )
+            accumulate_best_server(
+                grids['best'], grids['second'], grids['server'],
+                grids['overlap'], out, start, self._atlas_threshold
+            )
+        for state in (grids, points):
+            state['margin'] = state['best'] - np.maximum(
+                state['second'], ATLAS_FLOOR
+            )
+        self._atlas_grids = grids
+        self._atlas_points = points
+        return tasks
+
+    def _write_atlas(self, fname, names, x, y):
+        """
+        Write the best-server atlas rasters computed by
+        :py:meth:`_atlas_tasks` to ``fname``.
+
+        :return: output file name
+        :rtype: str
+        """
+        logger.info('Writing atlas to: %s', fname)
+        g = self._atlas_grids
+        with open(fname, 'wb') as fh:
+            np.savez(
+                fh, best_server=g['server'], best_signal=g['best'],
+                second_signal=g['second'], margin=g['margin'],
+                overlap=g['overlap'], bssids=names, x=x, y=y,
+                threshold=self._atlas_threshold,
+                mask=(
+                    np.ones(g['server'].shape, dtype=bool)
+                    if self._grid_mask is None else self._grid_mask
+                )
+            )
+        return fname
+
+    def _render_atlas(self, key, names):
+        """
+        Plot one of the best-server atlas rasters computed by
+        :py:meth:`_atlas_tasks`.
+
+        :return: output file name, or None if nothing was written
+        :rtype: str
+        """
+        state = {
+            'atlas_best_server': 'server',
+            'atlas_overlap': 'overlap',
+            'atlas_margin': 'margin',
+        }[key]
+        n = self._num_points
+        a = {
+            'x': self._a['x'][:n],
+            'y': self._a['y'][:n],
+            key: self._atlas_points[state].astype(float),
+        }
+        if 'bssid' in self._a:
+            a['bssid'] = self._a['bssid'][:n]
+        if key == 'atlas_best_server':
+            self._categories[key] = [
+                self._ap_names.get(name.upper(), name) for name in names
+            ]
+        try:
+            return self._plot(
+                a, key, '%s - %s' % (self._title, self.atlas_graphs[key]),
+                self._apply_mask(self._atlas_grids[state]),
+                *self._grid_shape
+            )
+        except (ValueError, np.linalg.LinAlgError) as ex:
+            logger.warning('Cannot create %s plot: %s', key, ex)
+            return None
 
     def _channel_to_signal(self):
         """
@@ -319,40 +1605,26 @@ class HeatMapGenerator(object):
         for all APs seen on the given channel. This includes interpolation to
         overlapping channels based on channel width of each channel.
         """
-        # build a dict of frequency (GHz) to list of quality values
-        channels = defaultdict(list)
-        for row in self._data['survey_points']:
-            for scan in row['result']['scan_results']:
-                ssid = row['result']['scan_results'][scan]['ssid']
-                if ssid in self._ignore_ssids:
-                    continue
-                freq = int(row['result']['scan_results'][scan]['frequency']) / 1e6
-                channels[int(freq)].append(
-                    int(row['result']['scan_results'][scan]['signal_mbm']) + 100
-                )
-        # collapse down to dict of frequency (GHz) to average quality (float)
-        for freq in channels.keys():
-            channels[freq] = sum(channels[freq]) / len(channels[freq])
-        # build the full dict of frequency to quality for all channels
-        freq_qual = {x: 0.0 for x in WIFI_CHANNELS.keys()}
-        # then, update to account for full bandwidth of each channel
-        for freq, qual in channels.items():
-            freq_qual[freq] += qual
-            for spread in range(
-                int(freq - (WIFI_CHANNELS[freq][1] / 2.0)),
-                int(freq + (WIFI_CHANNELS[freq][1] / 2.0) + 1.0)
-            ):
-                if spread in freq_qual and spread != freq:
-                    freq_qual[spread] += qual
+        _, idx, qual = self._scan_channels()
+        # average quality of each channel
+        counts = np.bincount(idx, minlength=len(WIFI_CHANNELS))
+        sums = np.bincount(idx, weights=qual, minlength=len(WIFI_CHANNELS))
+        mean = np.divide(
+            sums, counts, out=np.zeros(len(WIFI_CHANNELS)), where=counts > 0
+        )
+        # then, spread it over the full bandwidth of each channel
+        freq_qual = _CHANNEL_OVERLAP.dot(mean)
         return {
-            WIFI_CHANNELS[x][0]: freq_qual[x] for x in freq_qual.keys()
+            WIFI_CHANNELS[x][0]: freq_qual[i]
+            for i, x in enumerate(WIFI_CHANNELS.keys())
         }
 
     def _plot_channels(self, names, values, title, fname, ticks):
-        pp.rcParams['figure.figsize'] = (
-            self._image_width / 300, self._image_height / 300
+        fig = Figure(
+            figsize=(self._image_width / 300, self._image_height / 300)
         )
-        fig, ax = pp.subplots()
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
         ax.set_title(title)
         ax.bar(names, values)
         ax.set_xlabel('Channel')
@@ -360,14 +1632,20 @@ class HeatMapGenerator(object):
         ax.set_xticks(ticks)
         # ax.set_xticklabels(names)
         logger.info('Writing plot to: %s', fname)
-        pp.savefig(fname, dpi=300)
-        pp.close('all')
+        fig.savefig(fname, dpi=PLOT_DPI)
+        return fname
 
     def _channel_graphs(self):
+        """
+        Return the render tasks for the 2.4 GHz and 5 GHz channel utilization
+        graphs; see :py:meth:`prepare`.
+
+        :rtype: list
+        """
         try:
             c2s = self._channel_to_signal()
         except KeyError:
-            return
+            return []
         names24 = []
         values24 = []
         names5 = []
@@ -379,19 +1657,30 @@ class HeatMapGenerator(object):
             else:
                 names5.append(ch)
                 values5.append(val)
-        self._plot_channels(
-            names24, values24, '2.4GHz Channel Utilization',
-            '%s_%s.png' % ('channels24', self._title),
-            names24
-        )
         ticks5 = [
             38, 46, 54, 62, 102, 110, 118, 126, 134, 142, 151, 159
         ]
-        self._plot_channels(
-            names5, values5, '5GHz Channel Utilization',
-            '%s_%s.png' % ('channels5', self._title),
-            ticks5
-        )
+        tasks = []
+        for args in [
+            (
+                names24, values24, '2.4GHz Channel Utilization',
+                '%s_%s.png' % ('channels24', self._title), names24
+            ),
+            (
+                names5, values5, '5GHz Channel Utilization',
+                '%s_%s.png' % ('channels5', self._title), ticks5
+            )
+        ]:
+            render_key = None
+            if self._cache is not None:
+                render_key = digest(
+                    'channels', args, self._image_width, self._image_height
+                )
+                if self._cache.is_fresh(args[3], render_key):
+                    logger.info('Skipping unchanged plot: %s', args[3])
+                    continue
+            tasks.append(('_plot_channels', args, render_key))
+        return tasks
 
     def _add_inner_title(self, ax, title, loc, size=None, **kwargs):
         if size is None:
@@ -421,7 +1710,94 @@ class HeatMapGenerator(object):
         return markers[:50]
 
 
-    def _plot(self, a, key, title, gx, gy, num_x, num_y):
+    def _value_range(self, a, key):
+        """
+        Return the range of values of a metric mapped onto the colormap:
+        from the thresholds if given, else the range of its data.
+
+        :rtype: tuple
+        """
+        if 'min' in self.thresholds.get(key, {}):
+            vmin = self.thresholds[key]['min']
+            logger.debug('Using min threshold from thresholds: %s', vmin)
+        else:
+            vmin = min(a[key])
+            logger.debug('Using calculated min threshold: %s', vmin)
+        if 'max' in self.thresholds.get(key, {}):
+            vmax = self.thresholds[key]['max']
+            logger.debug('Using max threshold from thresholds: %s', vmax)
+        else:
+            vmax = max(a[key])
+            logger.debug('Using calculated max threshold: %s', vmax)
+        categories = self._categories.get(key)
+        if categories is not None:
+            # values are indices into the list of category labels
+            vmin = 0
+            vmax = len(categories) - 1
+        logger.info("{} has range [{},{}]".format(key, vmin, vmax))
+        return vmin, vmax
+
+    def _surface(self, a, key, z, num_x, num_y):
+        """
+        Return the grid of a metric as plotted, and its value range; see
+        :py:meth:`_value_range`.
+
+        :return: tuple of grid, vmin and vmax
+        :rtype: tuple
+        """
+        vmin, vmax = self._value_range(a, key)
+        # Use the interpolated data only if there is something to interpolate
+        if vmin == vmax:
+            # Uniform array with the same color everywhere
+            # (avoids interpolation artifacts)
+            z = self._apply_mask(numpy.ones((num_y, num_x))*vmin)
+        elif z is None:
+            # Uniform data; nothing was interpolated
+            z = self._apply_mask(numpy.ones((num_y, num_x))*min(a[key]))
+        return z, vmin, vmax
+
+    def _plot_fname(self, key):
+        """output file name of the plot of the given metric"""
+        ext = 'png' if self._raster is None else self._raster
+        return '%s_%s.%s' % (key, self._title, ext)
+
+    def _floorplan_rgb(self):
+        """
+        Return the floorplan as an RGB uint8 array, converting it on first
+        use.
+
+        :rtype: numpy.ndarray
+        """
+        if self._layout_rgb is None:
+            self._layout_rgb = floorplan_rgb(self._layout.level(0))
+        return self._layout_rgb
+
+    def _raster_plot(self, key, z, vmin, vmax):
+        """
+        Write the interpolated grid of a metric, colored with the colormap
+        and alpha-blended onto the floorplan, directly with Pillow, without
+        any matplotlib figure, axes, colorbar or legend.
+
+        :return: output file name
+        :rtype: str
+        """
+        categorical = (
+            key in self.categorical or self._categories.get(key) is not None
+        )
+        overlay = Image.fromarray(colorize(z, self._cmap, vmin, vmax))
+        base = self._floorplan_rgb()
+        overlay = overlay.resize(
+            (base.shape[1], base.shape[0]),
+            Image.NEAREST if categorical else Image.BILINEAR
+        )
+        fname = self._plot_fname(key)
+        logger.info('Writing raster to: %s', fname)
+        Image.fromarray(
+            blend(base, np.asarray(overlay), RASTER_ALPHA)
+        ).save(fname, **RASTER_SAVE_OPTIONS[self._raster])
+        return fname
+
+    def _plot(self, a, key, title, z, num_x, num_y):
         if key not in a:
             logger.info("Skipping {} due to insufficient data".format(key))
             return
@@ -432,44 +1808,29 @@ class HeatMapGenerator(object):
 
         # Create a mapping of BSSIDs to unique markers
         # Create a mapping of BSSIDs to unique markers
-        unique_bssids = list(set(a['bssid']))
+        bssids = a.get('bssid')
+        if bssids is None or len(bssids) != len(a['x']):
+            # not every point has a BSSID to pick its marker by
+            bssids = [None] * len(a['x'])
+        unique_bssids = [b for b in set(bssids) if b is not None]
         markers = self.generate_markers()
         bssid_to_marker = {bssid: markers[i % len(markers)] for i, bssid in enumerate(unique_bssids)}
 
     
 
 
-        pp.rcParams['figure.figsize'] = (
-            self._image_width / 100, self._image_height / 250
+        z, vmin, vmax = self._surface(a, key, z, num_x, num_y)
+        categories = self._categories.get(key)
+        if self._raster is not None:
+            return self._raster_plot(key, z, vmin, vmax)
+
+        canvas = plot_canvas(
+            self._layout, self._image_width, self._image_height
         )
-        fig, ax = pp.subplots()
+        fig = canvas.figure
+        ax = canvas.ax
         ax.set_title(title, fontsize=10)
-        if 'min' in self.thresholds.get(key, {}):
-            vmin = self.thresholds[key]['min']
-            logger.debug('Using min threshold from thresholds: %s', vmin)
-        else:
-            vmin = min(a[key])
-            logger.debug('Using calculated min threshold: %s', vmin)
-        if 'max' in self.thresholds.get(key, {}):
-            vmax = self.thresholds[key]['max']
-            logger.debug('Using max threshold from thresholds: %s', vmax)
-        else:
-            vmax = max(a[key])
-            logger.debug('Using calculated max threshold: %s', vmax)
-        logger.info("{} has range [{},{}]".format(key, vmin, vmax))
-        # Interpolate the data only if there is something to interpolate
-        if vmin != vmax:
-            rbf = Rbf(
-                a['x'], a['y'], a[key], function='linear'
-            )
-            z = rbf(gx, gy)
-            z = z.reshape((num_y, num_x))
-        else:
-            # Uniform array with the same color everywhere
-            # (avoids interpolation artifacts)
-            z = numpy.ones((num_y, num_x))*vmin
         # Render the interpolated data to the plot
-        ax.axis('off')
         # begin color mapping
         norm = matplotlib.colors.Normalize(vmin=vmin, vmax=vmax, clip=True)
         mapper = cm.ScalarMappable(norm=norm, cmap=self._cmap)
@@ -478,23 +1839,30 @@ class HeatMapGenerator(object):
             z,
             extent=(0, self._image_width, self._image_height, 0),
             alpha=0.5, zorder=100,
-            cmap=self._cmap, vmin=vmin, vmax=vmax
+            cmap=self._cmap, vmin=vmin, vmax=vmax,
+            interpolation=(
+                'nearest' if key in self.categorical or categories else None
+            )
         )
 
         # Draw contours if requested and meaningful in this plot
-        if self._contours is not None and vmin != vmax:
+        if (
+            self._contours is not None and vmin != vmax and
+            key not in self.categorical and categories is None
+        ):
             CS = ax.contour(z, colors='k', linewidths=1, levels=self._contours,
                             extent=(0, self._image_width, self._image_height, 0),
                             alpha=0.3, zorder=150, origin='upper')
             ax.clabel(CS, inline=1, fontsize=6)
-        cbar = fig.colorbar(image)
+        cbar = fig.colorbar(image, cax=canvas.cax)
 
         # Print only one ytick label when there is only one value to be shown
         if vmin == vmax:
             cbar.set_ticks([vmin])
+        if categories is not None:
+            cbar.set_ticks(range(len(categories)))
+            cbar.set_ticklabels(categories)
 
-        # Draw floorplan itself to the lowest layer with full opacity
-        ax.imshow(self._layout, interpolation='bicubic', zorder=1, alpha=1)
         labelsize = FontManager.get_default_size() * 0.4
         if(self._showpoints):
             # begin plotting points
@@ -515,7 +1883,9 @@ class HeatMapGenerator(object):
                 for idx in range(0, len(a['x'])):
                     if (a['x'][idx], a['y'][idx]) in self._corners:
                         continue
-                    style, color = bssid_to_marker[a['bssid'][idx]]
+                    style, color = bssid_to_marker.get(
+                        bssids[idx], ('o', 'black')
+                    )
                     ax.plot(
                         a['x'][idx], a['y'][idx], zorder=200,
                         marker=style, 
@@ -528,25 +1898,115 @@ class HeatMapGenerator(object):
         legend_handles = [matplotlib.lines.Line2D([0], [0], marker=style, color='w', 
                                           markerfacecolor=color, markersize=4, label=bssid) 
                   for bssid, (style, color) in bssid_to_marker.items()]
-        ax.legend(handles=legend_handles, loc='upper left', bbox_to_anchor=(-1, 1), fontsize=4, ncol=2)  # Adjust ncol as needed
+        if legend_handles:
+            ax.legend(handles=legend_handles, loc='upper left', bbox_to_anchor=(-1, 1), fontsize=4, ncol=2)  # Adjust ncol as needed
 
     
-        fname = '%s_%s.png' % (key, self._title)
+        fname = self._plot_fname(key)
         logger.info('Writing plot to: %s', fname)
-        pp.savefig(fname, dpi=300)
-        pp.close('all')
+        canvas.save(fname)
+        return fname
 
 
-def parse_args(argv):
+#: generators available to render worker processes, by ID
+_worker_generators = {}
+
+
+def _init_render_worker(generators):
     """
-    parse arguments/options
+    Initializer of render worker processes. The generators, with their
+    decoded floorplans and interpolated grids, are handed to each worker once
+    here instead of with every task.
+    """
+    global _worker_generators
+    _worker_generators = generators
 
-    this uses the new argparse module instead of optparse
-    see: <https://docs.python.org/2/library/argparse.html>
+
+def _timed_render_task(generator, task):
+    """
+    Run one render task.
+
+    :return: the task result and the time it took, in seconds
+    :rtype: tuple
+    """
+    name, args, _ = task
+    start = time.time()
+    res = getattr(generator, name)(*args)
+    return res, time.time() - start
+
+
+def _run_render_task(gen_id, task):
+    return _timed_render_task(_worker_generators[gen_id], task)
+
+
+def run_render_tasks(generators, tasks, jobs=1, progress=None,
+                     threads=False):
+    """
+    Run render tasks, either serially or spread over a pool of ``jobs``
+    worker processes (or threads).
+
+    :param generators: dict of generator ID to prepared
+      :py:class:`HeatMapGenerator`
+    :type generators: dict
+    :param tasks: list of (generator ID, task) tuples, where each task is a
+      (method name, arguments, render cache key) tuple as returned by
+      :py:meth:`HeatMapGenerator.prepare`
+    :type tasks: list
+    :param jobs: number of worker processes
+    :type jobs: int
+    :param progress: optional callable, called with the index of each task,
+      its result and the time it took (in seconds) as the tasks complete
+    :param threads: whether to use a pool of threads instead of processes;
+      each thread renders on its own :py:class:`PlotCanvas`
+    :type threads: bool
+    :return: result of each task, in order
+    :rtype: list
+    """
+    results = [None] * len(tasks)
+    if jobs <= 1 or len(tasks) <= 1:
+        for idx, (gen_id, task) in enumerate(tasks):
+            results[idx], elapsed = _timed_render_task(
+                generators[gen_id], task
+            )
+            if progress is not None:
+                progress(idx, results[idx], elapsed)
+        return results
+    if threads:
+        logger.info('Rendering %d plots with %d threads', len(tasks), jobs)
+        pool = ThreadPoolExecutor(max_workers=jobs)
+    else:
+        logger.info('Rendering %d plots with %d processes', len(tasks), jobs)
+        pool = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_render_worker,
+            initargs=(generators,)
+        )
+    with pool:
+        if threads:
+            futures = {
+                pool.submit(_timed_render_task, generators[gen_id], task): idx
+                for idx, (gen_id, task) in enumerate(tasks)
+            }
+        else:
+            futures = {
+                pool.submit(_run_render_task, gen_id, task): idx
+                for idx, (gen_id, task) in enumerate(tasks)
+            }
+        for f in as_completed(futures):
+            idx = futures[f]
+            results[idx], elapsed = f.result()
+            if progress is not None:
+                progress(idx, results[idx], elapsed)
+    return results
+
+
+def add_generator_arguments(p):
+    """
+    Add the options of :py:class:`HeatMapGenerator` to an argument parser;
+    see :py:func:`generator_kwargs`.
+
+    :param p: argument parser
+    :type p: argparse.ArgumentParser
     """
-    p = argparse.ArgumentParser(description='wifi survey heatmap generator')
-    p.add_argument('-v', '--verbose', dest='verbose', action='count', default=0,
-                   help='verbose output. specify twice for debug-level output.')
     p.add_argument('-i', '--ignore', dest='ignore', action='append',
                    default=[], help='SSIDs to ignore from channel graph')
     p.add_argument('-t', '--thresholds', dest='thresholds', action='store',
@@ -563,44 +2023,151 @@ def parse_args(argv):
     p.add_argument('-n', '--contours', type=int, dest='N', action='store',
                    default=None,
                    help='If specified, N contour lines will be added to the graphs')
-    p.add_argument('-p', '--picture', dest='IMAGE', type=str, action='store',
-                   default=None, help='Path to background image')
-    p.add_argument(
-        'TITLE', type=str, help='Title for survey (and data filename)'
-    )
+    add_interpolation_arguments(p, HeatMapGenerator.graphs)
+    p.add_argument('--bin-size', dest='bin_size', type=float,
+                   action='store', default=None, metavar='PIXELS',
+                   help='Before interpolating, bin the survey points into '
+                        'square cells of this size, in floorplan pixels, '
+                        'and reduce each cell to one point; for densely '
+                        'sampled surveys')
+    p.add_argument('--bin-aggregate', dest='bin_aggregate', action='store',
+                   default='mean', choices=AGGREGATES,
+                   help='How to aggregate the values of the points in each '
+                        '--bin-size cell (default: mean)')
+    p.add_argument('--tune', dest='tune', action='store_true',
+                   default=False,
+                   help='Choose the "rbf" kernel, epsilon and smoothing of '
+                        'each metric from a set of candidates by '
+                        'leave-one-out cross-validation, and write the '
+                        'choices and the RMSE of every candidate to '
+                        'tuning_TITLE.json')
+    p.add_argument('--incremental', dest='incremental', action='store_true',
+                   default=False,
+                   help='Keep the "rbf" interpolation model in TITLE.rbf.npz '
+                        'and only update it for added or removed survey '
+                        'points on later runs')
+    p.add_argument('--cache-dir', dest='cache_dir', type=str,
+                   action='store', default=None,
+                   help='If specified, cache outputs and interpolated grids '
+                        'in this directory and skip re-rendering plots whose '
+                        'inputs did not change')
+    p.add_argument('-j', '--jobs', dest='jobs', type=int, action='store',
+                   default=1,
+                   help='Number of processes to render plots with '
+                        '(default: 1)')
+    p.add_argument('--threads', dest='threads', action='store_true',
+                   default=False,
+                   help='Render plots with --jobs threads instead of '
+                        'processes, avoiding copying the survey data and '
+                        'grids to worker processes')
+    p.add_argument('--memmap-dir', dest='memmap_dir', type=str,
+                   action='store', default=None,
+                   help='If specified, keep the interpolated grids in '
+                        'memory-mapped temporary files in this directory '
+                        'instead of in memory')
+    p.add_argument('--channel-maps', dest='channel_maps', action='store_true',
+                   default=False,
+                   help='Also interpolate the utilization of every channel '
+                        'seen in the scan results across the floorplan, and '
+                        'write the maps to channelmaps_TITLE.npz')
+    p.add_argument('--channel-map-pngs', dest='channel_map_pngs',
+                   action='store_true', default=False,
+                   help='Like --channel-maps, and also plot the map of each '
+                        'channel to channelN_utilization_TITLE.png')
+    p.add_argument('--atlas', dest='atlas', action='store_true',
+                   default=False,
+                   help='Also interpolate the signal of every BSSID seen in '
+                        'the scan results, and write the best-server, '
+                        'overlap count and margin rasters to atlas_TITLE.npz '
+                        'and atlas_*_TITLE.png')
+    p.add_argument('--atlas-threshold', dest='atlas_threshold', type=float,
+                   action='store', default=-67.0,
+                   help='Signal (dBm) a BSSID needs at a location to count '
+                        'towards the atlas overlap count (default: -67)')
+    p.add_argument('--raster', dest='raster', action='store', default=None,
+                   choices=['png', 'webp'],
+                   help='Instead of full plots, write just the colored '
+                        'heatmaps blended onto the floorplan, in this '
+                        'format, without titles, colorbars, contours or '
+                        'points. Much faster; intended for tiles and '
+                        'dashboards.')
+    p.add_argument('--export-grids', dest='export_grids',
+                   action='store_true', default=False,
+                   help='Also write the interpolated grid of every metric '
+                        'to a memory-mappable float32 grid_METRIC_TITLE.npy '
+                        'file, with its metadata in grid_METRIC_TITLE.json')
+    p.add_argument('--tiles', dest='tiles', type=str, action='store',
+                   default=None, metavar='DIR',
+                   help='Also write XYZ tile pyramids (256px PNG tiles) of '
+                        'the floorplan and of every metric to '
+                        'DIR/TITLE/LAYER/Z/X/Y.png, only rewriting tiles '
+                        'that changed')
+    p.add_argument('--mask', dest='mask', type=str, action='store',
+                   default=None,
+                   help='Path to a mask image of the same size as the '
+                        'floorplan; only its non-black, non-transparent '
+                        'area is interpolated and rendered')
+    p.add_argument('--mask-color', dest='mask_color', type=parse_color,
+                   action='store', default=None, metavar='RRGGBB',
+                   help='Derive the mask from the floorplan instead: the '
+                        'area of this background color (or "transparent") '
+                        'connected to the edges of the image is outside of '
+                        'the building')
     p.add_argument('-s', '--show-points', dest='showpoints', action='count',
                    default=0, help='show measurement points in file')
-    args = p.parse_args(argv)
-    return args
-
 
-def set_log_info():
-    """set logger level to INFO"""
-    set_log_level_format(logging.INFO,
-                         '%(asctime)s %(levelname)s:%(name)s:%(message)s')
 
+def generator_kwargs(args):
+    """
+    Return the :py:class:`HeatMapGenerator` keyword arguments for options
+    added by :py:func:`add_generator_arguments`.
 
-def set_log_debug():
-    """set logger level to DEBUG, and debug-level output format"""
-    set_log_level_format(
-        logging.DEBUG,
-        "%(asctime)s [%(levelname)s %(filename)s:%(lineno)s - "
-        "%(name)s.%(funcName)s() ] %(message)s"
+    :param args: parsed arguments
+    :type args: argparse.Namespace
+    :rtype: dict
+    """
+    return dict(
+        interpolation_kwargs(args),
+        showpoints=args.showpoints > 0, cname=args.CNAME, contours=args.N,
+        ignore_ssids=args.ignore, aps=args.aps, thresholds=args.thresholds,
+        memmap_dir=args.memmap_dir, incremental=args.incremental,
+        cache_dir=args.cache_dir, jobs=args.jobs,
+        channel_maps=args.channel_maps,
+        channel_map_pngs=args.channel_map_pngs,
+        atlas=args.atlas, atlas_threshold=args.atlas_threshold,
+        raster=args.raster, threads=args.threads,
+        export_grids=args.export_grids, tiles=args.tiles, mask=args.mask,
+        mask_color=args.mask_color, bin_size=args.bin_size,
+        bin_aggregate=args.bin_aggregate, tune=args.tune
     )
 
 
-def set_log_level_format(level, format):
+def parse_args(argv):
     """
-    Set logger level and format.
+    parse arguments/options
 
-    :param level: logging level; see the :py:mod:`logging` constants.
-    :type level: int
-    :param format: logging formatter format string
-    :type format: str
+    this uses the new argparse module instead of optparse
+    see: <https://docs.python.org/2/library/argparse.html>
     """
-    formatter = logging.Formatter(fmt=format)
-    logger.handlers[0].setFormatter(formatter)
-    logger.setLevel(level)
+    p = argparse.ArgumentParser(description='wifi survey heatmap generator')
+    p.add_argument('-v', '--verbose', dest='verbose', action='count', default=0,
+                   help='verbose output. specify twice for debug-level output.')
+    add_generator_arguments(p)
+    p.add_argument('-p', '--picture', dest='IMAGE', type=str, action='store',
+                   default=None, help='Path to background image')
+    p.add_argument('--diff', dest='diff', type=str, action='store',
+                   default=None, metavar='BEFORE',
+                   help='Instead of the heatmaps of TITLE, render the signed '
+                        'difference of every metric between TITLE and the '
+                        'BEFORE survey of the same floorplan to '
+                        'diff_METRIC_BEFORE_TITLE.png, and write the '
+                        'difference grids and their statistics to '
+                        'diff_BEFORE_TITLE.npz and .json')
+    p.add_argument(
+        'TITLE', type=str, help='Title for survey (and data filename)'
+    )
+    args = p.parse_args(argv)
+    return args
 
 
 def main():
@@ -612,11 +2179,16 @@ def main():
     elif args.verbose == 1:
         set_log_info()
 
-    showpoints = True if args.showpoints > 0 else False
+    if args.diff is not None:
+        # the diff module builds on this one
+        from wifi_survey_heatmap.diff import DiffGenerator
+        DiffGenerator(
+            args.IMAGE, args.diff, args.TITLE, **generator_kwargs(args)
+        ).generate()
+        return
 
     HeatMapGenerator(
-        args.IMAGE, args.TITLE, showpoints, args.CNAME, args.N,
-        ignore_ssids=args.ignore, aps=args.aps, thresholds=args.thresholds
+        args.IMAGE, args.TITLE, **generator_kwargs(args)
     ).generate()
 
 
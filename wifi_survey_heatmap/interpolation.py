@@ -0,0 +1,1274 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+from scipy.linalg import LinAlgError, lstsq, lu_factor, lu_solve, solve
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import Delaunay, cKDTree
+from scipy.spatial.distance import cdist
+from scipy.special import xlogy
+
+try:
+    from scipy.spatial import QhullError
+except ImportError:
+    from scipy.spatial.qhull import QhullError
+
+logger = logging.getLogger(__name__)
+
+#: default memory budget for one tile of grid evaluation, in bytes
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+#: largest residual at the survey sites, relative to the largest value, of an
+#: updated :py:class:`IncrementalRbfInterpolator` model before it is rebuilt
+INCREMENTAL_TOLERANCE = 1e-6
+
+#: size, in grid cells, of the coarse cells that adaptive evaluation starts
+#: from; see :py:func:`evaluate_adaptive`
+ADAPTIVE_CELL_SIZE = 16
+
+#: radial basis functions of :py:class:`RbfInterpolator`, by name, as
+#: functions of the distance ``r`` and the shape parameter ``epsilon``; the
+#: same as those of :py:class:`scipy.interpolate.Rbf`
+RBF_KERNELS = {
+    'linear': lambda r, epsilon: r,
+    'cubic': lambda r, epsilon: r ** 3,
+    'thin_plate': lambda r, epsilon: xlogy(r ** 2, r),
+    'multiquadric': lambda r, epsilon: np.sqrt((r / epsilon) ** 2 + 1),
+    'inverse': lambda r, epsilon: 1.0 / np.sqrt((r / epsilon) ** 2 + 1),
+    'gaussian': lambda r, epsilon: np.exp(-(r / epsilon) ** 2),
+}
+
+#: kernels of :py:data:`RBF_KERNELS` that depend on ``epsilon``
+RBF_SHAPED_KERNELS = ('multiquadric', 'inverse', 'gaussian')
+
+#: candidate options of :py:func:`tune_rbf`; ``epsilon`` is a multiple of
+#: the average spacing of the survey sites and ``smooth`` a fraction of the
+#: mean magnitude of the kernel matrix
+RBF_CANDIDATES = [
+    {'kernel': kernel, 'epsilon': epsilon, 'smooth': smooth}
+    for kernel in sorted(RBF_KERNELS)
+    for epsilon in (
+        (0.5, 1.0, 2.0, 4.0) if kernel in RBF_SHAPED_KERNELS else (1.0,)
+    )
+    for smooth in (0.0, 0.001, 0.01, 0.1)
+]
+
+
+class Interpolator(object):
+    """
+    Base class for the interpolation backends used by
+    :py:class:`~wifi_survey_heatmap.heatmap.HeatMapGenerator`.
+
+    An interpolator is constructed from the survey sites, fitted to one or
+    more columns of values measured at those sites and then called with the
+    coordinates to evaluate the surface at.
+    """
+
+    #: name of the backend, as selected on the command line
+    name = None
+
+    #: keyword options accepted by the constructor
+    options = ()
+
+    def __init__(self, x, y):
+        self._sites = np.column_stack((
+            np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        ))
+        self._values = None
+        self._squeeze = False
+
+    def fit(self, values):
+        """
+        Fit the interpolator to the given values.
+
+        :param values: values at the survey sites; either one value per site
+          or an array of shape ``(sites, metrics)``
+        :type values: list or numpy.ndarray
+        :return: this interpolator
+        :rtype: Interpolator
+        """
+        values = np.asarray(values, dtype=float)
+        self._squeeze = values.ndim == 1
+        if self._squeeze:
+            values = values[:, np.newaxis]
+        if values.shape[0] != self._sites.shape[0]:
+            raise ValueError(
+                'Got %d values for %d sites' % (
+                    values.shape[0], self._sites.shape[0]
+                )
+            )
+        self._values = values
+        self._fit(values)
+        return self
+
+    def __call__(self, gx, gy):
+        points = np.column_stack((
+            np.asarray(gx, dtype=float).ravel(),
+            np.asarray(gy, dtype=float).ravel()
+        ))
+        res = self._evaluate(points)
+        if self._squeeze:
+            return res[:, 0]
+        return res
+
+    @property
+    def bytes_per_point(self):
+        """
+        Approximate peak working memory, in bytes, needed for each evaluated
+        point. Used to size evaluation tiles; see :py:func:`evaluate_grid`.
+        """
+        # coordinates, plus float64 results and a float32 copy per metric
+        return 8 * 4 + 12 * self._values.shape[1]
+
+    def _fit(self, values):
+        raise NotImplementedError()
+
+    def _evaluate(self, points):
+        raise NotImplementedError()
+
+
+class RbfInterpolator(Interpolator):
+    """
+    Exact (global) radial basis function interpolation, equivalent to
+    :py:class:`scipy.interpolate.Rbf` with the same ``function`` (here
+    ``kernel``), ``epsilon`` and ``smooth``. The default linear kernel
+    without smoothing is the legacy behavior of ``wifi-heatmap``.
+
+    The dense kernel matrix over all survey sites only depends on the site
+    coordinates, so it is LU-factorized once on the first :py:meth:`fit` and
+    every metric is then solved as one column of a multiple right-hand side
+    system. Evaluation computes the distance matrix to the sites once for all
+    metrics.
+    """
+
+    name = 'rbf'
+    options = ('kernel', 'epsilon', 'smooth')
+
+    def __init__(self, x, y, kernel='linear', epsilon=None, smooth=0.0):
+        super(RbfInterpolator, self).__init__(x, y)
+        if kernel not in RBF_KERNELS:
+            raise ValueError('Unknown RBF kernel: %s' % kernel)
+        self._kernel_name = kernel
+        self._epsilon = epsilon
+        if epsilon is None:
+            self._epsilon = site_spacing(self._sites)
+        self._smooth = smooth or 0.0
+        self._lu = None
+        self._coef = None
+
+    @property
+    def params(self):
+        """
+        The kernel options of this interpolator, with the default
+        ``epsilon`` resolved, to reproduce it with.
+
+        :rtype: dict
+        """
+        return {
+            'kernel': self._kernel_name, 'epsilon': float(self._epsilon),
+            'smooth': float(self._smooth)
+        }
+
+    def _kernel(self, a, b):
+        """kernel matrix between two sets of points"""
+        return RBF_KERNELS[self._kernel_name](cdist(a, b), self._epsilon)
+
+    def _matrix(self, sites):
+        """smoothed kernel matrix of a set of sites"""
+        A = self._kernel(sites, sites)
+        if self._smooth:
+            A -= self._smooth * np.eye(len(sites))
+        return A
+
+    def _factorize(self):
+        logger.debug(
+            'Factorizing %d x %d RBF kernel matrix',
+            self._sites.shape[0], self._sites.shape[0]
+        )
+        self._lu = lu_factor(self._matrix(self._sites))
+
+    def _fit(self, values):
+        if self._lu is None:
+            self._factorize()
+        self._coef = lu_solve(self._lu, values)
+
+    def _inverse_diagonal(self):
+        """diagonal of the inverse of the kernel matrix"""
+        return np.diag(lu_solve(self._lu, np.eye(self._sites.shape[0])))
+
+    def loo_residuals(self):
+        """
+        Return the leave-one-out cross-validation residuals of the fitted
+        values: the difference between the value at each site and the
+        interpolation of all other sites at that site. They are computed in
+        closed form from the existing factorization (Rippa, 1999) as the
+        coefficient of each site divided by the corresponding diagonal
+        element of the inverse kernel matrix, instead of fitting the
+        interpolator once per site.
+
+        :return: residuals, of the same shape as the fitted values
+        :rtype: numpy.ndarray
+        """
+        res = self._coef / self._inverse_diagonal()[:, np.newaxis]
+        if self._squeeze:
+            return res[:, 0]
+        return res
+
+    @property
+    def bytes_per_point(self):
+        # one row of the point to site distance matrix
+        return super(RbfInterpolator, self).bytes_per_point + \
+            8 * self._sites.shape[0]
+
+    def _evaluate(self, points):
+        return self._kernel(points, self._sites).dot(self._coef)
+
+
+class IncrementalRbfInterpolator(RbfInterpolator):
+    """
+    Exact linear RBF interpolation, like :py:class:`RbfInterpolator`, that
+    keeps the inverse of the kernel matrix in a file between runs.
+
+    When loaded for a survey whose points changed since the file was saved,
+    the stored inverse is downdated for the removed points (via the Schur
+    complement of their block) and bordered with the added points, so each
+    change costs ``O(N^2)`` per point instead of a full ``O(N^3)``
+    factorization. If most of the points changed, or the kernel options
+    differ, the inverse is simply rebuilt. If no ``epsilon`` is given, the
+    stored one is kept, as the default depends on the points.
+
+    Rounding errors of the updates are amplified by the condition number of
+    the kernel matrix, so they accumulate over runs. After an update, the
+    residual of every fit at the survey sites is checked, and the inverse is
+    rebuilt from a new factorization if it exceeds
+    :py:data:`INCREMENTAL_TOLERANCE`.
+    """
+
+    name = 'incremental-rbf'
+
+    def __init__(self, x, y, path=None, kernel='linear', epsilon=None,
+                 smooth=0.0):
+        super(IncrementalRbfInterpolator, self).__init__(
+            x, y, kernel=kernel, epsilon=epsilon, smooth=smooth
+        )
+        self._default_epsilon = epsilon is None
+        self._path = path
+        # position in the original site order of each internal site
+        self._order = np.arange(self._sites.shape[0])
+        self._inverse = None
+        self._updated = False
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path):
+        with np.load(path) as data:
+            sites = data['sites']
+            inverse = data['inverse']
+            params = dict(self.params)
+            if 'params' in data.files:
+                params = json.loads(str(data['params']))
+        expected = self.params
+        if self._default_epsilon:
+            expected['epsilon'] = params['epsilon']
+        if params != expected:
+            logger.info(
+                'Interpolation model options changed; rebuilding '
+                'interpolation model'
+            )
+            return
+        self._epsilon = params['epsilon']
+        current = defaultdict(list)
+        for i, site in enumerate(map(tuple, self._sites)):
+            current[site].append(i)
+        kept = []
+        order = []
+        for i, site in enumerate(map(tuple, sites)):
+            if current.get(site):
+                kept.append(i)
+                order.append(current[site].pop(0))
+        added = sorted(i for idx in current.values() for i in idx)
+        removed = len(sites) - len(kept)
+        if not kept or removed + len(added) > len(sites) / 3.0:
+            logger.info(
+                'Survey changed too much (%d points removed, %d added); '
+                'rebuilding interpolation model', removed, len(added)
+            )
+            return
+        logger.info(
+            'Updating interpolation model from %s: %d points removed, %d '
+            'added', path, removed, len(added)
+        )
+        if removed:
+            inverse = self._downdate(inverse, np.array(kept))
+        self._order = np.array(order + added, dtype=np.intp)
+        self._sites = self._sites[self._order]
+        if added:
+            inverse = self._border(inverse, len(kept))
+        self._inverse = inverse
+        self._updated = bool(removed or added)
+
+    @staticmethod
+    def _downdate(inverse, kept):
+        """
+        Return the inverse of the kernel matrix restricted to the ``kept``
+        sites, given the ``inverse`` of the full kernel matrix.
+        """
+        mask = np.ones(inverse.shape[0], dtype=bool)
+        mask[kept] = False
+        removed = np.flatnonzero(mask)
+        cross = inverse[np.ix_(kept, removed)]
+        return inverse[np.ix_(kept, kept)] - cross.dot(
+            solve(inverse[np.ix_(removed, removed)], cross.T)
+        )
+
+    def _border(self, inverse, num):
+        """
+        Return the inverse of the kernel matrix of all sites, given the
+        ``inverse`` of the kernel matrix of the first ``num`` sites.
+        """
+        old = self._sites[:num]
+        new = self._sites[num:]
+        cross = self._kernel(old, new)
+        proj = inverse.dot(cross)
+        schur = np.linalg.inv(self._matrix(new) - cross.T.dot(proj))
+        proj_schur = proj.dot(schur)
+        return np.block([
+            [inverse + proj_schur.dot(proj.T), -proj_schur],
+            [-proj_schur.T, schur]
+        ])
+
+    def _invert(self):
+        self._factorize()
+        self._inverse = lu_solve(self._lu, np.eye(self._sites.shape[0]))
+        self._updated = False
+
+    def _fit(self, values):
+        if self._inverse is None:
+            self._invert()
+        values = values[self._order]
+        self._coef = self._inverse.dot(values)
+        if not self._updated:
+            return
+        residual = np.abs(
+            self._matrix(self._sites).dot(self._coef) - values
+        ).max()
+        scale = max(np.abs(values).max(), 1.0)
+        if residual > INCREMENTAL_TOLERANCE * scale:
+            logger.info(
+                'Updated interpolation model is inaccurate (residual %g); '
+                'rebuilding interpolation model', residual
+            )
+            self._invert()
+            self._coef = self._inverse.dot(values)
+
+    def loo_residuals(self):
+        # coefficients are in the internal site order
+        res = self._coef / np.diag(self._inverse)[:, np.newaxis]
+        out = np.empty_like(res)
+        out[self._order] = res
+        if self._squeeze:
+            return out[:, 0]
+        return out
+
+    def save(self, path=None):
+        """
+        Save the survey sites and the inverse kernel matrix to ``path``
+        (defaults to the path given to the constructor), to be updated by
+        the next run.
+        """
+        path = path or self._path
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as fh:
+            np.savez(
+                fh, sites=self._sites, inverse=self._inverse,
+                params=json.dumps(self.params)
+            )
+        os.replace(tmp, path)
+        logger.debug('Saved interpolation model to %s', path)
+
+
+class LocalRbfInterpolator(Interpolator):
+    """
+    Neighbour-limited linear radial basis function interpolation.
+
+    The plane is covered by a regular lattice of overlapping circular patches.
+    Each patch solves a small RBF system over the ``neighbors`` survey sites
+    closest to its center (found with a KD-tree) and the patch interpolants are
+    blended with compactly supported Wendland weights (partition of unity).
+    Patches are only solved where the surface is evaluated, so the cost grows
+    roughly linearly with the number of sites and of evaluated points.
+    """
+
+    name = 'local-rbf'
+    options = ('neighbors',)
+
+    def __init__(self, x, y, neighbors=32):
+        super(LocalRbfInterpolator, self).__init__(x, y)
+        num = self._sites.shape[0]
+        self._neighbors = max(1, min(int(neighbors), num))
+        self._tree = cKDTree(self._sites)
+        # choose the patch radius so that a patch holds about ``neighbors``
+        # sites at the average sampling density
+        width = max(np.ptp(self._sites[:, 0]), 1.0)
+        height = max(np.ptp(self._sites[:, 1]), 1.0)
+        self._radius = np.sqrt(
+            width * height * self._neighbors / (np.pi * num)
+        )
+        self._origin = self._sites.min(axis=0)
+        self._patches = {}
+
+    def _fit(self, values):
+        self._patches = {}
+
+    @property
+    def bytes_per_point(self):
+        # lattice lookups for the 3x3 candidate patches, plus the distances
+        # to the sites of the (on average about three) overlapping patches
+        return super(LocalRbfInterpolator, self).bytes_per_point + \
+            9 * 48 + 3 * 8 * self._neighbors
+
+    def _patch(self, key):
+        """
+        Return the (site indices, coefficients) of the patch with the given
+        lattice index, solving its local system on first use.
+        """
+        patch = self._patches.get(key)
+        if patch is not None:
+            return patch
+        center = self._origin + np.array(key, dtype=float) * self._radius
+        _, idx = self._tree.query(center, k=self._neighbors)
+        idx = np.atleast_1d(idx)
+        sites = self._sites[idx]
+        A = cdist(sites, sites)
+        try:
+            coef = solve(A, self._values[idx])
+        except LinAlgError:
+            coef = lstsq(A, self._values[idx])[0]
+        patch = self._patches[key] = (idx, coef)
+        return patch
+
+    def _evaluate(self, points):
+        cells = np.rint(
+            (points - self._origin) / self._radius
+        ).astype(np.int64)
+        # every point within ``radius`` of a patch center lies in the 3x3
+        # block of lattice cells around its own cell
+        pidx = []
+        keys = []
+        weights = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                k = cells + (di, dj)
+                centers = self._origin + k * self._radius
+                r = np.hypot(*(points - centers).T) / self._radius
+                inside = np.flatnonzero(r < 1.0)
+                r = r[inside]
+                pidx.append(inside)
+                keys.append(k[inside])
+                weights.append((1.0 - r) ** 4 * (4.0 * r + 1.0))
+        pidx = np.concatenate(pidx)
+        keys = np.concatenate(keys)
+        weights = np.concatenate(weights)
+        res = np.zeros((points.shape[0], self._values.shape[1]))
+        wsum = np.zeros(points.shape[0])
+        if not len(keys):
+            return res
+        # group the (point, patch) pairs by patch using a scalar lattice key
+        kmin = keys.min(axis=0)
+        span = keys[:, 1].max() - kmin[1] + 1
+        flat = (keys[:, 0] - kmin[0]) * span + (keys[:, 1] - kmin[1])
+        order = np.argsort(flat, kind='stable')
+        flat = flat[order]
+        starts = np.flatnonzero(np.r_[True, flat[1:] != flat[:-1]])
+        bounds = np.r_[starts, len(flat)]
+        for n, start in enumerate(starts):
+            sel = order[start:bounds[n + 1]]
+            idx, coef = self._patch(tuple(keys[sel[0]]))
+            # points are unique within one patch, so plain fancy-index
+            # accumulation is safe here
+            p = pidx[sel]
+            w = weights[sel]
+            vals = cdist(points[p], self._sites[idx]).dot(coef)
+            res[p] += w[:, np.newaxis] * vals
+            wsum[p] += w
+        return res / wsum[:, np.newaxis]
+
+
+class IdwInterpolator(Interpolator):
+    """
+    Inverse distance weighting over the ``neighbors`` nearest survey sites,
+    found with a KD-tree. Much cheaper than RBF interpolation, at the cost of
+    a flatter surface with plateaus around the survey sites.
+    """
+
+    name = 'idw'
+    options = ('neighbors', 'power')
+
+    def __init__(self, x, y, neighbors=32, power=2.0):
+        super(IdwInterpolator, self).__init__(x, y)
+        self._neighbors = max(1, min(int(neighbors), self._sites.shape[0]))
+        self._power = power
+        self._tree = cKDTree(self._sites)
+
+    def _fit(self, values):
+        pass
+
+    @property
+    def bytes_per_point(self):
+        return super(IdwInterpolator, self).bytes_per_point + \
+            8 * self._neighbors * (3 + self._values.shape[1])
+
+    def _evaluate(self, points):
+        dist, idx = self._tree.query(points, k=self._neighbors)
+        dist = dist.reshape(points.shape[0], -1)
+        idx = idx.reshape(points.shape[0], -1)
+        with np.errstate(divide='ignore'):
+            weights = dist ** -self._power
+        # points exactly on a survey site take that site's value
+        exact = np.isinf(weights)
+        hits = exact.any(axis=1)
+        weights[hits] = exact[hits]
+        weights /= weights.sum(axis=1)[:, np.newaxis]
+        return np.einsum('pk,pkm->pm', weights, self._values[idx])
+
+
+class NearestInterpolator(Interpolator):
+    """
+    Nearest neighbour interpolation; every point takes the value of the
+    closest survey site, found with a KD-tree.
+    """
+
+    name = 'nearest'
+
+    def __init__(self, x, y):
+        super(NearestInterpolator, self).__init__(x, y)
+        self._tree = cKDTree(self._sites)
+
+    def _fit(self, values):
+        pass
+
+    def _evaluate(self, points):
+        return self._values[self._tree.query(points)[1]]
+
+
+class LinearInterpolator(Interpolator):
+    """
+    Piecewise linear interpolation on the Delaunay triangulation of the survey
+    sites, like :py:func:`scipy.interpolate.griddata` with
+    ``method='linear'``. The triangulation is built once and shared by all
+    metrics. Points outside the convex hull of the sites take the value of
+    the nearest site.
+    """
+
+    name = 'linear'
+
+    def __init__(self, x, y):
+        super(LinearInterpolator, self).__init__(x, y)
+        self._nearest = NearestInterpolator(x, y)
+        try:
+            self._tri = Delaunay(self._sites)
+        except QhullError:
+            logger.warning(
+                'Cannot triangulate survey points; using nearest neighbour '
+                'interpolation'
+            )
+            self._tri = None
+
+    def _fit(self, values):
+        self._nearest.fit(values)
+        if self._tri is not None:
+            self._linear = LinearNDInterpolator(self._tri, values)
+
+    def _evaluate(self, points):
+        if self._tri is None:
+            return self._nearest._evaluate(points)
+        res = self._linear(points)
+        outside = np.isnan(res).any(axis=1)
+        if outside.any():
+            res[outside] = self._nearest._evaluate(points[outside])
+        return res
+
+
+#: interpolation backends, by name
+INTERPOLATORS = {
+    cls.name: cls for cls in (
+        RbfInterpolator, LocalRbfInterpolator, IdwInterpolator,
+        LinearInterpolator, NearestInterpolator
+    )
+}
+
+
+def get_interpolator(name, x, y, **kwargs):
+    """
+    Construct the interpolation backend with the given name.
+
+    Keyword arguments not supported by the backend are ignored, so callers can
+    pass the full set of interpolation options regardless of the backend.
+
+    :param name: name of the backend; a key of :py:data:`INTERPOLATORS`
+    :type name: str
+    :param x: X coordinates of the survey sites
+    :param y: Y coordinates of the survey sites
+    :return: the (unfitted) interpolator
+    :rtype: Interpolator
+    """
+    try:
+        cls = INTERPOLATORS[name]
+    except KeyError:
+        raise ValueError('Unknown interpolation method: %s' % name)
+    opts = {k: v for k, v in kwargs.items() if k in cls.options}
+    logger.debug('Using %s interpolation with options %s', name, opts)
+    return cls(x, y, **opts)
+
+
+def site_spacing(sites):
+    """
+    Return the average spacing of a set of sites: the side of the square
+    area per site within their bounding box. This is the default
+    ``epsilon`` of :py:class:`RbfInterpolator`, like that of
+    :py:class:`scipy.interpolate.Rbf`.
+
+    :param sites: array of shape ``(sites, 2)``
+    :type sites: numpy.ndarray
+    :rtype: float
+    """
+    edges = np.ptp(sites, axis=0)
+    edges = edges[edges > 0]
+    if not len(edges):
+        return 1.0
+    return float(np.power(np.prod(edges) / len(sites), 1.0 / len(edges)))
+
+
+def tune_rbf(x, y, values, candidates=None, num=None):
+    """
+    Choose the :py:class:`RbfInterpolator` kernel options of each column of
+    ``values`` by leave-one-out cross-validation. Every candidate is
+    factorized once and fitted to all columns at once, and scored by the
+    root mean square of its closed-form leave-one-out residuals; see
+    :py:meth:`RbfInterpolator.loo_residuals`.
+
+    :param x: X coordinates of the survey sites
+    :param y: Y coordinates of the survey sites
+    :param values: array of shape ``(sites, metrics)``
+    :type values: numpy.ndarray
+    :param candidates: candidate options; see :py:data:`RBF_CANDIDATES`
+      (the default) for their units
+    :type candidates: list
+    :param num: only score the first ``num`` sites; the others (such as the
+      pinned image corners) are fitted but not measured
+    :type num: int
+    :return: the chosen options of each column (with ``epsilon`` and
+      ``smooth`` resolved to absolute values, as accepted by
+      :py:class:`RbfInterpolator`), and the list of (options, RMSE of each
+      column) of all candidates
+    :rtype: tuple
+    """
+    if candidates is None:
+        candidates = RBF_CANDIDATES
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    sites = np.column_stack((
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ))
+    spacing = site_spacing(sites)
+    dist = cdist(sites, sites)
+    results = []
+    for cand in candidates:
+        kernel = cand['kernel']
+        epsilon = cand.get('epsilon', 1.0) * spacing
+        A = RBF_KERNELS[kernel](dist, epsilon)
+        # the smoothing is subtracted from the diagonal, which makes the
+        # conditionally negative definite linear and multiquadric kernel
+        # matrices more definite, but the others less so
+        sign = 1.0 if kernel in ('linear', 'multiquadric') else -1.0
+        smooth = sign * cand.get('smooth', 0.0) * np.abs(A).mean()
+        interp = RbfInterpolator(
+            x, y, kernel=kernel, epsilon=epsilon, smooth=smooth
+        )
+        try:
+            with np.errstate(all='raise'):
+                res = interp.fit(values).loo_residuals()[:num]
+        except (LinAlgError, FloatingPointError, ValueError):
+            logger.debug('Skipping singular RBF candidate %s', cand)
+            continue
+        rmse = np.sqrt(np.mean(res ** 2, axis=0))
+        logger.debug('RBF candidate %s: RMSE %s', interp.params, rmse)
+        results.append((interp.params, rmse))
+    if not results:
+        raise ValueError('No RBF candidate could be fitted')
+    scores = np.array([rmse for _, rmse in results])
+    scores[~np.isfinite(scores)] = np.inf
+    best = [results[i][0] for i in scores.argmin(axis=0)]
+    return best, results
+
+
+def allocate_grids(num, num_y, num_x, memmap_dir=None):
+    """
+    Allocate a float32 array of shape ``(num, num_y, num_x)`` to hold ``num``
+    interpolated grids.
+
+    :param memmap_dir: if not None, back the array by an anonymous temporary
+      file in this directory instead of memory
+    :type memmap_dir: str
+    :rtype: numpy.ndarray
+    """
+    shape = (num, num_y, num_x)
+    if memmap_dir is None:
+        return np.empty(shape, dtype=np.float32)
+    logger.debug('Memory-mapping %s grids in %s', shape, memmap_dir)
+    return np.memmap(
+        tempfile.TemporaryFile(dir=memmap_dir), dtype=np.float32,
+        mode='w+', shape=shape
+    )
+
+
+def evaluate_grid(interp, x, y, out=None, memory_budget=None, mask=None,
+                  tolerance=None):
+    """
+    Evaluate a fitted interpolator on the regular grid spanned by ``x`` and
+    ``y``, in tiles of whole grid rows sized so that the working memory of
+    each tile stays within ``memory_budget``.
+
+    If a ``mask`` is given, only the cells inside it are evaluated, in
+    memory-bounded chunks of their compact row and column indices, and all
+    other cells are set to NaN.
+
+    If a ``tolerance`` is given, the grid is instead evaluated adaptively;
+    see :py:func:`evaluate_adaptive`.
+
+    :param interp: fitted interpolator
+    :type interp: Interpolator
+    :param x: 1-D array of grid X coordinates
+    :param y: 1-D array of grid Y coordinates
+    :param out: optional preallocated array of shape
+      ``(metrics, len(y), len(x))`` to write the results to; see
+      :py:func:`allocate_grids`
+    :type out: numpy.ndarray
+    :param memory_budget: working memory budget per tile, in bytes; defaults
+      to :py:data:`DEFAULT_MEMORY_BUDGET`
+    :type memory_budget: int
+    :param mask: optional boolean array of shape ``(len(y), len(x))`` of the
+      cells to evaluate
+    :type mask: numpy.ndarray
+    :param tolerance: if given, the tolerance of adaptive evaluation, as a
+      fraction of the range of each metric
+    :type tolerance: float
+    :return: the grids, of shape ``(metrics, len(y), len(x))``
+    :rtype: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if memory_budget is None:
+        memory_budget = DEFAULT_MEMORY_BUDGET
+    if out is None:
+        out = allocate_grids(interp._values.shape[1], len(y), len(x))
+    if tolerance is not None and len(x) > 1 and len(y) > 1:
+        return evaluate_adaptive(
+            interp, x, y, tolerance, out=out, memory_budget=memory_budget,
+            mask=mask
+        )
+    if mask is not None:
+        out[...] = np.nan
+        iy, ix = _mask_indices(mask)
+        size = max(1, int(memory_budget // interp.bytes_per_point))
+        logger.debug(
+            'Evaluating %d of %d grid cells in chunks of %d', len(iy),
+            mask.size, size
+        )
+        for start in range(0, len(iy), size):
+            cy, cx = iy[start:start + size], ix[start:start + size]
+            res = interp(x[cx], y[cy]).reshape(len(cy), -1)
+            out[:, cy, cx] = res.T
+        return out
+    rows = int(memory_budget // (len(x) * interp.bytes_per_point))
+    rows = max(1, min(rows, len(y)))
+    logger.debug(
+        'Evaluating %d x %d grid in tiles of %d rows', len(x), len(y), rows
+    )
+    for start in range(0, len(y), rows):
+        end = min(start + rows, len(y))
+        gx, gy = np.meshgrid(x, y[start:end])
+        res = interp(gx, gy).reshape(gx.size, -1)
+        out[:, start:end, :] = res.T.reshape(-1, end - start, len(x))
+    return out
+
+
+def evaluate_adaptive(interp, x, y, tolerance, out=None, memory_budget=None,
+                      mask=None, cell_size=ADAPTIVE_CELL_SIZE):
+    """
+    Evaluate a fitted interpolator on the regular grid spanned by ``x`` and
+    ``y`` by quadtree refinement, instead of at every grid cell.
+
+    The grid is covered by coarse square cells of ``cell_size`` grid cells
+    and the interpolator is only evaluated at their corners. Every cell
+    whose corner values of any metric differ by more than ``tolerance``
+    times the range of that metric's values at the survey sites, or that
+    contains a survey site (where the surface may peak between the
+    corners), is split into four, down to single grid cells. The remaining
+    cells are filled by bilinear interpolation of their corners. Most of a
+    floor is smooth, so only a small fraction of the grid is evaluated.
+
+    If a ``mask`` is given, cells entirely outside of it are dropped and
+    all grid cells outside of it are set to NaN.
+
+    :param interp: fitted interpolator
+    :type interp: Interpolator
+    :param x: 1-D array of grid X coordinates
+    :param y: 1-D array of grid Y coordinates
+    :param tolerance: maximum difference between the corner values of a
+      cell that is filled bilinearly, as a fraction of the range of each
+      metric
+    :type tolerance: float
+    :param out: optional preallocated array of shape
+      ``(metrics, len(y), len(x))`` to write the results to
+    :type out: numpy.ndarray
+    :param memory_budget: working memory budget per chunk of evaluated
+      points, in bytes; defaults to :py:data:`DEFAULT_MEMORY_BUDGET`
+    :type memory_budget: int
+    :param mask: optional boolean array of shape ``(len(y), len(x))`` of the
+      cells to evaluate
+    :type mask: numpy.ndarray
+    :param cell_size: size of the coarse cells, in grid cells; rounded down
+      to a power of two
+    :type cell_size: int
+    :return: the grids, of shape ``(metrics, len(y), len(x))``
+    :rtype: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if memory_budget is None:
+        memory_budget = DEFAULT_MEMORY_BUDGET
+    num = interp._values.shape[1]
+    ny, nx = len(y), len(x)
+    if out is None:
+        out = allocate_grids(num, ny, nx)
+    scale = np.ptp(interp._values, axis=0)
+    limit = tolerance * np.where(scale > 0, scale, 1.0)[:, np.newaxis]
+    done = np.zeros((ny, nx), dtype=bool)
+    chunk = max(1, int(memory_budget // interp.bytes_per_point))
+
+    def evaluate(ci, cj):
+        flat = np.unique(ci * nx + cj)
+        flat = flat[~done.ravel()[flat]]
+        for start in range(0, len(flat), chunk):
+            iy, ix = np.divmod(flat[start:start + chunk], nx)
+            out[:, iy, ix] = interp(x[ix], y[iy]).reshape(len(iy), -1).T
+            done[iy, ix] = True
+
+    # summed-area tables of the survey sites and of the mask, to count them
+    # within any cell in constant time
+    sites = np.zeros((ny, nx))
+    np.add.at(sites, (
+        np.interp(interp._sites[:, 1], y, np.arange(ny)).astype(np.intp),
+        np.interp(interp._sites[:, 0], x, np.arange(nx)).astype(np.intp)
+    ), 1)
+    sites = _summed_area(sites)
+    inside = None if mask is None else _summed_area(mask)
+
+    size = 1 << max(0, int(np.log2(max(1, cell_size))))
+    ci, cj = np.meshgrid(
+        np.arange(0, ny - 1, size), np.arange(0, nx - 1, size),
+        indexing='ij'
+    )
+    ci, cj = ci.ravel(), cj.ravel()
+    leaves = []
+    while len(ci):
+        ei = np.minimum(ci + size, ny - 1)
+        ej = np.minimum(cj + size, nx - 1)
+        if inside is not None:
+            keep = _area_sum(inside, ci, cj, ei, ej) > 0
+            ci, cj, ei, ej = ci[keep], cj[keep], ei[keep], ej[keep]
+        evaluate(
+            np.concatenate((ci, ci, ei, ei)), np.concatenate((cj, ej, cj, ej))
+        )
+        if size == 1:
+            break
+        corners = np.stack((
+            out[:, ci, cj], out[:, ci, ej], out[:, ei, cj], out[:, ei, ej]
+        ))
+        split = (np.ptp(corners, axis=0) > limit).any(axis=0)
+        split |= _area_sum(sites, ci, cj, ei, ej) > 0
+        leaves.append((size, ci[~split], cj[~split], ei[~split], ej[~split]))
+        size //= 2
+        ci = np.concatenate([ci[split] + di * size for di in (0, 0, 1, 1)])
+        cj = np.concatenate([cj[split] + dj * size for dj in (0, 1, 0, 1)])
+        keep = (ci < ny - 1) & (cj < nx - 1)
+        ci, cj = ci[keep], cj[keep]
+    logger.debug(
+        'Adaptively evaluated %d of %d grid cells', done.sum(), done.size
+    )
+    for size, ci, cj, ei, ej in leaves:
+        # cells are filled in chunks of (metrics, cells, size + 1, size + 1)
+        # float64 values
+        step = max(1, int(memory_budget // (8 * num * (size + 1) ** 2)))
+        for start in range(0, len(ci), step):
+            _fill_bilinear(
+                out, done, size, ci[start:start + step],
+                cj[start:start + step], ei[start:start + step],
+                ej[start:start + step]
+            )
+    if mask is not None:
+        out[:, ~mask] = np.nan
+    return out
+
+
+def _summed_area(a):
+    """
+    Return the summed-area table of a 2-D array, padded with a leading row
+    and column of zeros; see :py:func:`_area_sum`.
+
+    :rtype: numpy.ndarray
+    """
+    table = np.zeros((a.shape[0] + 1, a.shape[1] + 1))
+    table[1:, 1:] = np.cumsum(np.cumsum(a, axis=0), axis=1)
+    return table
+
+
+def _area_sum(table, i0, j0, i1, j1):
+    """
+    Return the sums of the array of a summed-area table over the inclusive
+    index ranges ``[i0, i1]`` and ``[j0, j1]``.
+
+    :rtype: numpy.ndarray
+    """
+    return (
+        table[i1 + 1, j1 + 1] - table[i0, j1 + 1] - table[i1 + 1, j0] +
+        table[i0, j0]
+    )
+
+
+def _fill_bilinear(out, done, size, ci, cj, ei, ej):
+    """
+    Fill the grid cells of the quadtree cells spanning ``[ci, ei]`` and
+    ``[cj, ej]`` that were not evaluated by bilinear interpolation of the
+    cell corners. Cells clipped by the grid border are shorter than
+    ``size``; their out-of-range offsets are clamped onto the border,
+    which just writes the border values again.
+    """
+    off = np.arange(size + 1)
+    ii = np.minimum(ci[:, np.newaxis] + off, ei[:, np.newaxis])
+    jj = np.minimum(cj[:, np.newaxis] + off, ej[:, np.newaxis])
+    ty = ((ii - ci[:, np.newaxis]) / np.maximum(ei - ci, 1)[:, np.newaxis])
+    tx = ((jj - cj[:, np.newaxis]) / np.maximum(ej - cj, 1)[:, np.newaxis])
+    ty = ty[np.newaxis, :, :, np.newaxis]
+    tx = tx[np.newaxis, :, np.newaxis, :]
+    top = out[:, ci, cj][:, :, np.newaxis, np.newaxis] * (1 - tx) + \
+        out[:, ci, ej][:, :, np.newaxis, np.newaxis] * tx
+    bottom = out[:, ei, cj][:, :, np.newaxis, np.newaxis] * (1 - tx) + \
+        out[:, ei, ej][:, :, np.newaxis, np.newaxis] * tx
+    values = top * (1 - ty) + bottom * ty
+    ii, jj = np.broadcast_arrays(
+        ii[:, :, np.newaxis], jj[:, np.newaxis, :]
+    )
+    sel = ~done[ii, jj]
+    out[:, ii[sel], jj[sel]] = values[:, sel]
+
+
+def _mask_indices(mask):
+    """
+    Return the row and column indices of the cells inside a grid mask, as
+    compact int32 arrays.
+
+    :rtype: tuple
+    """
+    iy, ix = np.nonzero(mask)
+    return iy.astype(np.int32), ix.astype(np.int32)
+
+
+def nearest_labels(x, y, gx, gy, memory_budget=None, mask=None):
+    """
+    Label every cell of the regular grid spanned by ``gx`` and ``gy`` with
+    the index of its nearest survey site, i.e. rasterize the Voronoi diagram
+    of the sites. The grid is processed in memory-bounded tiles of rows like
+    :py:func:`evaluate_grid`; if a ``mask`` is given, only the cells inside
+    it are labelled, and all others are set to -1.
+
+    :param x: X coordinates of the survey sites
+    :param y: Y coordinates of the survey sites
+    :param gx: 1-D array of grid X coordinates
+    :param gy: 1-D array of grid Y coordinates
+    :param memory_budget: working memory budget per tile, in bytes; defaults
+      to :py:data:`DEFAULT_MEMORY_BUDGET`
+    :type memory_budget: int
+    :param mask: optional boolean array of shape ``(len(gy), len(gx))`` of
+      the cells to label
+    :type mask: numpy.ndarray
+    :return: site indices, of shape ``(len(gy), len(gx))``
+    :rtype: numpy.ndarray
+    """
+    if memory_budget is None:
+        memory_budget = DEFAULT_MEMORY_BUDGET
+    tree = cKDTree(np.column_stack((
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    )))
+    gx = np.asarray(gx, dtype=float)
+    gy = np.asarray(gy, dtype=float)
+    out = np.empty((len(gy), len(gx)), dtype=np.int32)
+    if mask is not None:
+        out[...] = -1
+        iy, ix = _mask_indices(mask)
+        size = max(1, int(memory_budget // 48))
+        for start in range(0, len(iy), size):
+            cy, cx = iy[start:start + size], ix[start:start + size]
+            out[cy, cx] = tree.query(np.column_stack((gx[cx], gy[cy])))[1]
+        return out
+    # coordinates, distances and indices of each point
+    rows = max(1, min(int(memory_budget // (len(gx) * 48)), len(gy)))
+    for start in range(0, len(gy), rows):
+        end = min(start + rows, len(gy))
+        mx, my = np.meshgrid(gx, gy[start:end])
+        out[start:end] = tree.query(
+            np.column_stack((mx.ravel(), my.ravel()))
+        )[1].reshape(mx.shape)
+    return out
+
+
+def grid_axes(width, height):
+    """
+    Return the X and Y coordinates of the interpolation grid of a floorplan:
+    one column every 4 pixels, and as many rows as keep the cells square.
+
+    :param width: floorplan width, in pixels
+    :type width: int
+    :param height: floorplan height, in pixels
+    :type height: int
+    :return: tuple of the 1-D grid X and Y coordinates
+    :rtype: tuple
+    """
+    num_x = int(width / 4)
+    num_y = int(num_x / (width / height))
+    return np.linspace(0, width, num_x), np.linspace(0, height, num_y)
+
+
+def image_corners(width, height):
+    """
+    Return the (x, y) coordinates of the four corners of a floorplan, in the
+    order :py:func:`pin_corners` appends them.
+
+    :rtype: list
+    """
+    return [(0, 0), (0, height), (width, 0), (width, height)]
+
+
+def pin_corners(columns, width, height):
+    """
+    Append the four corners of the floorplan to survey data, with each
+    metric pinned to its minimum there, so that the interpolation does not
+    extrapolate beyond the measured values towards the edges of the image.
+
+    :param columns: dict of ``x``, ``y`` and metric name to 1-D array, of
+      numeric or object dtype; an ``ap`` column gets None at the corners
+    :type columns: dict
+    :param width: floorplan width, in pixels
+    :type width: int
+    :param height: floorplan height, in pixels
+    :type height: int
+    :return: a new dict of the same keys, with four more points
+    :rtype: dict
+    """
+    corners = image_corners(width, height)
+    res = {
+        'x': np.append(columns['x'], [c[0] for c in corners]),
+        'y': np.append(columns['y'], [c[1] for c in corners]),
+    }
+    for k, v in columns.items():
+        if k in res:
+            continue
+        if k == 'ap':
+            fill = None
+        elif v.dtype == object:
+            fill = min(v)
+        else:
+            fill = v.min()
+        res[k] = np.append(v, np.array([fill] * len(corners), dtype=v.dtype))
+    return res
+
+
+def interpolation_group(key, interpolation, metric_interpolation=None,
+                        rbf_params=None):
+    """
+    Return the interpolation method and options a metric is interpolated
+    with. Metrics of the same group are fitted by one interpolator.
+
+    :param key: metric name
+    :type key: str
+    :param interpolation: default interpolation method
+    :type interpolation: str
+    :param metric_interpolation: dict of metric name to interpolation
+      method, overriding ``interpolation``
+    :type metric_interpolation: dict
+    :param rbf_params: dict of metric name to tuned ``rbf`` options, as
+      written by :py:func:`tune_rbf`
+    :type rbf_params: dict
+    :return: tuple of the method and a hashable tuple of its per-metric
+      options (or None)
+    :rtype: tuple
+    """
+    method = (metric_interpolation or {}).get(key, interpolation)
+    params = None
+    if method == 'rbf' and key in (rbf_params or {}):
+        params = tuple(sorted(rbf_params[key].items()))
+    return method, params
+
+
+def metric_interpolation_type(metrics):
+    """
+    Return an argparse type for ``METRIC=METHOD`` per-metric interpolation
+    overrides, accepting the given metric names.
+
+    :param metrics: metric names
+    :type metrics: iterable
+    :rtype: callable
+    """
+    metrics = sorted(metrics)
+
+    def metric_interpolation(value):
+        metric, _, method = value.partition('=')
+        if metric not in metrics:
+            raise argparse.ArgumentTypeError(
+                'unknown metric "%s"; must be one of: %s' % (
+                    metric, ', '.join(metrics)
+                )
+            )
+        if method not in INTERPOLATORS:
+            raise argparse.ArgumentTypeError(
+                'unknown interpolation method "%s"; must be one of: %s' % (
+                    method, ', '.join(sorted(INTERPOLATORS.keys()))
+                )
+            )
+        return metric, method
+
+    return metric_interpolation
+
+
+def add_interpolation_arguments(p, metrics):
+    """
+    Add the interpolation options shared by ``wifi-heatmap`` and
+    ``wifi-heatmap-stats`` to an argument parser; see
+    :py:func:`interpolation_kwargs`.
+
+    :param p: argument parser
+    :type p: argparse.ArgumentParser
+    :param metrics: metric names accepted by ``--metric-interpolation``
+    :type metrics: iterable
+    """
+    p.add_argument('-I', '--interpolation', dest='interpolation',
+                   action='store', default='rbf',
+                   choices=sorted(INTERPOLATORS.keys()),
+                   help='Interpolation method. "rbf" (default) solves an '
+                        'exact global RBF system; "local-rbf" only uses the '
+                        'nearest survey points and scales to large surveys; '
+                        '"idw", "linear" and "nearest" are fast '
+                        'approximations.')
+    p.add_argument('-M', '--metric-interpolation', dest='metric_interp',
+                   action='append', default=[],
+                   type=metric_interpolation_type(metrics),
+                   metavar='METRIC=METHOD',
+                   help='Use a different interpolation method for one metric; '
+                        'may be specified multiple times.')
+    p.add_argument('--neighbors', dest='neighbors', type=int, action='store',
+                   default=32,
+                   help='Number of neighbouring survey points used by the '
+                        '"local-rbf" and "idw" interpolation (default: 32)')
+    p.add_argument('--idw-power', dest='idw_power', type=float,
+                   action='store', default=2.0,
+                   help='Distance exponent of the "idw" interpolation '
+                        '(default: 2)')
+    p.add_argument('--adaptive', dest='adaptive', action='store_true',
+                   default=False,
+                   help='Only evaluate the interpolation on a coarse grid, '
+                        'refined where the surface varies by more than '
+                        '--adaptive-tolerance, and fill the rest bilinearly; '
+                        'much faster for large floorplans')
+    p.add_argument('--adaptive-tolerance', dest='adaptive_tolerance',
+                   type=float, action='store', default=0.05,
+                   metavar='FRACTION',
+                   help='Variation, as a fraction of the range of each '
+                        'metric, above which --adaptive refines a cell '
+                        '(default: 0.05)')
+    p.add_argument('--rbf-kernel', dest='rbf_kernel', action='store',
+                   default='linear', choices=sorted(RBF_KERNELS.keys()),
+                   help='Kernel of the "rbf" interpolation (default: '
+                        'linear)')
+    p.add_argument('--rbf-epsilon', dest='rbf_epsilon', type=float,
+                   action='store', default=None,
+                   help='Shape parameter of the multiquadric, inverse and '
+                        'gaussian "rbf" kernels, in floorplan pixels '
+                        '(default: the average survey point spacing)')
+    p.add_argument('--rbf-smooth', dest='rbf_smooth', type=float,
+                   action='store', default=0.0,
+                   help='Smoothing of the "rbf" interpolation; 0 (the '
+                        'default) passes exactly through the survey points')
+    p.add_argument('--rbf-params', dest='rbf_params', type=str,
+                   action='store', default=None, metavar='FILE',
+                   help='Use the "rbf" options of each metric from a '
+                        'tuning_TITLE.json file written by wifi-heatmap '
+                        '--tune, to reproduce tuned results without tuning '
+                        'again')
+    p.add_argument('--memory-budget', dest='memory_budget', type=int,
+                   action='store', default=256,
+                   help='Working memory budget, in MiB, for evaluating each '
+                        'tile of the interpolation grid (default: 256)')
+
+
+def interpolation_kwargs(args):
+    """
+    Return the keyword arguments for the options added by
+    :py:func:`add_interpolation_arguments`, as taken by both
+    ``HeatMapGenerator`` and ``SurveyStats``.
+
+    :param args: parsed arguments
+    :type args: argparse.Namespace
+    :rtype: dict
+    """
+    return dict(
+        interpolation=args.interpolation, neighbors=args.neighbors,
+        idw_power=args.idw_power,
+        metric_interpolation=dict(args.metric_interp),
+        adaptive=args.adaptive_tolerance if args.adaptive else None,
+        rbf_kernel=args.rbf_kernel, rbf_epsilon=args.rbf_epsilon,
+        rbf_smooth=args.rbf_smooth, rbf_params=args.rbf_params,
+        memory_budget=args.memory_budget * 1024 * 1024
+    )
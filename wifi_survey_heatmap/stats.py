@@ -0,0 +1,529 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import sys
+import argparse
+import logging
+import json
+import operator
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from wifi_survey_heatmap.cli import set_log_debug, set_log_info
+from wifi_survey_heatmap.floorplan import (
+    FloorplanPyramid, derive_mask, load_mask, open_image, parse_color
+)
+from wifi_survey_heatmap.interpolation import (
+    add_interpolation_arguments, allocate_grids, evaluate_grid,
+    get_interpolator, grid_axes, interpolation_group, interpolation_kwargs,
+    nearest_labels, pin_corners
+)
+from wifi_survey_heatmap.survey import (
+    AGGREGATES, CATEGORICAL, METRICS, bin_survey, load_survey, survey_path
+)
+
+FORMAT = "[%(asctime)s %(levelname)s] %(message)s"
+logging.basicConfig(level=logging.WARNING, format=FORMAT)
+logger = logging.getLogger()
+
+#: percentiles reported for every numeric metric by default
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+#: comparison operators of coverage thresholds
+_OPERATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+}
+
+_COVERAGE_RE = re.compile(r'^([A-Za-z0-9_]+)(>=|<=|>|<)(-?[0-9.]+)$')
+
+
+def coverage_threshold(value):
+    """
+    Parse a ``METRIC>=VALUE`` coverage threshold (also ``>``, ``<=`` or
+    ``<``) command line argument.
+
+    :return: tuple of metric name, operator and threshold value
+    :rtype: tuple
+    """
+    m = _COVERAGE_RE.match(value.replace(' ', ''))
+    if m is None:
+        raise argparse.ArgumentTypeError(
+            'invalid coverage threshold "%s"; must be METRIC>=VALUE, '
+            'METRIC>VALUE, METRIC<=VALUE or METRIC<VALUE' % value
+        )
+    if m.group(1) not in METRICS:
+        raise argparse.ArgumentTypeError(
+            'unknown metric "%s"; must be one of: %s' % (
+                m.group(1), ', '.join(sorted(METRICS.keys()))
+            )
+        )
+    try:
+        return m.group(1), m.group(2), float(m.group(3))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'invalid coverage threshold value "%s"' % m.group(3)
+        )
+
+
+def cell_weights(num_y, num_x):
+    """
+    Return the share of the floorplan area represented by each point of a
+    regular grid spanning the floorplan from edge to edge: points on the
+    edges represent half a cell, and those on the corners a quarter.
+
+    :rtype: numpy.ndarray
+    """
+    def axis(num):
+        w = np.ones(num)
+        if num > 1:
+            w[[0, -1]] = 0.5
+        return w
+    return np.outer(axis(num_y), axis(num_x))
+
+
+def weighted_percentiles(values, weights, percentiles):
+    """
+    Return the weighted percentiles of ``values``, interpolating linearly
+    between the midpoints of the cumulative weights of the sorted values.
+
+    :param values: 1-D array of values
+    :param weights: 1-D array of the (positive) weight of each value
+    :param percentiles: percentiles to compute, in [0, 100]
+    :rtype: numpy.ndarray
+    """
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    cum = np.cumsum(weights[order])
+    mid = (cum - 0.5 * weights[order]) / cum[-1] * 100
+    return np.interp(percentiles, mid, values)
+
+
+def grid_stats(z, weights, percentiles=DEFAULT_PERCENTILES, coverage=None,
+               bins=10, value_range=None):
+    """
+    Return area-weighted statistics of an interpolated grid.
+
+    :param z: grid of values
+    :type z: numpy.ndarray
+    :param weights: area weight of each grid cell (zero outside of the
+      area of interest), of the same shape as ``z``; see
+      :py:func:`cell_weights`
+    :type weights: numpy.ndarray
+    :param percentiles: percentiles to compute
+    :type percentiles: list
+    :param coverage: list of (operator, value) coverage thresholds, for
+      which the share of the area meeting them is computed
+    :type coverage: list
+    :param bins: number of histogram bins
+    :type bins: int
+    :param value_range: (min, max) range of the histogram; defaults to the
+      range of the grid
+    :type value_range: tuple
+    :return: dict with the ``min``, ``max`` and ``mean`` values, the
+      ``percentiles``, the ``coverage`` share of each threshold and the
+      ``histogram`` bin ``edges`` and area share (``fractions``) of each bin
+    :rtype: dict
+    """
+    keep = (weights > 0) & ~np.isnan(z)
+    values = np.asarray(z, dtype=float)[keep]
+    w = weights[keep]
+    if not len(values):
+        return None
+    total = w.sum()
+    if value_range is None:
+        value_range = (values.min(), values.max())
+    hist, edges = np.histogram(values, bins=bins, range=value_range,
+                               weights=w)
+    return {
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(np.dot(values, w) / total),
+        'percentiles': dict(
+            (_format(p), float(v)) for p, v in zip(
+                percentiles, weighted_percentiles(values, w, percentiles)
+            )
+        ),
+        'coverage': dict(
+            ('%s%s' % (op, _format(threshold)),
+             float(w[_OPERATORS[op](values, threshold)].sum() / total))
+            for op, threshold in (coverage or [])
+        ),
+        'histogram': {
+            'edges': edges.tolist(),
+            'fractions': (hist / total).tolist(),
+        },
+    }
+
+
+def _format(value):
+    return ('%f' % value).rstrip('0').rstrip('.')
+
+
+class SurveyStats(object):
+    """
+    Computes area-weighted statistics of the interpolated metrics of
+    surveys, without rendering anything (and without matplotlib). The
+    metrics are interpolated onto the same grid as the ``wifi-heatmap``
+    plots, with the image corners pinned to the minimum of each metric.
+    """
+
+    def __init__(
+        self, interpolation='rbf', neighbors=32, idw_power=2.0,
+        metric_interpolation=None, memory_budget=None, thresholds=None,
+        percentiles=DEFAULT_PERCENTILES, coverage=None, bins=10, mask=None,
+        mask_color=None, bin_size=None, bin_aggregate='mean', adaptive=None,
+        rbf_kernel='linear', rbf_epsilon=None, rbf_smooth=0.0,
+        rbf_params=None
+    ):
+        """
+        :param interpolation: interpolation method; a key of
+          :py:data:`~wifi_survey_heatmap.interpolation.INTERPOLATORS`
+        :type interpolation: str
+        :param neighbors: neighbours of the ``local-rbf`` and ``idw`` methods
+        :type neighbors: int
+        :param idw_power: distance exponent of the ``idw`` method
+        :type idw_power: float
+        :param metric_interpolation: dict of metric name to interpolation
+          method, overriding ``interpolation``
+        :type metric_interpolation: dict
+        :param memory_budget: working memory budget of each tile of grid
+          evaluation, in bytes
+        :type memory_budget: int
+        :param thresholds: path to a thresholds JSON file, whose ranges are
+          used for the histograms
+        :type thresholds: str
+        :param percentiles: percentiles to compute
+        :type percentiles: list
+        :param coverage: list of (metric, operator, value) coverage
+          thresholds; see :py:func:`coverage_threshold`
+        :type coverage: list
+        :param bins: number of histogram bins
+        :type bins: int
+        :param mask: path to a floorplan mask image; only the area inside
+          the mask is interpolated and taken into account. See
+          :py:func:`~wifi_survey_heatmap.floorplan.load_mask`
+        :type mask: str
+        :param mask_color: derive the mask from the floorplan instead, with
+          this background color; see
+          :py:func:`~wifi_survey_heatmap.floorplan.derive_mask`
+        :type mask_color: tuple
+        :param bin_size: if given, bin the survey points into cells of this
+          size before interpolating; see
+          :py:func:`~wifi_survey_heatmap.survey.bin_survey`
+        :type bin_size: float
+        :param bin_aggregate: aggregation of the values in each bin
+        :type bin_aggregate: str
+        :param adaptive: if given, evaluate the grid adaptively with this
+          tolerance; see
+          :py:func:`~wifi_survey_heatmap.interpolation.evaluate_adaptive`
+        :type adaptive: float
+        :param rbf_kernel: kernel of the ``rbf`` method
+        :type rbf_kernel: str
+        :param rbf_epsilon: shape parameter of the ``rbf`` kernel
+        :type rbf_epsilon: float
+        :param rbf_smooth: smoothing of the ``rbf`` method
+        :type rbf_smooth: float
+        :param rbf_params: path to a ``tuning_TITLE.json`` file written by
+          ``wifi-heatmap --tune``, whose per-metric ``rbf`` options are used
+        :type rbf_params: str
+        """
+        self._interpolation = interpolation
+        self._metric_interpolation = metric_interpolation or {}
+        self._interp_opts = {
+            'neighbors': neighbors, 'power': idw_power, 'adaptive': adaptive,
+            'kernel': rbf_kernel, 'epsilon': rbf_epsilon, 'smooth': rbf_smooth
+        }
+        self._rbf_params = {}
+        if rbf_params is not None:
+            logger.info('Loading RBF parameters from: %s', rbf_params)
+            with open(rbf_params, 'r') as fh:
+                self._rbf_params = {
+                    k: v['params']
+                    for k, v in json.loads(fh.read())['metrics'].items()
+                }
+        self._memory_budget = memory_budget
+        self._percentiles = list(percentiles)
+        self._coverage = defaultdict(list)
+        for metric, op, value in (coverage or []):
+            self._coverage[metric].append((op, value))
+        self._bins = bins
+        self._mask = mask
+        self._mask_color = mask_color
+        self._bin_size = bin_size
+        self._bin_aggregate = bin_aggregate
+        self.thresholds = {}
+        if thresholds is not None:
+            logger.info('Loading thresholds from: %s', thresholds)
+            with open(thresholds, 'r') as fh:
+                self.thresholds = json.loads(fh.read())
+
+    def stats(self, title, image_path=None):
+        """
+        Interpolate all metrics of a survey and return their statistics.
+
+        :param title: survey title (or survey file path)
+        :type title: str
+        :param image_path: floorplan image path; defaults to the one stored
+          in the survey
+        :type image_path: str
+        :return: dict with the number of survey ``points``, the ``grid``
+          shape, the ``area`` taken into account (in square floorplan
+          pixels), and the ``metrics`` statistics: see
+          :py:func:`grid_stats` for numeric metrics, and the share of the
+          area of each value (``areas``) for categorical ones
+        :rtype: dict
+        """
+        fpath = survey_path(title)
+        survey = load_survey(fpath)
+        logger.info('Loaded %d survey points from %s', len(survey), fpath)
+        if self._bin_size:
+            survey = bin_survey(survey, self._bin_size, self._bin_aggregate)
+        if image_path is None:
+            image_path = survey.img_path
+        if image_path is None:
+            raise ValueError('No image path found in %s' % fpath)
+        width, height = open_image(image_path).size
+        height -= 1
+        x, y = grid_axes(width, height)
+        num_y, num_x = len(y), len(x)
+        weights = cell_weights(num_y, num_x)
+        mask = None
+        if self._mask is not None:
+            mask = load_mask(self._mask, x, y)
+        elif self._mask_color is not None:
+            mask = derive_mask(
+                FloorplanPyramid(image_path), x, y, self._mask_color
+            )
+        if mask is not None:
+            weights[~mask] = 0
+        cell_area = (width / (num_x - 1.0)) * (height / (num_y - 1.0))
+        res = {
+            'points': len(survey),
+            'grid': [num_y, num_x],
+            'area': float(weights.sum() * cell_area),
+            'metrics': {},
+        }
+        for key, z in self._grids(survey, width, height, x, y, mask):
+            if key in CATEGORICAL:
+                res['metrics'][key] = self._areas(z, weights)
+                continue
+            value_range = None
+            limits = self.thresholds.get(key, {})
+            if 'min' in limits and 'max' in limits:
+                value_range = (limits['min'], limits['max'])
+            res['metrics'][key] = grid_stats(
+                z, weights, percentiles=self._percentiles,
+                coverage=self._coverage.get(key), bins=self._bins,
+                value_range=value_range
+            )
+        return res
+
+    @staticmethod
+    def _areas(labels, weights):
+        """share of the area of each value of a categorical metric"""
+        keep = weights > 0
+        values, inverse = np.unique(labels[keep], return_inverse=True)
+        shares = np.bincount(inverse, weights=weights[keep])
+        return {'areas': dict(
+            (_format(v), float(share))
+            for v, share in zip(values, shares / shares.sum())
+        )}
+
+    def _grids(self, survey, width, height, x, y, mask=None):
+        """
+        Interpolate the metrics of a survey onto the grid spanned by ``x``
+        and ``y``, one interpolator per method for all of its metrics. With
+        a ``mask``, only the cells inside it are evaluated, and the image
+        corners are not pinned. Categorical metrics (see
+        :py:data:`~wifi_survey_heatmap.survey.CATEGORICAL`) take the value of
+        the nearest survey point instead, and are NaN outside the mask.
+
+        :return: iterator of (metric name, grid) tuples
+        """
+        methods = defaultdict(list)
+        labels = None
+        for key in sorted(survey.columns):
+            if not survey.present[key].all():
+                logger.info('Skipping %s due to missing data', key)
+                continue
+            col = np.where(
+                np.isnan(survey.columns[key]), 0, survey.columns[key]
+            )
+            if key in CATEGORICAL and key not in self._metric_interpolation:
+                if labels is None:
+                    labels = nearest_labels(
+                        survey.x, survey.y, x, y,
+                        memory_budget=self._memory_budget, mask=mask
+                    )
+                z = col[labels]
+                if mask is not None:
+                    z[labels < 0] = np.nan
+                yield key, z
+            elif col.min() == col.max():
+                yield key, np.full((len(y), len(x)), col[0])
+            else:
+                methods[interpolation_group(
+                    key, self._interpolation, self._metric_interpolation,
+                    self._rbf_params
+                )].append((key, col))
+        for (method, params), items in methods.items():
+            logger.debug('Interpolating %d metrics with %s %s', len(items),
+                         method, params or '')
+            a = {'x': survey.x, 'y': survey.y}
+            a.update(items)
+            if mask is None:
+                a = pin_corners(a, width, height)
+            interp = get_interpolator(
+                method, a['x'], a['y'],
+                **dict(self._interp_opts, **dict(params or ()))
+            )
+            interp.fit(np.column_stack([a[key] for key, _ in items]))
+            out = evaluate_grid(
+                interp, x, y, out=allocate_grids(len(items), len(y), len(x)),
+                memory_budget=self._memory_budget, mask=mask,
+                tolerance=self._interp_opts['adaptive']
+            )
+            for i, (key, _) in enumerate(items):
+                yield key, out[i]
+
+
+def parse_args(argv):
+    """
+    parse arguments/options
+
+    this uses the new argparse module instead of optparse
+    see: <https://docs.python.org/2/library/argparse.html>
+    """
+    p = argparse.ArgumentParser(
+        description='wifi survey coverage statistics, without rendering'
+    )
+    p.add_argument('-v', '--verbose', dest='verbose', action='count', default=0,
+                   help='verbose output. specify twice for debug-level output.')
+    p.add_argument('-p', '--picture', dest='IMAGE', type=str, action='store',
+                   default=None,
+                   help='Path to background image; defaults to the one '
+                        'stored in each survey')
+    p.add_argument('-m', '--mask', dest='mask', type=str, action='store',
+                   default=None,
+                   help='Path to a mask image of the same size as the '
+                        'floorplan; only its non-black, non-transparent '
+                        'area is taken into account')
+    p.add_argument('--mask-color', dest='mask_color', type=parse_color,
+                   action='store', default=None, metavar='RRGGBB',
+                   help='Derive the mask from the floorplan instead: the '
+                        'area of this background color (or "transparent") '
+                        'connected to the edges of the image is outside of '
+                        'the building')
+    p.add_argument('-t', '--thresholds', dest='thresholds', action='store',
+                   type=str,
+                   help='thresholds JSON file path; used as the ranges of '
+                        'the histograms')
+    p.add_argument('-C', '--coverage', dest='coverage', action='append',
+                   default=[], type=coverage_threshold,
+                   metavar='METRIC>=VALUE',
+                   help='Report the share of the area where a metric meets '
+                        'a threshold (>=, >, <= or <); may be specified '
+                        'multiple times')
+    p.add_argument('-P', '--percentile', dest='percentiles', type=float,
+                   action='append', default=None,
+                   help='Percentile to report; may be specified multiple '
+                        'times (default: %s)' % ', '.join(
+                            str(x) for x in DEFAULT_PERCENTILES
+                        ))
+    p.add_argument('-b', '--bins', dest='bins', type=int, action='store',
+                   default=10, help='Number of histogram bins (default: 10)')
+    add_interpolation_arguments(p, METRICS)
+    p.add_argument('--bin-size', dest='bin_size', type=float,
+                   action='store', default=None, metavar='PIXELS',
+                   help='Before interpolating, bin the survey points into '
+                        'square cells of this size, in floorplan pixels, '
+                        'and reduce each cell to one point')
+    p.add_argument('--bin-aggregate', dest='bin_aggregate', action='store',
+                   default='mean', choices=AGGREGATES,
+                   help='How to aggregate the values of the points in each '
+                        '--bin-size cell (default: mean)')
+    p.add_argument('-o', '--output', dest='output', type=str,
+                   action='store', default=None,
+                   help='Write the statistics to this JSON file instead of '
+                        'STDOUT')
+    p.add_argument(
+        'TITLE', type=str, help='Title for survey (and data filename)',
+        nargs='+'
+    )
+    args = p.parse_args(argv)
+    return args
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    # set logging level
+    if args.verbose > 1:
+        set_log_debug()
+    elif args.verbose == 1:
+        set_log_info()
+
+    gen = SurveyStats(
+        thresholds=args.thresholds,
+        percentiles=args.percentiles or DEFAULT_PERCENTILES,
+        coverage=args.coverage, bins=args.bins, mask=args.mask,
+        mask_color=args.mask_color, bin_size=args.bin_size,
+        bin_aggregate=args.bin_aggregate, **interpolation_kwargs(args)
+    )
+    res = {}
+    for title in args.TITLE:
+        try:
+            res[title] = gen.stats(title, image_path=args.IMAGE)
+        except ValueError as ex:
+            logger.error(str(ex))
+            raise SystemExit(1)
+    out = json.dumps(res, indent=4, sort_keys=True)
+    if args.output is None:
+        print(out)
+    else:
+        with open(args.output, 'w') as fh:
+            fh.write(out)
+        logger.info('Wrote: %s', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,705 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+import logging
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+#: Scalar survey metrics: metric name to (path of keys into a survey point's
+#: ``result``, scale, offset). A point has a metric if the first key of the
+#: path is present in its result.
+METRICS = {
+    'signal_quality': (('signal_mbm',), 1.0, 130.0),
+    'tx_power': (('tx_power',), 1.0, 0.0),
+    'tcp_download_Mbps': (('tcp-reverse', 'received_Mbps'), 1.0, 0.0),
+    'udp_download_Mbps': (('udp', 'Mbps'), 1.0, 0.0),
+    'tcp_upload_Mbps': (('tcp', 'received_Mbps'), 1.0, 0.0),
+    'udp_upload_Mbps': (('udp-reverse', 'Mbps'), 1.0, 0.0),
+    'jitter_download': (('udp', 'jitter_ms'), 1.0, 0.0),
+    'jitter_upload': (('udp-reverse', 'jitter_ms'), 1.0, 0.0),
+    'frequency': (('frequency',), 1e-3, 0.0),
+    'channel': (('channel',), 1.0, 0.0),
+    'channel_bitrate': (('bitrate',), 1.0, 0.0),
+}
+
+#: Raw survey point result fields stored as columns: field name (the path of
+#: keys joined with ``.``) to path of keys into the point's ``result``
+FIELDS = dict(
+    ('.'.join(path), path) for path, _, _ in METRICS.values()
+)
+
+#: Fields of each scan result stored as columns, and their types
+SCAN_FIELDS = (
+    ('bssid', str),
+    ('ssid', str),
+    ('frequency', float),
+    ('signal_mbm', float),
+    ('channel', float),
+)
+
+#: Version of the columnar (``.npz``) survey format
+NPZ_VERSION = 1
+
+#: prefix of the ijson events of one survey point
+_POINT_PREFIX = 'survey_points.item'
+_SCAN_PREFIX = _POINT_PREFIX + '.result.scan_results'
+
+
+class _Column(object):
+    """
+    A NumPy column filled one value at a time, growing geometrically when the
+    number of rows is not known in advance.
+    """
+
+    def __init__(self, dtype, capacity, fill):
+        self._fill = fill
+        self._data = np.full(capacity, fill, dtype=dtype)
+        self._size = 0
+
+    def set(self, row, value):
+        if row >= len(self._data):
+            grown = np.full(
+                max(2 * len(self._data), row + 1), self._fill,
+                dtype=self._data.dtype
+            )
+            grown[:len(self._data)] = self._data
+            self._data = grown
+        self._data[row] = value
+        self._size = max(self._size, row + 1)
+
+    def array(self, size=None):
+        if size is None:
+            size = self._size
+        if size > len(self._data):
+            self.set(size - 1, self._fill)
+        return self._data[:size]
+
+
+class Survey(object):
+    """
+    Columnar survey data, as loaded by :py:func:`load_survey`.
+
+    :ivar img_path: floorplan image path stored with the survey, or None
+    :ivar x: X coordinates of the survey points
+    :ivar y: Y coordinates of the survey points
+    :ivar columns: dict of metric name to float64 array of its value at each
+      point; NaN where the value is missing or null
+    :ivar present: dict of metric name to boolean array of whether each point
+      has the metric
+    :ivar bssid: array of the BSSID each point was associated with (None if
+      unknown)
+    :ivar scan: if scan results were loaded, a dict of flattened scan result
+      arrays ``point`` (index of the survey point) and each of
+      :py:data:`SCAN_FIELDS`, else None
+    :ivar scan_complete: whether every survey point had scan results
+    """
+
+    def __init__(
+        self, img_path, x, y, columns, present, bssid, scan=None,
+        scan_complete=False
+    ):
+        self.img_path = img_path
+        self.x = x
+        self.y = y
+        self.columns = columns
+        self.present = present
+        self.bssid = bssid
+        self.scan = scan
+        self.scan_complete = scan_complete
+
+    def __len__(self):
+        return len(self.x)
+
+
+def _iter_survey(fh, scan):
+    """
+    Iterate over the ``img_path`` and survey points of a survey JSON file.
+
+    If :py:mod:`ijson` is installed, the file is parsed incrementally, one
+    survey point at a time, and scan results are skipped entirely unless
+    ``scan`` is True. Otherwise the file is parsed with :py:mod:`json`.
+
+    :return: iterator of (key, value) tuples, where key is ``img_path`` or
+      ``point``, or ``survey_points`` with a value of None when the survey
+      has a (possibly empty) list of points
+    """
+    if ijson is None:
+        data = json.load(fh)
+        if 'img_path' in data:
+            yield 'img_path', data['img_path']
+        if 'survey_points' in data:
+            yield 'survey_points', None
+            for point in data['survey_points']:
+                yield 'point', point
+        return
+    builder = None
+    for prefix, event, value in ijson.parse(fh):
+        if builder is None:
+            if prefix == 'img_path':
+                yield 'img_path', value
+            elif prefix == 'survey_points' and event == 'start_array':
+                yield 'survey_points', None
+            elif prefix == _POINT_PREFIX and event == 'start_map':
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            continue
+        if not scan and (
+            prefix.startswith(_SCAN_PREFIX) or (
+                prefix == _POINT_PREFIX + '.result' and
+                event == 'map_key' and value == 'scan_results'
+            )
+        ):
+            continue
+        builder.event(event, value)
+        if prefix == _POINT_PREFIX and event == 'end_map':
+            yield 'point', builder.value
+            builder = None
+
+
+def _field_value(result, path):
+    """
+    Return the value of a field in a survey point result, NaN if it is
+    null, or None if the point does not have the field.
+    """
+    if path[0] not in result:
+        return None
+    value = result
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    if value is None:
+        return np.nan
+    return float(value)
+
+
+def _read_json(fpath, fields, scan, capacity):
+    """
+    Read the given fields (and, if ``scan`` is True, the scan results) of a
+    survey JSON file into a table of columns; see :py:func:`_read_npz`.
+    """
+    img_path = None
+    has_points = False
+    seen = set()
+    x = _Column(np.float64, capacity, np.nan)
+    y = _Column(np.float64, capacity, np.nan)
+    bssid = _Column(object, capacity, None)
+    values = {name: _Column(np.float64, capacity, np.nan) for name in fields}
+    has = {name: _Column(bool, capacity, False) for name in fields}
+    has_scan = _Column(bool, capacity, False)
+    scan_cols = {'point': _Column(np.int64, capacity, -1)}
+    for name, kind in SCAN_FIELDS:
+        scan_cols[name] = _Column(
+            object if kind is str else np.float64, capacity,
+            None if kind is str else np.nan
+        )
+    num_scan = 0
+    row = 0
+    dupes = 0
+    with open(fpath, 'r') as fh:
+        for key, value in _iter_survey(fh, scan):
+            if key == 'img_path':
+                img_path = value
+                continue
+            if key == 'survey_points':
+                has_points = True
+                continue
+            coords = (value['x'], value['y'])
+            if coords in seen:
+                dupes += 1
+                continue
+            seen.add(coords)
+            result = value.get('result', {})
+            x.set(row, float(value['x']))
+            y.set(row, float(value['y']))
+            bssid.set(row, result.get('mac'))
+            for name in fields:
+                val = _field_value(result, FIELDS[name])
+                if val is not None:
+                    values[name].set(row, val)
+                    has[name].set(row, True)
+            if scan and 'scan_results' in result:
+                has_scan.set(row, True)
+                for bss in (result['scan_results'] or {}).values():
+                    scan_cols['point'].set(num_scan, row)
+                    for name, kind in SCAN_FIELDS:
+                        val = bss.get(name)
+                        if kind is float and val is None:
+                            val = np.nan
+                        scan_cols[name].set(num_scan, val)
+                    num_scan += 1
+            row += 1
+    if not has_points:
+        raise ValueError('No survey points found in {}'.format(fpath))
+    if dupes:
+        logger.info('Ignored %d duplicate survey points', dupes)
+    return {
+        'img_path': img_path,
+        'x': x.array(row),
+        'y': y.array(row),
+        'bssid': bssid.array(row),
+        'values': {name: col.array(row) for name, col in values.items()},
+        'has': {name: col.array(row) for name, col in has.items()},
+        'has_scan': has_scan.array(row) if scan else None,
+        'scan': {
+            name: col.array(num_scan) for name, col in scan_cols.items()
+        } if scan else None,
+    }
+
+
+def _mmap_member(fpath, zf, name):
+    """
+    Memory-map an array stored uncompressed in a ``.npz`` file.
+
+    :return: the array, or None if it cannot be memory-mapped
+    :rtype: numpy.memmap
+    """
+    info = zf.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(fpath, 'rb') as fh:
+        fh.seek(info.header_offset)
+        local = fh.read(30)
+        name_len, extra_len = struct.unpack('<HH', local[26:30])
+        fh.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(fh)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(fh)
+        elif version == (2, 0):
+            header = np.lib.format.read_array_header_2_0(fh)
+        else:
+            return None
+        offset = fh.tell()
+    shape, fortran_order, dtype = header
+    if dtype.hasobject or 0 in shape:
+        return None
+    return np.memmap(
+        fpath, dtype=dtype, mode='r', offset=offset, shape=shape,
+        order='F' if fortran_order else 'C'
+    )
+
+
+def _read_npz(fpath, fields, scan):
+    """
+    Read the given fields (and, if ``scan`` is True, the scan results) of a
+    columnar survey file written by :py:func:`convert_survey`. Only the needed
+    columns are read, and numeric columns are memory-mapped.
+
+    :return: dict with keys ``img_path``, ``x``, ``y``, ``bssid``,
+      ``values`` and ``has`` (dicts of field name to the raw field values and
+      whether each point has the field), ``has_scan`` (whether each point has
+      scan results) and ``scan`` (dict of scan result columns); the last two
+      are None if ``scan`` is False
+    :rtype: dict
+    """
+    with zipfile.ZipFile(fpath) as zf, np.load(fpath) as npz:
+        members = set(npz.files)
+
+        def column(name):
+            if name not in members:
+                raise ValueError(
+                    'Survey file {} has no {} column'.format(fpath, name)
+                )
+            arr = _mmap_member(fpath, zf, name)
+            return npz[name] if arr is None else arr
+
+        if 'x' not in members:
+            raise ValueError('No survey points found in {}'.format(fpath))
+        version = int(column('npz_version'))
+        if version > NPZ_VERSION:
+            raise ValueError(
+                'Survey file {} has unsupported version {}'.format(
+                    fpath, version
+                )
+            )
+        img_path = str(npz['img_path']) if 'img_path' in members else None
+        bssid = column('bssid')
+        table = {
+            'img_path': img_path,
+            'x': column('x'),
+            'y': column('y'),
+            'bssid': np.where(bssid == '', None, bssid.astype(object)),
+            'values': {},
+            'has': {},
+            'has_scan': None,
+            'scan': None,
+        }
+        for name in fields:
+            if 'values.' + name in members:
+                table['values'][name] = column('values.' + name)
+                table['has'][name] = column('has.' + name)
+            else:
+                table['values'][name] = np.full(len(table['x']), np.nan)
+                table['has'][name] = np.zeros(len(table['x']), dtype=bool)
+        if scan:
+            table['has_scan'] = column('has_scan')
+            table['scan'] = {'point': column('scan.point')}
+            for name, _ in SCAN_FIELDS:
+                table['scan'][name] = column('scan.' + name)
+    return table
+
+
+def _survey(table, metrics):
+    """
+    Build a :py:class:`Survey` with the given metrics from a table of raw
+    columns, as returned by :py:func:`_read_npz`.
+    """
+    columns = {}
+    present = {}
+    for name in metrics:
+        path, scale, offset = METRICS[name]
+        field = '.'.join(path)
+        columns[name] = table['values'][field]
+        if scale != 1 or offset != 0:
+            columns[name] = columns[name] * scale + offset
+        present[name] = table['has'][field]
+    scan_complete = False
+    if table['has_scan'] is not None:
+        scan_complete = bool(table['has_scan'].all())
+    return Survey(
+        table['img_path'], table['x'], table['y'], columns, present,
+        table['bssid'], scan=table['scan'], scan_complete=scan_complete
+    )
+
+
+def _fields(metrics):
+    return sorted(set('.'.join(METRICS[name][0]) for name in metrics))
+
+
+def _read(fpath, fields, scan, capacity=1024):
+    if os.path.splitext(fpath)[1].lower() == '.npz':
+        return _read_npz(fpath, fields, scan)
+    return _read_json(fpath, fields, scan, capacity)
+
+
+def survey_path(title):
+    """
+    Return the path of the survey file of a survey title: the title itself
+    if it has a ``.json`` or ``.npz`` extension, else ``TITLE.json``, or
+    ``TITLE.npz`` if only that exists.
+
+    :rtype: str
+    """
+    if title.endswith(('.json', '.npz')):
+        return title
+    # fall back to a columnar survey file if there is no JSON one
+    if os.path.exists(title + '.npz') and not os.path.exists(title + '.json'):
+        return title + '.npz'
+    return title + '.json'
+
+
+def load_survey(fpath, metrics=None, scan=False, capacity=1024):
+    """
+    Load a survey in a single pass, either from the JSON file written by
+    ``wifi-survey`` or from a columnar ``.npz`` file written by
+    :py:func:`convert_survey`.
+
+    Only the requested metrics (and, if ``scan`` is True, the scan results)
+    are extracted, directly into NumPy columns. When loading JSON, points with
+    the same coordinates as an earlier point are dropped as they are read.
+
+    :param fpath: path to the survey file; files with a ``.npz`` extension
+      are read as columnar survey files, all others as JSON
+    :type fpath: str
+    :param metrics: names of the metrics to load (keys of
+      :py:data:`METRICS`); defaults to all
+    :type metrics: list
+    :param scan: whether to load the scan results
+    :type scan: bool
+    :param capacity: initial number of rows to allocate when loading JSON
+    :type capacity: int
+    :rtype: Survey
+    :raises ValueError: if the file has no survey points
+    """
+    if metrics is None:
+        metrics = list(METRICS.keys())
+    table = _read(fpath, _fields(metrics), scan, capacity)
+    return _survey(table, metrics)
+
+
+#: metrics with categorical values, which are binned by their most common
+#: value instead of being aggregated
+CATEGORICAL = ('frequency', 'channel')
+
+#: aggregations of the metric values of the points in each bin
+AGGREGATES = ('mean', 'median', 'min', 'count')
+
+
+def _cells(x, y, size):
+    """
+    Hash survey point coordinates into square cells of the given size.
+
+    :return: index of the cell of each point (ordered by cell key), and the
+      number of cells
+    :rtype: tuple
+    """
+    kx = np.floor(np.asarray(x, dtype=float) / size).astype(np.int64)
+    ky = np.floor(np.asarray(y, dtype=float) / size).astype(np.int64)
+    keys = (kx << 32) ^ (ky & 0xffffffff)
+    _, cell = np.unique(keys, return_inverse=True)
+    cell = cell.ravel()
+    return cell, int(cell.max()) + 1 if len(cell) else 0
+
+
+def _most_common(cell, num, codes):
+    """
+    Return, for each cell, the most common of the integer ``codes`` of its
+    points (the first one seen on ties), or -1 if it has none.
+
+    :rtype: numpy.ndarray
+    """
+    res = np.full(num, -1, dtype=np.intp)
+    if not len(codes):
+        return res
+    width = int(codes.max()) + 1
+    counts = np.bincount(cell * width + codes, minlength=num * width)
+    counts = counts.reshape(num, width)
+    has = counts.any(axis=1)
+    res[has] = counts[has].argmax(axis=1)
+    return res
+
+
+def _aggregate(cell, num, values, how):
+    """
+    Aggregate the values of the points of each cell.
+
+    :return: aggregated value of each cell (NaN for cells without values)
+    :rtype: numpy.ndarray
+    """
+    counts = np.bincount(cell, minlength=num)
+    if how == 'count':
+        return counts.astype(float)
+    res = np.full(num, np.nan)
+    has = counts > 0
+    if how == 'mean':
+        res[has] = np.bincount(cell, weights=values, minlength=num)[has] / \
+            counts[has]
+        return res
+    order = np.lexsort((values, cell))
+    start = np.searchsorted(cell[order], np.arange(num))
+    sorted_values = values[order]
+    if how == 'min':
+        res[has] = sorted_values[start[has]]
+    else:
+        c = counts[has]
+        res[has] = (
+            sorted_values[start[has] + (c - 1) // 2] +
+            sorted_values[start[has] + c // 2]
+        ) / 2
+    return res
+
+
+def bin_survey(survey, size, how='mean'):
+    """
+    Reduce a densely sampled survey by binning its points into square cells
+    of ``size`` floorplan pixels (with a spatial hash of the coordinates)
+    and aggregating each cell to a single point, at the centroid of the
+    points in it.
+
+    Numeric metrics are aggregated per cell with ``how`` over the points
+    that have a (non-null) value; ``count`` gives the number of such
+    points. The categorical metrics (see :py:data:`CATEGORICAL`) and the
+    BSSID take the most common value of the cell. Scan results are kept,
+    and assigned to the cell of their point.
+
+    :param survey: survey to reduce
+    :type survey: Survey
+    :param size: cell size, in floorplan pixels
+    :type size: float
+    :param how: aggregation; one of :py:data:`AGGREGATES`
+    :type how: str
+    :rtype: Survey
+    """
+    if how not in AGGREGATES:
+        raise ValueError('Unknown aggregation: %s' % how)
+    cell, num = _cells(survey.x, survey.y, size)
+    counts = np.bincount(cell, minlength=num)
+    x = np.bincount(cell, weights=survey.x, minlength=num) / counts
+    y = np.bincount(cell, weights=survey.y, minlength=num) / counts
+    columns = {}
+    present = {}
+    for name, col in survey.columns.items():
+        valid = survey.present[name] & ~np.isnan(col)
+        present[name] = np.bincount(
+            cell, weights=survey.present[name], minlength=num
+        ) > 0
+        if name in CATEGORICAL:
+            labels, codes = np.unique(col[valid], return_inverse=True)
+            idx = _most_common(cell[valid], num, codes.ravel())
+            columns[name] = np.full(num, np.nan)
+            columns[name][idx >= 0] = labels[idx[idx >= 0]]
+        else:
+            columns[name] = _aggregate(cell[valid], num, col[valid], how)
+    known = np.array([b is not None for b in survey.bssid], dtype=bool)
+    bssid = np.full(num, None, dtype=object)
+    if known.any():
+        labels, codes = np.unique(
+            survey.bssid[known].astype(str), return_inverse=True
+        )
+        idx = _most_common(cell[known], num, codes.ravel())
+        bssid[idx >= 0] = labels[idx[idx >= 0]]
+    scan = None
+    if survey.scan is not None:
+        scan = dict(survey.scan)
+        scan['point'] = cell[scan['point']]
+    logger.info(
+        'Binned %d survey points into %d cells of %s pixels', len(survey),
+        num, size
+    )
+    return Survey(
+        survey.img_path, x, y, columns, present, bssid, scan=scan,
+        scan_complete=survey.scan_complete
+    )
+
+
+def _str_column(values):
+    return np.array(['' if v is None else str(v) for v in values], dtype=str)
+
+
+def _write_npz(table, fpath):
+    arrays = {
+        'npz_version': np.array(NPZ_VERSION),
+        'x': np.asarray(table['x'], dtype=np.float64),
+        'y': np.asarray(table['y'], dtype=np.float64),
+        'bssid': _str_column(table['bssid']),
+        'has_scan': np.asarray(table['has_scan'], dtype=bool),
+        'scan.point': np.asarray(table['scan']['point'], dtype=np.int64),
+    }
+    if table['img_path'] is not None:
+        arrays['img_path'] = np.array(table['img_path'])
+    for name in table['values']:
+        arrays['values.' + name] = np.asarray(
+            table['values'][name], dtype=np.float64
+        )
+        arrays['has.' + name] = np.asarray(table['has'][name], dtype=bool)
+    for name, kind in SCAN_FIELDS:
+        if kind is str:
+            arrays['scan.' + name] = _str_column(table['scan'][name])
+        else:
+            arrays['scan.' + name] = np.asarray(
+                table['scan'][name], dtype=np.float64
+            )
+    # written uncompressed, so that the columns can be memory-mapped
+    with open(fpath, 'wb') as fh:
+        np.savez(fh, **arrays)
+
+
+def _json_value(value):
+    value = float(value)
+    if np.isnan(value):
+        return None
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+def _write_json(table, fpath):
+    points = []
+    for i in range(len(table['x'])):
+        result = {}
+        if table['bssid'][i] is not None:
+            result['mac'] = str(table['bssid'][i])
+        for name, values in table['values'].items():
+            if not table['has'][name][i]:
+                continue
+            path = FIELDS[name]
+            parent = result
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[path[-1]] = _json_value(values[i])
+        if table['has_scan'][i]:
+            result['scan_results'] = {}
+        points.append({
+            'x': _json_value(table['x'][i]),
+            'y': _json_value(table['y'][i]),
+            'result': result,
+        })
+    scan = table['scan']
+    for j, point in enumerate(scan['point']):
+        bss = {}
+        for name, kind in SCAN_FIELDS:
+            value = scan[name][j]
+            if kind is str:
+                bss[name] = None if value is None else str(value)
+            else:
+                bss[name] = _json_value(value)
+        # keyed by index like wifi-survey does, as BSSIDs may be missing
+        # or repeated
+        results = points[point]['result']['scan_results']
+        results[str(len(results))] = bss
+    with open(fpath, 'w') as fh:
+        json.dump(
+            {'img_path': table['img_path'], 'survey_points': points}, fh,
+            indent=2
+        )
+
+
+def convert_survey(src, dst):
+    """
+    Convert a survey between the JSON format written by ``wifi-survey`` and
+    the columnar ``.npz`` format, based on the extension of ``dst``.
+
+    The columnar format stores the point coordinates, the BSSID, the raw
+    value of every field used by :py:data:`METRICS` and the
+    :py:data:`SCAN_FIELDS` of each scan result as typed columns; other
+    fields of the survey results are not kept.
+
+    :param src: path to the survey file to read (JSON or ``.npz``)
+    :type src: str
+    :param dst: path to the survey file to write; written as ``.npz`` if it
+      has that extension, otherwise as JSON
+    :type dst: str
+    :return: number of survey points written
+    :rtype: int
+    """
+    table = _read(src, sorted(FIELDS.keys()), True)
+    if os.path.splitext(dst)[1].lower() == '.npz':
+        _write_npz(table, dst)
+    else:
+        _write_json(table, dst)
+    return len(table['x'])
@@ -0,0 +1,109 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+
+import pytest
+from PIL import Image
+
+from wifi_survey_heatmap.batch import (
+    BatchHeatMapGenerator, BatchJob, load_manifest
+)
+
+
+def write_survey(title):
+    with open('%s.json' % title, 'w') as fh:
+        json.dump({'img_path': 'floor.png', 'survey_points': [
+            {'x': x, 'y': y, 'result': {
+                'signal_mbm': -4000 - 100 * (x + y),
+                'mac': 'aa:bb:cc:dd:ee:0%d' % (x // 20),
+            }} for x, y in ((5, 5), (35, 5), (5, 15), (35, 15), (20, 10))
+        ]}, fh)
+
+
+class TestLoadManifest(object):
+
+    def test_load(self, tmpdir):
+        path = str(tmpdir.join('manifest.json'))
+        with open(path, 'w') as fh:
+            json.dump({'jobs': [
+                'a', {'title': 'b', 'picture': 'b.png', 'ignore': ['x']}
+            ]}, fh)
+        assert load_manifest(path) == [
+            ('a', {}), ('b', {'image_path': 'b.png', 'ignore_ssids': ['x']})
+        ]
+
+    def test_unknown_keys(self, tmpdir):
+        path = str(tmpdir.join('manifest.json'))
+        with open(path, 'w') as fh:
+            json.dump([{'title': 'a', 'foo': 1}], fh)
+        with pytest.raises(ValueError):
+            load_manifest(path)
+
+
+class TestBatchHeatMapGenerator(object):
+
+    def test_run(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        Image.new('RGB', (40, 21), (255, 255, 255)).save('floor.png')
+        write_survey('first')
+        write_survey('second')
+        with open('manifest.json', 'w') as fh:
+            json.dump(['first', {'title': 'second', 'picture': 'floor.png'}],
+                      fh)
+        kwargs = dict(
+            showpoints=False, cname='RdYlBu_r', contours=None,
+            interpolation='idw', cache_dir='cache'
+        )
+        jobs = [
+            BatchJob(title, **dict(kwargs, **overrides))
+            for title, overrides in load_manifest('manifest.json')
+        ]
+        BatchHeatMapGenerator(jobs).run()
+        for job in jobs:
+            assert job.error is None
+            assert job.written > 0
+            assert tmpdir.join(
+                'signal_quality_%s.json.png' % job.title
+            ).exists()
+        # both surveys were rendered from the same floorplan
+        assert jobs[0].generator._layout is jobs[1].generator._layout
+        # and their outputs recorded in the render cache by finish()
+        assert not any(
+            t[:2] == ('_render_metric', ('signal_quality',))
+            for job in jobs for t in job.generator.prepare()
+        )
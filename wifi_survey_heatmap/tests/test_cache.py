@@ -0,0 +1,120 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import numpy as np
+
+from wifi_survey_heatmap.cache import RenderCache, digest
+
+
+class TestDigest(object):
+
+    def test_stable(self):
+        arr = np.arange(10, dtype=np.float32)
+        assert digest('a', arr, {'b': 1}) == digest('a', arr.copy(), {'b': 1})
+
+    def test_sensitive(self):
+        arr = np.arange(10, dtype=np.float32)
+        base = digest('a', arr)
+        assert digest('b', arr) != base
+        assert digest('a', arr.astype(np.float64)) != base
+        assert digest('a', arr[::-1]) != base
+        assert digest('a', arr.reshape(2, 5)) != base
+
+
+class TestRenderCache(object):
+
+    def test_fresh(self, tmpdir):
+        fname = str(tmpdir.join('out.png'))
+        cache = RenderCache(str(tmpdir.join('cache')))
+        assert not cache.is_fresh(fname, 'k1')
+        cache.record(fname, 'k1')
+        # output file does not exist
+        assert not cache.is_fresh(fname, 'k1')
+        with open(fname, 'w') as fh:
+            fh.write('x')
+        assert cache.is_fresh(fname, 'k1')
+        assert not cache.is_fresh(fname, 'k2')
+        # the manifest is only written by save()
+        assert not RenderCache(str(tmpdir.join('cache'))).is_fresh(
+            fname, 'k1'
+        )
+        cache.save()
+        cache = RenderCache(str(tmpdir.join('cache')))
+        assert cache.is_fresh(fname, 'k1')
+
+    def test_save_merges(self, tmpdir):
+        path = str(tmpdir.join('cache'))
+        one, two = RenderCache(path), RenderCache(path)
+        one.record('a.png', 'ka')
+        two.record('b.png', 'kb')
+        one.save()
+        two.save()
+        cache = RenderCache(path)
+        assert cache._manifest == {
+            'a.png': {'key': 'ka', 'grids': []},
+            'b.png': {'key': 'kb', 'grids': []},
+        }
+
+    def test_grids(self, tmpdir):
+        cache = RenderCache(str(tmpdir))
+        assert cache.load_grid('k') is None
+        grid = np.arange(12, dtype=np.float64).reshape(3, 4)
+        cache.save_grid('k', grid)
+        res = cache.load_grid('k')
+        assert res.dtype == np.float32
+        assert np.array_equal(res, grid)
+
+    def test_prune_grids(self, tmpdir):
+        path = str(tmpdir.join('cache'))
+        cache = RenderCache(path)
+        grid = np.zeros((2, 2))
+        for key in ('used', 'unused', 'loaded'):
+            cache.save_grid(key, grid)
+        cache.record('a.png', 'ka', grids=['used'])
+        # grids saved since the cache was opened are kept
+        cache.save()
+        assert len(tmpdir.join('cache', 'grids').listdir()) == 3
+        cache = RenderCache(path)
+        cache.load_grid('loaded')
+        cache.save()
+        assert sorted(
+            p.basename for p in tmpdir.join('cache', 'grids').listdir()
+        ) == ['loaded.npy', 'used.npy']
+        RenderCache(path).save()
+        assert [
+            p.basename for p in tmpdir.join('cache', 'grids').listdir()
+        ] == ['used.npy']
@@ -0,0 +1,131 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import os
+import pickle
+
+import numpy as np
+from PIL import Image
+
+from wifi_survey_heatmap.floorplan import (
+    FloorplanPyramid, derive_mask, load_mask, parse_color
+)
+
+
+def _image(tmpdir, width=1100, height=600, color=(10, 20, 30)):
+    fpath = str(tmpdir.join('floor.png'))
+    arr = np.zeros((height, width, 3), dtype=np.uint8)
+    arr[:, :] = color
+    Image.fromarray(arr).save(fpath)
+    return fpath
+
+
+class TestFloorplanPyramid(object):
+
+    def test_levels(self, tmpdir):
+        pyramid = FloorplanPyramid(_image(tmpdir))
+        assert (pyramid.width, pyramid.height) == (1100, 600)
+        assert pyramid.num_levels == 3
+        assert pyramid.level_size(2) == (275, 150)
+        assert pyramid.level_for(2400) == 0
+        assert pyramid.level_for(550) == 1
+        assert pyramid.level_for(300) == 1
+        assert pyramid.level_for(275) == 2
+        level = pyramid.level(1)
+        assert level.dtype == np.uint8
+        assert level.shape == (300, 550, 3)
+        assert tuple(level[0, 0]) == (10, 20, 30)
+
+    def test_cache(self, tmpdir):
+        fpath = _image(tmpdir)
+        FloorplanPyramid(fpath).level(0)
+        assert os.path.exists(fpath + '.pyramid/level2.npy')
+        cached = FloorplanPyramid(fpath).level(2)
+        assert isinstance(cached, np.memmap)
+        assert tuple(cached[0, 0]) == (10, 20, 30)
+
+    def test_build(self, tmpdir):
+        fpath = _image(tmpdir)
+        pyramid = FloorplanPyramid(fpath)
+        pyramid.build()
+        assert sorted(os.listdir(fpath + '.pyramid')) == [
+            'level0.npy', 'level1.npy', 'level2.npy', 'manifest.json'
+        ]
+        # render workers get the pyramid without its levels, and memory-map
+        # them from the cache instead of decoding the image again
+        worker = pickle.loads(pickle.dumps(pyramid))
+        assert worker._levels == {}
+        assert isinstance(worker.level(1), np.memmap)
+
+    def test_rebuild_on_change(self, tmpdir):
+        fpath = _image(tmpdir)
+        FloorplanPyramid(fpath).level(0)
+        _image(tmpdir, width=300, height=200, color=(1, 2, 3))
+        pyramid = FloorplanPyramid(fpath)
+        assert pyramid.num_levels == 1
+        level = pyramid.level(0)
+        assert level.shape == (200, 300, 3)
+        assert tuple(level[0, 0]) == (1, 2, 3)
+
+
+class TestLoadMask(object):
+
+    def test_sample(self, tmpdir):
+        fpath = str(tmpdir.join('mask.png'))
+        arr = np.zeros((10, 20, 4), dtype=np.uint8)
+        arr[:, 10:] = 255
+        arr[0, 19, 3] = 0
+        Image.fromarray(arr).save(fpath)
+        mask = load_mask(fpath, np.array([0, 9.4, 10, 19]), np.array([0, 9]))
+        np.testing.assert_array_equal(mask, [
+            [False, False, True, False],
+            [False, False, True, True],
+        ])
+
+    def test_derive(self, tmpdir):
+        fpath = str(tmpdir.join('floor.png'))
+        arr = np.full((10, 20, 3), 255, dtype=np.uint8)
+        # a room enclosed by walls on the left; open floor on the right
+        arr[1:9, 1] = arr[1:9, 8] = arr[1, 1:9] = arr[8, 1:9] = 0
+        Image.fromarray(arr).save(fpath)
+        mask = derive_mask(
+            FloorplanPyramid(fpath), np.arange(20), np.arange(10),
+            parse_color('#ffffff')
+        )
+        assert mask[4, 4] and mask[1, 1]
+        assert not mask[0, 0] and not mask[4, 15]
+        assert parse_color('transparent') == (0, 0, 0, 0)
@@ -0,0 +1,341 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+
+import matplotlib
+import numpy as np
+import pytest
+
+from wifi_survey_heatmap.diff import DiffGenerator
+from wifi_survey_heatmap.floorplan import FloorplanPyramid
+from wifi_survey_heatmap.heatmap import (
+    HeatMapGenerator, PlotCanvas, accumulate_best_server, blend,
+    channel_overlap, colorize, floorplan_rgb, run_render_tasks
+)
+from PIL import Image
+
+
+class TestChannelOverlap(object):
+
+    def test_spread(self):
+        overlap = channel_overlap({
+            2412.0: (1, 20.0),
+            2417.0: (2, 20.0),
+            2437.0: (6, 20.0),
+            5190.0: (38, 40.0),
+            5210.0: (42, 20.0),
+        })
+        np.testing.assert_array_equal(overlap, [
+            [1, 1, 0, 0, 0],
+            [1, 1, 0, 0, 0],
+            [0, 0, 1, 0, 0],
+            [0, 0, 0, 1, 0],
+            [0, 0, 0, 1, 1],
+        ])
+
+
+class TestChannelUtilization(object):
+
+    def test_per_point(self, tmpdir):
+        def scan(*entries):
+            return {
+                str(i): {'ssid': ssid, 'frequency': freq * 1000000,
+                         'signal_mbm': signal}
+                for i, (ssid, freq, signal) in enumerate(entries)
+            }
+
+        fpath = str(tmpdir.join('survey.json'))
+        with open(fpath, 'w') as fh:
+            json.dump({'survey_points': [
+                {'x': 0, 'y': 0, 'result': {
+                    'signal_mbm': -40,
+                    'scan_results': scan(('a', 2412, -40), ('b', 2412, -60)),
+                }},
+                {'x': 1, 'y': 0, 'result': {
+                    'signal_mbm': -40,
+                    'scan_results': scan(
+                        ('a', 2437, -50), ('guest', 2412, -30)
+                    ),
+                }},
+            ]}, fh)
+        gen = HeatMapGenerator(
+            'floor.png', fpath, False, 'RdYlBu_r', None, ignore_ssids=['guest']
+        )
+        channels, util = gen._channel_utilization()
+        assert channels == [1, 2, 3, 4, 5, 6, 7, 8]
+        # channels 1 and 6 spread over 1-3 and 4-8
+        np.testing.assert_array_equal(util, [
+            [50, 50, 50, 0, 0, 0, 0, 0],
+            [0, 0, 0, 50, 50, 50, 50, 50],
+        ])
+
+
+class TestAccumulateBestServer(object):
+
+    def test_chunks(self):
+        signals = np.array([
+            [-50, -80, -70],
+            [-60, -40, -90],
+            [-55, -45, -30],
+        ], dtype=float)
+        best = np.full(3, -np.inf)
+        second = np.full(3, -np.inf)
+        server = np.zeros(3, dtype=int)
+        overlap = np.zeros(3, dtype=int)
+        # two chunks, as streamed over the BSSIDs
+        accumulate_best_server(
+            best, second, server, overlap, signals[:2], 0, -65
+        )
+        accumulate_best_server(
+            best, second, server, overlap, signals[2:], 2, -65
+        )
+        np.testing.assert_array_equal(best, [-50, -40, -30])
+        np.testing.assert_array_equal(second, [-55, -45, -70])
+        np.testing.assert_array_equal(server, [0, 1, 2])
+        np.testing.assert_array_equal(overlap, [3, 2, 1])
+
+
+class TestRaster(object):
+
+    def test_colorize(self):
+        cmap = matplotlib.colormaps['viridis']
+        rgba = colorize(np.array([[0, 10], [5, np.nan]]), cmap, 0, 10)
+        assert rgba.dtype == np.uint8
+        assert rgba.shape == (2, 2, 4)
+        np.testing.assert_array_equal(rgba[0, 0], cmap(0.0, bytes=True))
+        np.testing.assert_array_equal(rgba[0, 1], cmap(1.0, bytes=True))
+        assert rgba[1, 1, 3] == 0
+
+    def test_floorplan_rgb(self):
+        gray = np.array([[0.0, 1.0]])
+        np.testing.assert_array_equal(
+            floorplan_rgb(gray), [[[0, 0, 0], [255, 255, 255]]]
+        )
+        rgba = np.array([[[0, 0, 0, 0], [10, 20, 30, 255]]], dtype=np.uint8)
+        np.testing.assert_array_equal(
+            floorplan_rgb(rgba), [[[255, 255, 255], [10, 20, 30]]]
+        )
+
+    def test_blend(self):
+        base = np.full((1, 2, 3), 200, dtype=np.uint8)
+        overlay = np.array(
+            [[[0, 0, 0, 255], [0, 0, 0, 0]]], dtype=np.uint8
+        )
+        out = blend(base, overlay, 0.5)
+        np.testing.assert_array_equal(out[0, 1], [200, 200, 200])
+        assert abs(int(out[0, 0, 0]) - 100) <= 1
+
+
+class TestPlotCanvas(object):
+
+    def test_reuse(self, tmpdir):
+        layout = np.ones((50, 80, 3))
+        canvas = PlotCanvas(layout, 80, 49)
+        base = list(canvas.ax.get_children())
+        grid = np.arange(20.0).reshape(4, 5)
+        outputs = []
+        for name, z in (('a', grid), ('b', -grid), ('c', grid)):
+            image = canvas.ax.imshow(z, extent=(0, 80, 49, 0), zorder=100)
+            canvas.ax.contour(z, extent=(0, 80, 49, 0), origin='upper')
+            canvas.figure.colorbar(image, cax=canvas.cax)
+            canvas.ax.set_title(name)
+            fname = str(tmpdir.join(name + '.png'))
+            canvas.save(fname)
+            assert canvas.ax.get_children() == base
+            outputs.append(np.asarray(Image.open(fname)))
+        assert not np.array_equal(outputs[0], outputs[1])
+        np.testing.assert_array_equal(outputs[0], outputs[2])
+
+
+class TestExportGrids(object):
+
+    def test_export(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        Image.new('RGB', (40, 21), (255, 255, 255)).save('floor.png')
+        with open('survey.json', 'w') as fh:
+            json.dump({'img_path': 'floor.png', 'survey_points': [
+                {'x': x, 'y': y, 'result': {'signal_mbm': -40 - x - y}}
+                for x, y in ((5, 5), (35, 5), (5, 15), (35, 15), (20, 10))
+            ]}, fh)
+        gen = HeatMapGenerator(
+            None, 'survey', False, 'RdYlBu_r', None, interpolation='idw',
+            export_grids=True
+        )
+        tasks = gen.prepare()
+        assert ('_export_grid', ('signal_quality',), None) in tasks
+        assert gen._export_grid('signal_quality') == \
+            'grid_signal_quality_survey.json.npy'
+        grid = np.load('grid_signal_quality_survey.json.npy', mmap_mode='r')
+        assert isinstance(grid, np.memmap)
+        assert grid.dtype == np.float32
+        assert grid.shape == (5, 10)
+        # the image corners are pinned to the minimum
+        assert grid[0, 0] == 40
+        with open('grid_signal_quality_survey.json.json') as fh:
+            meta = json.load(fh)
+        assert meta['metric'] == 'signal_quality'
+        assert meta['shape'] == [5, 10]
+        assert meta['extent'] == [0, 40, 20, 0]
+        assert meta['interpolation']['method'] == 'idw'
+        assert meta['range'] == [40, 80]
+
+
+def write_survey(title, offset=0):
+    """write a tiny survey of five points on a 40x21 white floorplan"""
+    Image.new('RGB', (40, 21), (255, 255, 255)).save('floor.png')
+    with open('%s.json' % title, 'w') as fh:
+        json.dump({'img_path': 'floor.png', 'survey_points': [
+            {'x': x, 'y': y, 'result': {
+                'signal_mbm': -4000 - 100 * (x + y) + offset,
+                'mac': 'aa:bb:cc:dd:ee:0%d' % (x // 20),
+            }} for x, y in ((5, 5), (35, 5), (5, 15), (35, 15), (20, 10))
+        ]}, fh)
+
+
+class TestGenerate(object):
+
+    def test_generate(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        write_survey('survey')
+        gen = HeatMapGenerator(
+            None, 'survey', False, 'RdYlBu_r', None, interpolation='idw',
+            cache_dir='cache'
+        )
+        gen.generate()
+        assert tmpdir.join('signal_quality_survey.json.png').exists()
+        assert tmpdir.join('bssid_survey.json.png').exists()
+        # the plot refers to the cached grid it was rendered from
+        with open('cache/manifest.json') as fh:
+            entry = json.load(fh)['signal_quality_survey.json.png']
+        assert len(entry['grids']) == 1
+        assert tmpdir.join(
+            'cache', 'grids', '%s.npy' % entry['grids'][0]
+        ).exists()
+        # the outputs were recorded in the render cache
+        gen = HeatMapGenerator(
+            None, 'survey', False, 'RdYlBu_r', None, interpolation='idw',
+            cache_dir='cache'
+        )
+        tasks = gen.prepare()
+        assert ('_render_metric', ('signal_quality',)) not in [
+            t[:2] for t in tasks
+        ]
+
+    def test_generate_without_bssid(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        write_survey('survey')
+        with open('survey.json') as fh:
+            data = json.load(fh)
+        for point in data['survey_points']:
+            del point['result']['mac']
+        with open('survey.json', 'w') as fh:
+            json.dump(data, fh)
+        gen = HeatMapGenerator(
+            None, 'survey', True, 'RdYlBu_r', None, interpolation='idw'
+        )
+        gen.generate()
+        assert tmpdir.join('signal_quality_survey.json.png').exists()
+
+
+class TestRunRenderTasks(object):
+
+    @pytest.mark.parametrize('threads', [False, True])
+    def test_pool(self, tmpdir, monkeypatch, threads):
+        monkeypatch.chdir(tmpdir)
+        write_survey('survey')
+        gen = HeatMapGenerator(
+            None, 'survey', False, 'RdYlBu_r', None, interpolation='idw',
+            cache_dir='cache', raster='png'
+        )
+        builds = []
+        build = FloorplanPyramid._build
+        monkeypatch.setattr(
+            FloorplanPyramid, '_build',
+            lambda self: builds.append(self.path) or build(self)
+        )
+        tasks = gen.prepare()
+        # a single task would be rendered without a pool
+        assert len(tasks) > 1
+        # the floorplan was decoded once, before rendering
+        assert builds == ['floor.png']
+        assert gen._layout._is_cached()
+        done = []
+        results = run_render_tasks(
+            {0: gen}, [(0, t) for t in tasks], jobs=2, threads=threads,
+            progress=lambda idx, res, elapsed: done.append(idx)
+        )
+        assert sorted(done) == list(range(len(tasks)))
+        # results are returned in task order
+        for (name, args, _), fname in zip(tasks, results):
+            if name == '_render_metric' and args[0] == 'signal_quality':
+                assert fname == 'signal_quality_survey.json.png'
+        assert tmpdir.join('signal_quality_survey.json.png').exists()
+        gen.finish(tasks, results)
+        for (_, _, render_key), fname in zip(tasks, results):
+            if fname is not None:
+                assert gen._cache.is_fresh(fname, render_key)
+        # (worker processes do not share the patched method)
+        assert builds == ['floor.png']
+
+
+class TestDiffGenerator(object):
+
+    def test_diff(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        write_survey('before')
+        write_survey('after', offset=1000)
+        gen = DiffGenerator(
+            None, 'before', 'after', showpoints=False, cname='RdYlBu_r',
+            contours=None, interpolation='idw', raster='png'
+        )
+        tasks = gen.prepare()
+        assert ('_render_delta', ('signal_quality',), None) in tasks
+        delta = gen._deltas['signal_quality']
+        assert delta.shape == (5, 10)
+        # the pinned corners move with the minimum of each survey
+        assert np.allclose(delta, 1000, atol=0.01)
+        assert gen._render_delta('signal_quality') == \
+            'diff_signal_quality_before.json_after.json.png'
+        assert gen._write_deltas() == 'diff_before.json_after.json.json'
+        with np.load('diff_before.json_after.json.npz') as data:
+            assert np.array_equal(data['signal_quality'], delta)
+        with open('diff_before.json_after.json.json') as fh:
+            stats = json.load(fh)['metrics']['signal_quality']
+        assert np.isclose(stats['mean'], 1000)
+        assert stats['increased'] == 1.0
+        assert np.isclose(stats['after_mean'] - stats['before_mean'], 1000)
@@ -0,0 +1,330 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import numpy as np
+import pytest
+from scipy.interpolate import Rbf
+
+from wifi_survey_heatmap.interpolation import (
+    INTERPOLATORS, RBF_KERNELS, IncrementalRbfInterpolator,
+    LocalRbfInterpolator, RbfInterpolator, allocate_grids, evaluate_grid,
+    get_interpolator, grid_axes, interpolation_group, nearest_labels,
+    pin_corners, tune_rbf
+)
+
+
+def survey(num=200, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 800, num)
+    y = rng.uniform(0, 600, num)
+    return x, y, np.sin(x / 150.0) + np.cos(y / 100.0)
+
+
+class TestGetInterpolator(object):
+
+    def test_names(self):
+        assert INTERPOLATORS['rbf'] is RbfInterpolator
+        assert INTERPOLATORS['local-rbf'] is LocalRbfInterpolator
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            get_interpolator('foo', [0, 1], [0, 1])
+
+    def test_ignores_unsupported_options(self):
+        x, y, _ = survey()
+        interp = get_interpolator('rbf', x, y, neighbors=5)
+        assert isinstance(interp, RbfInterpolator)
+
+
+class TestInterpolators(object):
+
+    @pytest.mark.parametrize('name', sorted(INTERPOLATORS.keys()))
+    def test_reproduces_sites(self, name):
+        x, y, v = survey()
+        res = get_interpolator(name, x, y, neighbors=16).fit(v)(x, y)
+        assert res.shape == v.shape
+        assert np.allclose(res, v, atol=0.05)
+
+    @pytest.mark.parametrize('name', sorted(INTERPOLATORS.keys()))
+    def test_multiple_columns(self, name):
+        x, y, v = survey()
+        values = np.column_stack((v, 2 * v))
+        gx, gy = np.meshgrid(np.linspace(0, 800, 9), np.linspace(0, 600, 7))
+        res = get_interpolator(name, x, y).fit(values)(gx, gy)
+        assert res.shape == (63, 2)
+        assert np.allclose(res[:, 1], 2 * res[:, 0])
+
+    @pytest.mark.parametrize('kernel', sorted(RBF_KERNELS.keys()))
+    @pytest.mark.parametrize('smooth', [0.0, 0.5])
+    def test_rbf_matches_scipy(self, kernel, smooth):
+        x, y, v = survey(num=50)
+        values = np.column_stack((v, v ** 2))
+        gx, gy = np.meshgrid(np.linspace(0, 800, 9), np.linspace(0, 600, 7))
+        res = get_interpolator(
+            'rbf', x, y, kernel=kernel, smooth=smooth
+        ).fit(values)(gx, gy)
+        for i in range(2):
+            expected = Rbf(
+                x, y, values[:, i], function=kernel, smooth=smooth
+            )(gx, gy)
+            assert np.allclose(res[:, i], expected.ravel(), atol=1e-6)
+
+    def test_loo_residuals(self):
+        x, y, v = survey(num=60)
+        values = np.column_stack((v, v ** 2))
+        interp = RbfInterpolator(x, y, kernel='multiquadric', smooth=0.1)
+        res = interp.fit(values).loo_residuals()
+        for i in (0, 17, 59):
+            keep = np.arange(60) != i
+            other = RbfInterpolator(
+                x[keep], y[keep], kernel='multiquadric',
+                epsilon=interp.params['epsilon'], smooth=0.1
+            ).fit(values[keep])
+            assert np.allclose(res[i], values[i] - other([x[i]], [y[i]]))
+
+    def test_local_close_to_global(self):
+        x, y, v = survey(num=400)
+        gx, gy = np.meshgrid(
+            np.linspace(100, 700, 30), np.linspace(100, 500, 20)
+        )
+        exact = get_interpolator('rbf', x, y).fit(v)(gx, gy)
+        local = get_interpolator(
+            'local-rbf', x, y, neighbors=32
+        ).fit(v)(gx, gy)
+        assert np.abs(exact - local).max() < 0.1
+
+
+class TestIncrementalRbfInterpolator(object):
+
+    def test_update(self, tmpdir):
+        path = str(tmpdir.join('model.npz'))
+        x, y, v = survey(num=300)
+        IncrementalRbfInterpolator(x[:280], y[:280], path=path).fit(
+            v[:280]
+        ).save()
+        # drop some points, add others, and shuffle the order
+        idx = np.r_[10:20, 40:300, 0:5]
+        interp = IncrementalRbfInterpolator(x[idx], y[idx], path=path)
+        assert interp._inverse is not None
+        gx, gy = np.meshgrid(np.linspace(0, 800, 9), np.linspace(0, 600, 7))
+        res = interp.fit(v[idx])(gx, gy)
+        expected = RbfInterpolator(x[idx], y[idx]).fit(v[idx])(gx, gy)
+        assert np.allclose(res, expected, atol=1e-6)
+
+    def test_repeated_updates(self, tmpdir):
+        path = str(tmpdir.join('model.npz'))
+        x, y, v = survey(num=700, seed=1)
+        gx, gy = np.meshgrid(np.linspace(0, 800, 9), np.linspace(0, 600, 7))
+        idx = list(range(600))
+        # rounding errors of the updates compound over the runs; the model
+        # is rebuilt before they show
+        for start in range(600, 700, 10):
+            interp = IncrementalRbfInterpolator(x[idx], y[idx], path=path)
+            res = interp.fit(v[idx])(gx, gy)
+            interp.save()
+            expected = RbfInterpolator(x[idx], y[idx]).fit(v[idx])(gx, gy)
+            assert np.allclose(res, expected, atol=1e-4)
+            idx = idx[3:] + list(range(start, start + 5))
+
+    def test_name(self):
+        assert IncrementalRbfInterpolator.name != RbfInterpolator.name
+
+    def test_kernel_options(self, tmpdir):
+        path = str(tmpdir.join('model.npz'))
+        x, y, v = survey(num=100)
+        IncrementalRbfInterpolator(
+            x[:95], y[:95], path=path, kernel='gaussian'
+        ).fit(v[:95]).save()
+        interp = IncrementalRbfInterpolator(
+            x, y, path=path, kernel='gaussian'
+        )
+        assert interp._inverse is not None
+        # the default epsilon of the saved model is kept
+        params = interp.params
+        assert params['epsilon'] == RbfInterpolator(
+            x[:95], y[:95]
+        ).params['epsilon']
+        gx, gy = np.meshgrid(np.linspace(0, 800, 9), np.linspace(0, 600, 7))
+        expected = RbfInterpolator(x, y, **params).fit(v)(gx, gy)
+        assert np.allclose(interp.fit(v)(gx, gy), expected, atol=1e-6)
+        assert np.allclose(
+            interp.loo_residuals(),
+            RbfInterpolator(x, y, **params).fit(v).loo_residuals()
+        )
+        interp = IncrementalRbfInterpolator(x, y, path=path)
+        assert interp._inverse is None
+
+    def test_rebuild_on_large_change(self, tmpdir):
+        path = str(tmpdir.join('model.npz'))
+        x, y, v = survey(num=100)
+        IncrementalRbfInterpolator(x[:50], y[:50], path=path).fit(
+            v[:50]
+        ).save()
+        interp = IncrementalRbfInterpolator(x[50:], y[50:], path=path)
+        assert interp._inverse is None
+
+
+class TestTuneRbf(object):
+
+    def test_tune(self):
+        x, y, v = survey(num=80)
+        values = np.column_stack((v, np.round(v)))
+        candidates = [
+            {'kernel': 'linear', 'smooth': 0.0},
+            {'kernel': 'gaussian', 'epsilon': 2.0, 'smooth': 0.0},
+            {'kernel': 'multiquadric', 'epsilon': 1.0, 'smooth': 0.1},
+        ]
+        best, results = tune_rbf(
+            np.r_[x, 0], np.r_[y, 0], np.r_[values, [[0, 0]]],
+            candidates=candidates, num=80
+        )
+        assert len(results) == 3
+        for i in range(2):
+            scores = [rmse[i] for _, rmse in results]
+            params, rmse = results[int(np.argmin(scores))]
+            assert best[i] == params
+            res = RbfInterpolator(
+                np.r_[x, 0], np.r_[y, 0], **params
+            ).fit(np.r_[values[:, i], 0]).loo_residuals()
+            assert np.isclose(rmse[i], np.sqrt(np.mean(res[:80] ** 2)))
+
+
+class TestEvaluateGrid(object):
+
+    @pytest.mark.parametrize('memmap', [False, True])
+    def test_tiles_match_full_evaluation(self, memmap, tmpdir):
+        x, y, v = survey()
+        values = np.column_stack((v, -v))
+        interp = get_interpolator('rbf', x, y).fit(values)
+        gx = np.linspace(0, 800, 17)
+        gy = np.linspace(0, 600, 11)
+        out = allocate_grids(
+            2, len(gy), len(gx), str(tmpdir) if memmap else None
+        )
+        # a tiny budget forces one grid row per tile
+        res = evaluate_grid(interp, gx, gy, out=out, memory_budget=1)
+        assert res is out
+        assert res.dtype == np.float32
+        mx, my = np.meshgrid(gx, gy)
+        expected = interp(mx, my)
+        for i in range(2):
+            assert np.allclose(
+                res[i], expected[:, i].reshape(mx.shape), atol=1e-5
+            )
+
+    def test_mask(self):
+        x, y, v = survey()
+        interp = get_interpolator('idw', x, y).fit(v)
+        gx = np.linspace(0, 800, 17)
+        gy = np.linspace(0, 600, 11)
+        mask = np.zeros((11, 17), dtype=bool)
+        mask[2:9, 3:7] = True
+        mask[0, 16] = True
+        full = evaluate_grid(interp, gx, gy)
+        res = evaluate_grid(interp, gx, gy, memory_budget=1, mask=mask)
+        assert np.isnan(res[0][~mask]).all()
+        assert np.allclose(res[0][mask], full[0][mask])
+        labels = nearest_labels(x, y, gx, gy, mask=mask)
+        assert (labels[~mask] == -1).all()
+        assert (labels[mask] == nearest_labels(x, y, gx, gy)[mask]).all()
+
+    def test_adaptive(self):
+        # a plane is reproduced exactly by the linear interpolator, so every
+        # cell away from the sites is filled bilinearly without error
+        x = np.array([0, 800, 0, 800, 400.0])
+        y = np.array([0, 0, 600, 600, 300.0])
+        interp = get_interpolator('linear', x, y).fit(2 * x - 3 * y)
+        calls = []
+        evaluate = interp._evaluate
+        interp._evaluate = lambda p: calls.append(len(p)) or evaluate(p)
+        gx = np.linspace(0, 800, 101)
+        gy = np.linspace(0, 600, 61)
+        full = evaluate_grid(interp, gx, gy)
+        del calls[:]
+        res = evaluate_grid(interp, gx, gy, memory_budget=1, tolerance=0.2)
+        assert np.allclose(res, full, atol=1e-3)
+        assert sum(calls) < full.size / 10
+        mask = np.zeros((61, 101), dtype=bool)
+        mask[10:40, 20:90] = True
+        res = evaluate_grid(interp, gx, gy, mask=mask, tolerance=0.2)
+        assert np.isnan(res[0][~mask]).all()
+        assert np.allclose(res[0][mask], full[0][mask], atol=1e-3)
+
+
+class TestNearestLabels(object):
+
+    def test_labels(self):
+        x, y, _ = survey(num=50)
+        gx = np.linspace(0, 800, 23)
+        gy = np.linspace(0, 600, 19)
+        labels = nearest_labels(x, y, gx, gy, memory_budget=1)
+        assert labels.shape == (19, 23)
+        mx, my = np.meshgrid(gx, gy)
+        dist = np.hypot(
+            mx[..., np.newaxis] - x, my[..., np.newaxis] - y
+        )
+        assert (labels == dist.argmin(axis=-1)).all()
+
+
+class TestGridHelpers(object):
+
+    def test_grid_axes(self):
+        x, y = grid_axes(800, 400)
+        assert len(x) == 200
+        assert len(y) == 100
+        assert (x[0], x[-1], y[0], y[-1]) == (0, 800, 0, 400)
+
+    def test_pin_corners(self):
+        res = pin_corners({
+            'x': np.array([10.0, 20.0]), 'y': np.array([5.0, 15.0]),
+            'signal': np.array([-60.0, -40.0]),
+            'ap': np.array(['a', 'b'], dtype=object)
+        }, 40, 20)
+        assert list(res['x']) == [10, 20, 0, 0, 40, 40]
+        assert list(res['y']) == [5, 15, 0, 20, 0, 20]
+        assert list(res['signal']) == [-60, -40, -60, -60, -60, -60]
+        assert list(res['ap']) == ['a', 'b', None, None, None, None]
+
+    def test_interpolation_group(self):
+        rbf_params = {'signal': {'kernel': 'gaussian', 'epsilon': 2.0}}
+        assert interpolation_group('signal', 'rbf') == ('rbf', None)
+        assert interpolation_group(
+            'signal', 'rbf', {'signal': 'idw'}, rbf_params
+        ) == ('idw', None)
+        assert interpolation_group(
+            'signal', 'rbf', rbf_params=rbf_params
+        ) == ('rbf', (('epsilon', 2.0), ('kernel', 'gaussian')))
@@ -0,0 +1,141 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pytest
+
+from wifi_survey_heatmap.interpolation import grid_axes
+from wifi_survey_heatmap.stats import (
+    SurveyStats, cell_weights, coverage_threshold, grid_stats,
+    weighted_percentiles
+)
+from wifi_survey_heatmap.survey import load_survey
+
+
+class TestCoverageThreshold(object):
+
+    def test_parse(self):
+        assert coverage_threshold('signal_quality >= 60') == (
+            'signal_quality', '>=', 60.0
+        )
+        assert coverage_threshold('jitter_download<-1.5') == (
+            'jitter_download', '<', -1.5
+        )
+
+    def test_invalid(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            coverage_threshold('foo>=1')
+        with pytest.raises(argparse.ArgumentTypeError):
+            coverage_threshold('signal_quality=1')
+
+
+class TestGridStats(object):
+
+    def test_cell_weights(self):
+        np.testing.assert_array_equal(cell_weights(2, 3), [
+            [0.25, 0.5, 0.25],
+            [0.25, 0.5, 0.25],
+        ])
+
+    def test_weighted_percentiles(self):
+        values = np.array([3.0, 1.0, 2.0])
+        assert weighted_percentiles(
+            values, np.ones(3), [50]
+        ).tolist() == [2.0]
+        # the weight of 3 pulls the median towards it
+        assert weighted_percentiles(
+            values, np.array([2.0, 1.0, 1.0]), [50]
+        )[0] == pytest.approx(7 / 3.0)
+
+    def test_stats(self):
+        z = np.array([[0.0, 10.0], [20.0, 30.0]])
+        weights = np.array([[1.0, 1.0], [1.0, 0.0]])
+        res = grid_stats(
+            z, weights, percentiles=[50], coverage=[('>=', 10)], bins=2
+        )
+        assert res['min'] == 0
+        assert res['max'] == 20
+        assert res['mean'] == 10
+        assert res['percentiles'] == {'50': 10}
+        assert res['coverage'] == {'>=10': pytest.approx(2 / 3.0)}
+        assert res['histogram']['edges'] == [0, 10, 20]
+        assert res['histogram']['fractions'] == [
+            pytest.approx(1 / 3.0), pytest.approx(2 / 3.0)
+        ]
+
+
+class TestSurveyStats(object):
+
+    def write_survey(self):
+        with open('survey.json', 'w') as fh:
+            json.dump({'img_path': 'floor.png', 'survey_points': [
+                {'x': x, 'y': y, 'result': {
+                    'signal_mbm': -4000 - 100 * x,
+                    'frequency': 2412000 if x < 20 else 5180000,
+                }} for x, y in ((5, 5), (35, 5), (5, 15), (35, 15))
+            ]}, fh)
+        return load_survey('survey.json')
+
+    def test_grids(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        survey = self.write_survey()
+        x, y = grid_axes(40, 20)
+        grids = dict(SurveyStats(interpolation='idw')._grids(
+            survey, 40, 20, x, y
+        ))
+        assert set(np.unique(grids['frequency'])) == {2412, 5180}
+        # the corners are pinned to the minimum
+        assert grids['signal_quality'][0, 0] == pytest.approx(
+            grids['signal_quality'].min()
+        )
+
+    def test_grids_mask(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        survey = self.write_survey()
+        x, y = grid_axes(40, 20)
+        mask = np.zeros((len(y), len(x)), dtype=bool)
+        mask[:, :len(x) // 2] = True
+        grids = dict(SurveyStats(interpolation='idw')._grids(
+            survey, 40, 20, x, y, mask=mask
+        ))
+        for key in ('frequency', 'signal_quality'):
+            assert np.isnan(grids[key][~mask]).all()
+            assert not np.isnan(grids[key][mask]).any()
+        assert set(np.unique(grids['frequency'][mask])) == {2412}
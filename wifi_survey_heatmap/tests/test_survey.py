@@ -0,0 +1,173 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from wifi_survey_heatmap.survey import bin_survey, convert_survey, load_survey
+
+
+def _point(x, y, signal, jitter=0.5, scan=None):
+    result = {
+        'signal_mbm': signal,
+        'mac': 'aa:bb',
+        'udp': {'Mbps': 10, 'jitter_ms': jitter},
+    }
+    if scan is not None:
+        result['scan_results'] = scan
+    return {'x': x, 'y': y, 'result': result}
+
+
+def _write(tmpdir, data):
+    fpath = str(tmpdir.join('survey.json'))
+    with open(fpath, 'w') as fh:
+        json.dump(data, fh)
+    return fpath
+
+
+class TestLoadSurvey(object):
+
+    def test_columns(self, tmpdir):
+        fpath = _write(tmpdir, {
+            'img_path': 'floor.png',
+            'survey_points': [
+                _point(1, 2, -40),
+                _point(3, 4, -50, jitter=None),
+                _point(1, 2, -60),
+            ]
+        })
+        s = load_survey(fpath, metrics=['signal_quality', 'jitter_download',
+                                        'tcp_upload_Mbps'])
+        assert s.img_path == 'floor.png'
+        assert len(s) == 2
+        assert s.x.tolist() == [1, 3]
+        assert s.columns['signal_quality'].tolist() == [90, 80]
+        assert s.columns['jitter_download'][0] == 0.5
+        assert np.isnan(s.columns['jitter_download'][1])
+        assert s.present['jitter_download'].all()
+        assert not s.present['tcp_upload_Mbps'].any()
+        assert s.bssid.tolist() == ['aa:bb', 'aa:bb']
+        assert s.scan is None
+
+    def test_scan(self, tmpdir):
+        scan = {
+            'x': {'ssid': 'a', 'frequency': 2412000000, 'signal_mbm': -50},
+            'y': {'ssid': 'b', 'frequency': 5180000000, 'signal_mbm': -70},
+        }
+        fpath = _write(tmpdir, {
+            'survey_points': [_point(1, 2, -40, scan=scan), _point(3, 4, -50)]
+        })
+        s = load_survey(fpath, metrics=[], scan=True)
+        assert s.scan['point'].tolist() == [0, 0]
+        assert sorted(s.scan['ssid'].tolist()) == ['a', 'b']
+        assert not s.scan_complete
+
+    def test_no_points(self, tmpdir):
+        fpath = _write(tmpdir, {'img_path': 'floor.png'})
+        with pytest.raises(ValueError):
+            load_survey(fpath)
+
+
+class TestConvertSurvey(object):
+
+    def test_round_trip(self, tmpdir):
+        # a repeated and a missing BSSID
+        scan = {
+            '0': {'bssid': 'x', 'ssid': 'a', 'frequency': 2412000000,
+                  'signal_mbm': -50, 'channel': 1},
+            '1': {'bssid': 'x', 'ssid': 'b', 'frequency': 5180000000,
+                  'signal_mbm': -60, 'channel': 36},
+            '2': {'ssid': 'c', 'frequency': 2437000000, 'signal_mbm': -70,
+                  'channel': 6},
+        }
+        fpath = _write(tmpdir, {
+            'img_path': 'floor.png',
+            'survey_points': [
+                _point(1, 2, -40, scan=scan),
+                _point(3, 4, -50, jitter=None, scan={}),
+            ]
+        })
+        npz = str(tmpdir.join('survey.npz'))
+        back = str(tmpdir.join('back.json'))
+        assert convert_survey(fpath, npz) == 2
+        assert convert_survey(npz, back) == 2
+        orig = load_survey(fpath, scan=True)
+        for other in (
+            load_survey(npz, scan=True), load_survey(back, scan=True)
+        ):
+            assert other.img_path == 'floor.png'
+            assert other.x.tolist() == orig.x.tolist()
+            assert other.bssid.tolist() == orig.bssid.tolist()
+            for key, col in orig.columns.items():
+                np.testing.assert_array_equal(other.columns[key], col)
+                np.testing.assert_array_equal(
+                    other.present[key], orig.present[key]
+                )
+            assert other.scan['ssid'].tolist() == ['a', 'b', 'c']
+            assert other.scan['signal_mbm'].tolist() == [-50, -60, -70]
+            assert other.scan_complete
+        with open(back) as fh:
+            point = json.load(fh)['survey_points'][1]
+        assert point['result']['udp'] == {'Mbps': 10, 'jitter_ms': None}
+
+
+class TestBinSurvey(object):
+
+    def test_aggregate(self, tmpdir):
+        fpath = _write(tmpdir, {'survey_points': [
+            _point(1, 1, -40, scan={}), _point(2, 3, -50, scan={}),
+            _point(3, 2, -90, jitter=None, scan={}),
+            _point(15, 1, -70, scan={'0': {'ssid': 'a', 'signal_mbm': -1}}),
+        ]})
+        survey = load_survey(fpath, scan=True)
+        binned = bin_survey(survey, 10)
+        assert len(binned) == 2
+        assert binned.x.tolist() == [2, 15]
+        assert binned.y.tolist() == [2, 1]
+        assert binned.columns['signal_quality'].tolist() == [70, 60]
+        assert binned.columns['jitter_download'].tolist() == [0.5, 0.5]
+        assert binned.scan['point'].tolist() == [1]
+        median = bin_survey(survey, 10, 'median')
+        assert median.columns['signal_quality'].tolist() == [80, 60]
+        assert bin_survey(survey, 10, 'min').columns[
+            'signal_quality'].tolist() == [40, 60]
+        assert bin_survey(survey, 10, 'count').columns[
+            'jitter_download'].tolist() == [2, 1]
+        with pytest.raises(ValueError):
+            bin_survey(survey, 10, 'max')
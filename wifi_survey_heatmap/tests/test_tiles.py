@@ -0,0 +1,95 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import os
+
+import numpy as np
+
+from wifi_survey_heatmap.tiles import (
+    TileWriter, max_zoom, pad_tile, tile_boxes, zoom_size
+)
+
+
+class TestTiles(object):
+
+    def test_zoom(self):
+        assert max_zoom(200, 100) == 0
+        assert max_zoom(800, 500) == 2
+        assert zoom_size(800, 500, 1, 2) == (400, 250)
+        assert zoom_size(801, 500, 0, 2) == (201, 125)
+
+    def test_tile_boxes(self):
+        assert list(tile_boxes(300, 100)) == [
+            (0, 0, (0, 0, 256, 100)),
+            (1, 0, (256, 0, 300, 100)),
+        ]
+
+    def test_pad_tile(self):
+        tile = pad_tile(np.full((10, 20, 3), 7, dtype=np.uint8))
+        assert tile.shape == (256, 256, 4)
+        assert tuple(tile[9, 19]) == (7, 7, 7, 255)
+        assert tuple(tile[10, 19]) == (0, 0, 0, 0)
+
+
+class TestTileWriter(object):
+
+    def test_incremental(self, tmpdir):
+        path = str(tmpdir.join('0'))
+        a = pad_tile(np.zeros((5, 5, 3), dtype=np.uint8))
+        b = pad_tile(np.ones((5, 5, 3), dtype=np.uint8))
+        blank = pad_tile(np.full((5, 5), 255, dtype=np.uint8))
+        writer = TileWriter(path, blank=(255, 255, 255, 255))
+        writer.write(0, 0, a)
+        writer.write(0, 1, b)
+        writer.write(1, 0, pad_tile(np.zeros((0, 0, 4), dtype=np.uint8)))
+        writer.write(1, 1, blank)
+        writer.close()
+        assert writer.written == 2
+        assert os.path.exists(os.path.join(path, '0', '1.png'))
+        assert not os.path.exists(os.path.join(path, '1'))
+
+        writer = TileWriter(path)
+        writer.write(0, 0, a)
+        writer.write(0, 1, a)
+        writer.close()
+        assert (writer.written, writer.unchanged) == (1, 1)
+
+        writer = TileWriter(path)
+        writer.write(0, 1, a)
+        writer.close()
+        assert not os.path.exists(os.path.join(path, '0', '0.png'))
+        assert os.path.exists(os.path.join(path, '0', '1.png'))
@@ -41,6 +41,8 @@ import logging
 import json
 from collections import defaultdict
 
+import numpy as np
+
 from wifi_survey_heatmap.heatmap import HeatMapGenerator
 
 FORMAT = "[%(asctime)s %(levelname)s] %(message)s"
@@ -59,12 +61,17 @@ class ThresholdGenerator(object):
             for t in titles
         ]
         for key in HeatMapGenerator.graphs.keys():
-            res[key]['min'] = min([
-                min(value for value in x[key] if value is not None) for x in items
-            ])
-            res[key]['max'] = max([
-                max(value for value in x[key] if value is not None) for x in items
-            ])
+            if key == 'bssid':
+                # categorical labels; there is no meaningful range
+                continue
+            values = [
+                x[key] for x in items
+                if key in x and not np.isnan(x[key]).all()
+            ]
+            if not values:
+                continue
+            res[key]['min'] = float(min(np.nanmin(x) for x in values))
+            res[key]['max'] = float(max(np.nanmax(x) for x in values))
         with open('thresholds.json', 'w') as fh:
             fh.write(json.dumps(res))
         logger.info('Wrote: thresholds.json')
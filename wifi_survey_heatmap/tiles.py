@@ -0,0 +1,223 @@
+"""
+The latest version of this package is available at:
+<http://github.com/jantman/wifi-survey-heatmap>
+
+##################################################################################
+Copyright 2018 Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+
+    This file is part of wifi-survey-heatmap, also known as wifi-survey-heatmap.
+
+    wifi-survey-heatmap is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    wifi-survey-heatmap is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with wifi-survey-heatmap.  If not, see <http://www.gnu.org/licenses/>.
+
+The Copyright and Authors attributions contained herein may not be removed or
+otherwise altered, except to add the Author attribution of a contributor to
+this work. (Additional Terms pursuant to Section 7b of the AGPL v3)
+##################################################################################
+While not legally required, I sincerely request that anyone who finds
+bugs please submit them at <https://github.com/jantman/wifi-survey-heatmap> or
+to me via email, and that you send any contributions or improvements
+either as a pull request on GitHub, or to me via email.
+##################################################################################
+
+AUTHORS:
+Jason Antman <jason@jasonantman.com> <http://www.jasonantman.com>
+##################################################################################
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+from wifi_survey_heatmap.cache import digest
+
+logger = logging.getLogger(__name__)
+
+#: width and height of each tile, in pixels
+TILE_SIZE = 256
+
+#: name of the manifest of the tiles of one zoom level
+TILE_MANIFEST = 'tiles.json'
+
+
+def max_zoom(width, height):
+    """
+    Return the zoom level at which an image of the given size is shown at
+    full resolution; at zoom 0 it fits into a single tile.
+
+    :rtype: int
+    """
+    return max(0, int(math.ceil(
+        math.log2(max(width, height) / float(TILE_SIZE))
+    )))
+
+
+def zoom_size(width, height, zoom, full_zoom):
+    """
+    Return the (width, height) of an image of the given size, scaled for the
+    given zoom level when shown at full resolution at ``full_zoom``.
+
+    :rtype: tuple
+    """
+    scale = 2 ** (full_zoom - zoom)
+    return (
+        int(math.ceil(width / float(scale))),
+        int(math.ceil(height / float(scale)))
+    )
+
+
+def tile_boxes(width, height):
+    """
+    Yield the column and row of every tile covering an image of the given
+    size, and the box of the image it covers; the boxes of the tiles on the
+    right and bottom edges are clipped to the image.
+
+    :return: iterator of ``(x, y, (left, top, right, bottom))`` tuples
+    """
+    for ty in range(int(math.ceil(height / float(TILE_SIZE)))):
+        for tx in range(int(math.ceil(width / float(TILE_SIZE)))):
+            left, top = tx * TILE_SIZE, ty * TILE_SIZE
+            yield tx, ty, (
+                left, top,
+                min(left + TILE_SIZE, width), min(top + TILE_SIZE, height)
+            )
+
+
+def pad_tile(img):
+    """
+    Return an image of at most :py:data:`TILE_SIZE` square as a full RGBA
+    tile, transparent outside of the image.
+
+    :param img: grayscale, RGB or RGBA uint8 image
+    :type img: numpy.ndarray
+    :rtype: numpy.ndarray
+    """
+    img = np.asarray(img)
+    if img.ndim == 2:
+        img = img[:, :, None]
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    rows, cols = img.shape[:2]
+    if img.shape[2] in (1, 3):
+        tile[:rows, :cols, :3] = img[:, :, :3]
+        tile[:rows, :cols, 3] = 255
+    else:
+        tile[:rows, :cols] = img
+    return tile
+
+
+class TileWriter(object):
+    """
+    Writes the tiles of one zoom level of a tile layer as
+    ``DIR/X/Y.png`` (the ``Z`` directory of an XYZ tile pyramid).
+
+    A manifest of the digest of every tile is kept in the directory, so
+    unchanged tiles are not written again and tiles that became empty are
+    removed. Tiles whose pixels are all transparent or the ``blank`` color
+    are not written.
+    """
+
+    def __init__(self, path, blank=None):
+        """
+        :param path: directory of the zoom level
+        :type path: str
+        :param blank: RGBA color of tiles that count as empty, in addition to
+          fully transparent ones
+        :type blank: tuple
+        """
+        self.path = path
+        self.blank = blank
+        self.written = 0
+        self.unchanged = 0
+        self._old = {}
+        self._tiles = {}
+        try:
+            with open(self.manifest_path, 'r') as fh:
+                self._old = json.load(fh)
+        except (IOError, OSError, ValueError):
+            pass
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.path, TILE_MANIFEST)
+
+    def _tile_path(self, name):
+        return os.path.join(self.path, name + '.png')
+
+    def is_empty(self, tile):
+        """
+        Return whether a tile is empty and need not be written.
+
+        :rtype: bool
+        """
+        opaque = tile[:, :, 3] > 0
+        if not opaque.any():
+            return True
+        return self.blank is not None and bool(
+            (tile[opaque] == np.array(self.blank, dtype=np.uint8)).all()
+        )
+
+    def write(self, x, y, tile):
+        """
+        Write one tile, unless it is empty or unchanged.
+
+        :param x: tile column
+        :type x: int
+        :param y: tile row
+        :type y: int
+        :param tile: RGBA uint8 tile, see :py:func:`pad_tile`
+        :type tile: numpy.ndarray
+        """
+        if self.is_empty(tile):
+            return
+        name = '%d/%d' % (x, y)
+        key = digest(tile)
+        self._tiles[name] = key
+        fname = self._tile_path(name)
+        if self._old.get(name) == key and os.path.exists(fname):
+            self.unchanged += 1
+            return
+        dirname = os.path.dirname(fname)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        Image.fromarray(tile).save(fname, compress_level=1)
+        self.written += 1
+
+    def close(self):
+        """
+        Remove tiles of the previous run that were not written again, and
+        write the manifest.
+
+        :return: path of the manifest
+        :rtype: str
+        """
+        removed = set(self._old) - set(self._tiles)
+        for name in removed:
+            try:
+                os.remove(self._tile_path(name))
+            except OSError:
+                pass
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self._tiles, fh, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+        logger.debug(
+            'Wrote %d tiles to %s (%d unchanged, %d removed)', self.written,
+            self.path, self.unchanged, len(removed)
+        )
+        return self.manifest_path